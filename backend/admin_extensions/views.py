@@ -1,23 +1,20 @@
 import logging
 
 from django.contrib.admin.views.decorators import staff_member_required
-from django.core.cache import cache
 from django.shortcuts import redirect
 
-logger = logging.getLogger(__name__)
+from users.tasks import refresh_sms_balance_task
 
-SMS_BALANCE_CACHE_KEY = 'sms_provider_balance'
+logger = logging.getLogger(__name__)
 
 
 @staff_member_required
 def refresh_sms_balance(request):
-    """Очищает ключ кеша баланса и обновляет страницу."""
+    """Ставит обновление баланса в очередь и возвращает на страницу."""
 
-    cache.delete(SMS_BALANCE_CACHE_KEY)
+    refresh_sms_balance_task.delay()
 
-    logger.info('Принудительное обновление баланса - '
-                'ключ кэша удален: sms_provider_balance'
-                )
+    logger.info('Принудительное обновление баланса поставлено в очередь')
     return redirect(
         request.GET.get('next') or 'admin:index'
     )
@@ -0,0 +1,110 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from deliveries.models import DeliveryRule
+from orders.models import CartItem, Order, ShoppingCart
+from products.models import Category, Product
+from users.models import Address
+
+# Полный проход по таблице в плане запроса
+SEQ_SCAN_PATTERN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN (ANALYZE, BUFFERS) для горячих запросов API и '
+        'завершается ошибкой, если какой-то из них читает таблицу целиком. '
+        'Запускать на наполненной базе (seed_dataset).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--disable-seqscan', action='store_true',
+            help=(
+                'SET enable_seqscan = off. На маленьких данных '
+                'проверяет, что для запроса вообще есть подходящий индекс.'
+            )
+        )
+
+    def hot_queries(self):
+        """[(название, queryset)] в том виде, в каком их строит API."""
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        category_id = (
+            Category.objects.filter(is_available=True)
+            .values_list('id', flat=True).first()
+        )
+        order = (
+            Order.objects.exclude(delivery_date=None)
+            .order_by('-id').first()
+        )
+        cart_id = (
+            ShoppingCart.objects.order_by('-id')
+            .values_list('id', flat=True).first()
+        )
+        queries = [
+            ('products', Product.objects.filter(
+                is_available=True).order_by('id')[:page_size]),
+            ('delivery_rules', DeliveryRule.objects.filter(
+                is_active=True).order_by('time_from', 'time_to')),
+        ]
+        if category_id:
+            queries.append(('products_by_category', Product.objects.filter(
+                is_available=True, category_id=category_id
+            ).order_by('id')[:page_size]))
+        if order:
+            queries += [
+                ('orders', Order.objects.filter(
+                    user_id=order.user_id
+                ).order_by('-created_at', 'id')[:page_size]),
+                ('primary_address', Address.objects.filter(
+                    user_id=order.user_id, is_primary=True
+                )),
+                ('delivery_slot_orders', Order.objects.filter(
+                    delivery_date=order.delivery_date,
+                    delivery_time_from=order.delivery_time_from,
+                    delivery_time_to=order.delivery_time_to,
+                ).exclude(status=Order.Status.CANCELED)),
+            ]
+        if cart_id:
+            queries.append(
+                ('cart_items', CartItem.objects.filter(cart_id=cart_id))
+            )
+        return queries
+
+    def explain(self, queryset):
+        return queryset.explain(analyze=True, buffers=True)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'EXPLAIN (ANALYZE, BUFFERS) доступен только в PostgreSQL, '
+                f'текущая база: {connection.vendor}'
+            )
+
+        failed = []
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in self.hot_queries():
+                plan = self.explain(queryset)
+                table = queryset.model._meta.db_table
+                seq_scans = set(SEQ_SCAN_PATTERN.findall(plan))
+                if table in seq_scans:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(
+                        f'SEQ SCAN  {name} ({table})'
+                    ))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'OK        {name}'))
+                if options['verbosity'] > 1 or table in seq_scans:
+                    self.stdout.write(plan)
+
+        if failed:
+            raise CommandError(
+                f'Полный проход по таблице: {", ".join(failed)}'
+            )
@@ -0,0 +1,333 @@
+import itertools
+import math
+import random
+from datetime import time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from deliveries.models import Delivery, DeliveryRule
+from orders.models import (
+    CartItem, Order, OrderCounters, OrderItem, PaymentMethod, ShoppingCart
+)
+from products.models import (
+    Category, Ingredient, IngredientInProduct, Nutrient,
+    NutrientInIngredient, Product
+)
+from products.services import ProductService
+from users.models import Address, User
+
+SEED_SLUG_PREFIX = 'seed-'
+SEED_PHONE_PREFIX = '+7999'
+MEASUREMENT_UNITS = ('г', 'мг', 'мкг')
+DELIVERY_WINDOWS = ((time(10), time(14)), (time(14), time(18)),
+                    (time(18), time(22)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет базу синтетическим каталогом, пользователями и заказами '
+        'для нагрузочных замеров (benchmarks, explain_hot_queries). '
+        'Данные воспроизводимы при одинаковом --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=300)
+        parser.add_argument('--nutrients', type=int, default=25)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument(
+            '--orders-per-user', type=float, default=4,
+            help='Среднее число заказов на пользователя (экспоненциальное).'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=0.3,
+            help='Доля пользователей с непустой корзиной.'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if Category.objects.filter(
+            slug__startswith=SEED_SLUG_PREFIX
+        ).exists():
+            raise CommandError(
+                'Синтетические данные уже есть в базе, используйте чистую БД'
+            )
+
+        self.rng = random.Random(options['seed'])
+        self._zipf_weights = {}
+        self.now = timezone.now()
+        with transaction.atomic():
+            categories = self.create_categories(options['categories'])
+            nutrients = self.create_nutrients(options['nutrients'])
+            ingredients = self.create_ingredients(
+                options['ingredients'], nutrients
+            )
+            products = self.create_products(
+                options['products'], categories, ingredients
+            )
+            self.create_delivery_options()
+            users = self.create_users(options['users'])
+            addresses = self.create_addresses(users)
+            orders = self.create_orders(
+                users, addresses, products, options['orders_per_user']
+            )
+            carts = self.create_carts(users, products, options['carts'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: категорий {len(categories)}, нутриентов '
+            f'{len(nutrients)}, ингредиентов {len(ingredients)}, товаров '
+            f'{len(products)}, пользователей {len(users)}, адресов '
+            f'{len(addresses)}, заказов {len(orders)}, корзин {carts}'
+        ))
+
+    def popular(self, items, count):
+        """Выбор с весами по закону Ципфа: немногие элементы популярны."""
+        cum_weights = self._zipf_weights.get(len(items))
+        if cum_weights is None:
+            cum_weights = list(itertools.accumulate(
+                1 / (rank + 1) for rank in range(len(items))
+            ))
+            self._zipf_weights[len(items)] = cum_weights
+        return self.rng.choices(items, cum_weights=cum_weights, k=count)
+
+    def create_categories(self, count):
+        return Category.objects.bulk_create(
+            Category(
+                name=f'Категория {i + 1}',
+                slug=f'{SEED_SLUG_PREFIX}category-{i + 1}',
+                is_available=i < count - 1 or count == 1,
+            )
+            for i in range(count)
+        )
+
+    def create_nutrients(self, count):
+        return Nutrient.objects.bulk_create(
+            Nutrient(
+                name=f'Нутриент {i + 1}',
+                measurement_unit=self.rng.choice(MEASUREMENT_UNITS),
+                rda=Decimal(self.rng.randint(1, 900)),
+            )
+            for i in range(count)
+        )
+
+    def create_ingredients(self, count, nutrients):
+        ingredients = []
+        for i in range(count):
+            # БЖУ в сумме не больше 100 г на 100 г
+            parts = [self.rng.random() for _ in range(3)]
+            total = self.rng.uniform(5, 95) / sum(parts)
+            proteins, fats, carbs = (
+                Decimal(part * total).quantize(Decimal('0.1'))
+                for part in parts
+            )
+            ingredients.append(Ingredient(
+                name=f'Ингредиент {i + 1}',
+                proteins=proteins, fats=fats, carbs=carbs,
+            ))
+        ingredients = Ingredient.objects.bulk_create(ingredients)
+
+        NutrientInIngredient.objects.bulk_create(
+            (
+                NutrientInIngredient(
+                    ingredient=ingredient, nutrient=nutrient,
+                    amount_per_100g=Decimal(
+                        self.rng.uniform(0.001, 50)
+                    ).quantize(Decimal('0.001')),
+                )
+                for ingredient in ingredients
+                for nutrient in self.rng.sample(
+                    nutrients, min(len(nutrients), self.rng.randint(2, 6))
+                )
+            ),
+            batch_size=1000,
+        )
+        return ingredients
+
+    def create_products(self, count, categories, ingredients):
+        modes = (
+            Product.NutritionMode.AUTO, Product.NutritionMode.MANUAL,
+            Product.NutritionMode.NONE,
+        )
+        products = Product.objects.bulk_create(
+            (
+                Product(
+                    name=f'Товар {i + 1}',
+                    category=category,
+                    nutrition_mode=self.rng.choices(modes, (7, 1, 2))[0],
+                    description='Описание товара. ' * self.rng.randint(1, 20),
+                    weight=self.rng.randrange(150, 600, 10),
+                    # Цены логнормальные: в основном 200–600 руб.
+                    price=Decimal(
+                        max(math.exp(self.rng.gauss(5.8, 0.45)), 1)
+                    ).quantize(Decimal('1')),
+                    is_available=self.rng.random() < 0.9,
+                )
+                for i, category in enumerate(
+                    self.popular(categories, count)
+                )
+            ),
+            batch_size=1000,
+        )
+
+        links = []
+        for product in products:
+            composition = set(
+                self.popular(ingredients, self.rng.randint(3, 8))
+            )
+            # Доли состава в сумме не больше 100 г на 100 г продукта
+            shares = [self.rng.uniform(1, 10) for _ in composition]
+            scale = self.rng.uniform(60, 100) / sum(shares)
+            for ingredient, share in zip(composition, shares):
+                links.append(IngredientInProduct(
+                    product=product, ingredient=ingredient,
+                    amount_per_100g=max(
+                        Decimal(share * scale).quantize(Decimal('0.01')),
+                        Decimal('0.01'),
+                    ),
+                ))
+        IngredientInProduct.objects.bulk_create(links, batch_size=1000)
+        product_ids = [product.id for product in products]
+        ProductService.recalc_pfc_for_products(product_ids, reason='seed')
+        ProductService.recalc_nutrients(product_ids, reason='seed')
+        return products
+
+    def create_delivery_options(self):
+        Delivery.objects.bulk_create([
+            Delivery(name='Курьер', price=Decimal('250'),
+                     description='Доставка курьером'),
+            Delivery(name='Самовывоз', price=Decimal('0'),
+                     description='Самовывоз', requires_delivery_slot=False),
+        ])
+        PaymentMethod.objects.bulk_create([
+            PaymentMethod(name='Картой онлайн'),
+            PaymentMethod(name='Наличными курьеру'),
+        ])
+        DeliveryRule.objects.bulk_create(
+            DeliveryRule(
+                name=f'Доставка {delivery_from:%H}-{delivery_to:%H}',
+                time_from=time(0), time_to=time(23, 59),
+                days_offset=1, delivery_time_from=delivery_from,
+                delivery_time_to=delivery_to, capacity=50,
+            )
+            for delivery_from, delivery_to in DELIVERY_WINDOWS
+        )
+
+    def create_users(self, count):
+        password = make_password(None)
+        return User.objects.bulk_create(
+            (
+                User(
+                    phone=f'{SEED_PHONE_PREFIX}{i:07d}',
+                    name=f'Покупатель {i + 1}',
+                    password=password,
+                    phone_verified=True,
+                )
+                for i in range(count)
+            ),
+            batch_size=1000,
+        )
+
+    def create_addresses(self, users):
+        addresses = []
+        for user in users:
+            # У большинства один адрес, у некоторых два-три
+            for number in range(self.rng.choices((1, 2, 3), (6, 3, 1))[0]):
+                addresses.append(Address(
+                    user=user,
+                    street=f'Улица {self.rng.randint(1, 300)}',
+                    house=str(self.rng.randint(1, 120)),
+                    flat=str(self.rng.randint(1, 300)),
+                    is_primary=number == 0,
+                ))
+        return Address.objects.bulk_create(addresses, batch_size=1000)
+
+    def create_orders(self, users, addresses, products, orders_per_user):
+        addresses_by_user = {}
+        for address in addresses:
+            addresses_by_user.setdefault(address.user_id, []).append(address)
+        year = self.now.year % 100
+        statuses = (
+            Order.Status.DONE, Order.Status.CANCELED, Order.Status.NEW,
+            Order.Status.PROCESSING, Order.Status.SHIPPED,
+        )
+
+        orders, created, items_by_order = [], [], []
+        for user in users:
+            # Экспоненциальное распределение: много редких покупателей
+            count = int(self.rng.expovariate(1 / orders_per_user))
+            for _ in range(count):
+                created_at = self.now - timedelta(
+                    minutes=self.rng.randint(0, 365 * 24 * 60)
+                )
+                window = self.rng.choice(DELIVERY_WINDOWS)
+                items = {
+                    product: self.rng.randint(1, 3)
+                    for product in self.popular(
+                        products, self.rng.randint(1, 5)
+                    )
+                }
+                items_total = sum(
+                    product.price * quantity
+                    for product, quantity in items.items()
+                )
+                orders.append(Order(
+                    user=user,
+                    status=self.rng.choices(statuses, (80, 5, 5, 5, 5))[0],
+                    address=self.rng.choice(addresses_by_user[user.id]),
+                    delivery_date=created_at.date() + timedelta(days=1),
+                    delivery_time_from=window[0],
+                    delivery_time_to=window[1],
+                    delivery_price=Decimal('0.00'),
+                    items_total=items_total,
+                    total_price=items_total,
+                ))
+                created.append(created_at)
+                items_by_order.append(items)
+
+        # Номера резервируются одним блоком, а не обращением на заказ
+        last_number = OrderCounters.reserve(year, len(orders))
+        first_number = last_number - len(orders) + 1
+        for number, order in enumerate(orders, start=first_number):
+            order.order_number = f'{year:02d}{number}'
+        orders = Order.objects.bulk_create(orders, batch_size=1000)
+        # created_at — auto_now_add, при вставке всегда «сейчас»
+        for order, created_at in zip(orders, created):
+            order.created_at = created_at
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=1000)
+        OrderItem.objects.bulk_create(
+            (
+                OrderItem(
+                    order=order, product=product,
+                    quantity=quantity, price=product.price,
+                )
+                for order, items in zip(orders, items_by_order)
+                for product, quantity in items.items()
+            ),
+            batch_size=1000,
+        )
+        return orders
+
+    def create_carts(self, users, products, share):
+        available = [product for product in products if product.is_available]
+        cart_users = [user for user in users if self.rng.random() < share]
+        carts = ShoppingCart.objects.bulk_create(
+            (ShoppingCart(user=user) for user in cart_users),
+            batch_size=1000,
+        )
+        CartItem.objects.bulk_create(
+            (
+                CartItem(cart=cart, product=product,
+                         quantity=self.rng.randint(1, 3))
+                for cart in carts
+                for product in set(
+                    self.popular(available, self.rng.randint(1, 6))
+                )
+            ),
+            batch_size=1000,
+        )
+        return len(carts)
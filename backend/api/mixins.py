@@ -0,0 +1,45 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+from products.cache import CatalogCache
+
+
+class CatalogCacheListMixin:
+    """
+    Кеширует ответ list() публичного каталога в Redis.
+
+    Ключ учитывает слаг категории, страницу и размер страницы,
+    а также версию каталога, которая увеличивается сигналами products.
+    """
+
+    catalog_cache_prefix = None
+
+    def get_catalog_cache_key(self, request):
+        page_size = (
+            self.paginator.get_page_size(request) if self.paginator else None
+        )
+        if hasattr(self.paginator, 'get_page_token'):
+            page = self.paginator.get_page_token(request)
+        else:
+            page_query_param = (
+                getattr(self.paginator, 'page_query_param', None) or 'page'
+            )
+            page = request.query_params.get(page_query_param)
+        return CatalogCache.build_key(
+            self.catalog_cache_prefix or self.basename,
+            host=request.get_host(),
+            category=request.query_params.get('category'),
+            page=page,
+            page_size=page_size,
+        )
+
+    def list(self, request, *args, **kwargs):
+        cache_key = self.get_catalog_cache_key(request)
+        data = CatalogCache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            CatalogCache.set(cache_key, response.data)
+        return response
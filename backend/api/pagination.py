@@ -0,0 +1,80 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    ordering = 'id'
+
+
+class OrderCursorPagination(CursorPagination):
+    ordering = ('-created_at', 'id')
+
+
+class SelectablePagination(PageNumberPagination):
+    """
+    Постраничная пагинация с курсорным режимом по ?pagination=cursor.
+
+    Курсорный режим не делает COUNT(*) и OFFSET: страница выбирается
+    по значению ключа сортировки, поэтому её цена не зависит от глубины.
+    Без параметра ответ прежний, с count/next/previous.
+    """
+
+    mode_query_param = 'pagination'
+    cursor_pagination_class = None
+
+    def is_cursor_mode(self, request):
+        cursor_param = self.cursor_pagination_class.cursor_query_param
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or cursor_param in request.query_params
+        )
+
+    def get_page_token(self, request):
+        """Идентификатор страницы для ключа кеша."""
+        if self.is_cursor_mode(request):
+            cursor_param = self.cursor_pagination_class.cursor_query_param
+            return f'cursor:{request.query_params.get(cursor_param, "")}'
+        return request.query_params.get(self.page_query_param)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        cursor_parameters = [
+            parameter
+            for parameter in self.cursor_pagination_class()
+            .get_schema_operation_parameters(view)
+            if parameter['name']
+            == self.cursor_pagination_class.cursor_query_param
+        ]
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': (
+                    'cursor — курсорная пагинация без подсчёта count'
+                ),
+                'schema': {'type': 'string', 'enum': ['cursor']},
+            },
+            *cursor_parameters,
+        ]
+
+
+class ProductPagination(SelectablePagination):
+    cursor_pagination_class = ProductCursorPagination
+
+
+class OrderPagination(SelectablePagination):
+    cursor_pagination_class = OrderCursorPagination
@@ -5,10 +5,10 @@ from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
 from .serializers import (
-    CheckoutReadSerializer, CheckoutWriteSerializer, OrderDetailSerializer,
-    OrderListSerializer, OTPRequestSerializer, OTPVerifySerializer,
-    ProductDetailSerializer, ProductListSerializer, ShoppingCartReadSerializer,
-    ShoppingCartWriteSerializer, UserSerializer
+    CartItemUpsertSerializer, CheckoutReadSerializer, CheckoutWriteSerializer,
+    OrderDetailSerializer, OrderListSerializer, OTPRequestSerializer,
+    OTPVerifySerializer, ProductDetailSerializer, ProductListSerializer,
+    ShoppingCartReadSerializer, ShoppingCartWriteSerializer, UserSerializer
 )
 
 
@@ -224,7 +224,23 @@ cart_view_schema = extend_schema_view(
             description='Удаляет все товары из корзины текущего пользователя.',
             responses={204: None, **UNAUTHORIZED_RESPONSE},
         ),
-    ]
+    ],
+    item=extend_schema(
+        methods=['PATCH'],
+        operation_id='update_cart_item',
+        summary='Изменить одну позицию корзины',
+        tags=['CART'],
+        description=(
+            'Добавляет товар или меняет его количество в корзине. '
+            'quantity=0 удаляет товар из корзины.'
+        ),
+        request=CartItemUpsertSerializer,
+        responses={
+            200: ShoppingCartReadSerializer,
+            **VALIDATION_ERROR,
+            **UNAUTHORIZED_RESPONSE
+        },
+    ),
 )
 
 order_view_schema = extend_schema_view(
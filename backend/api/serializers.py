@@ -1,20 +1,22 @@
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 
 from django.conf import settings
-from django.db import transaction
 from django.utils import timezone
 from djoser.serializers import UserCreateSerializer
 from drf_spectacular.utils import extend_schema_field
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
 
 from core.constants import MAX_PRICE_DIGITS, PRICE_DECIMAL_PLACES
 from core.redis_client import RedisClient
 from deliveries.models import Delivery
-from deliveries.services import get_available_delivery_slots
+from deliveries.services import (
+    has_delivery_slot_capacity, is_delivery_slot_available
+)
 from orders.models import (
-    CartItem, Order, OrderItem, PaymentMethod, ShoppingCart,
+    CartItem, Order, OrderItem, PaymentMethod,
 )
 from products.models import Category, Ingredient, Product, ProductImage
 from users.models import Address, User
@@ -198,42 +200,18 @@ class ProductDetailSerializer(BaseProductSerializer):
     })
     def get_nutrients(self, obj):
         """
-        Возвращает агрегированные нутриенты ингредиентов продукта.
+        Возвращает предрассчитанные нутриенты продукта (ProductNutrient).
         """
-        links = obj.product_ingredients.all()
-        if not links:
-            return []
-        total_weight = sum(Decimal(link.amount_per_100g) for link in links)
-        if total_weight == 0:
-            return []
-        nutrients = {}
-
-        for link in links:
-            ingredient = link.ingredient
-            # Доля ингредиента в продукте
-            ratio = Decimal(link.amount_per_100g) / total_weight
-            # nutrient_links уже в памяти благодаря prefetch_related
-            for n_link in ingredient.nutrient_links.all():
-                nutrient = n_link.nutrient
-                key = nutrient.id
-
-                if key not in nutrients:
-                    nutrients[key] = {
-                        'name': nutrient.name,
-                        'amount_per_100g': n_link.amount_per_100g * ratio,
-                        'measurement_unit': nutrient.measurement_unit,
-                        'rda': nutrient.rda,
-                    }
-                else:
-                    nutrients[key]['amount_per_100g'] += (
-                        n_link.amount_per_100g * ratio
-                    )
-        for nutrient in nutrients.values():
-            nutrient['amount_per_100g'] = nutrient['amount_per_100g'].quantize(
-                Decimal('0.001'),
-                rounding=ROUND_HALF_UP
-            )
-        return list(nutrients.values())
+        # nutrient_totals и nutrient уже в памяти благодаря prefetch_related
+        return [
+            {
+                'name': total.nutrient.name,
+                'amount_per_100g': total.amount_per_100g,
+                'measurement_unit': total.nutrient.measurement_unit,
+                'rda': total.nutrient.rda,
+            }
+            for total in obj.nutrient_totals.all()
+        ]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -272,49 +250,99 @@ class CartItemSerializer(serializers.ModelSerializer):
         return obj.product.price * obj.quantity
 
 
-class ShoppingCartReadSerializer(serializers.ModelSerializer):
-    """Сериализатор корзины покупок пользователя - чтение."""
+class ShoppingCartReadSerializer(serializers.Serializer):
+    """
+    Сериализатор корзины покупок пользователя - чтение.
+    Принимает CartContents из хранилища корзины.
+    """
 
-    items = CartItemSerializer(source='items.all', many=True, read_only=True)
-    items_total = serializers.SerializerMethodField()
+    items = CartItemSerializer(many=True, read_only=True)
+    items_total = serializers.DecimalField(
+        max_digits=MAX_PRICE_DIGITS, decimal_places=PRICE_DECIMAL_PLACES,
+        read_only=True
+    )
 
-    class Meta:
-        model = ShoppingCart
-        fields = ('items', 'items_total')
 
-    def get_items_total(self, obj) -> Decimal:
-        return sum(
-            item.product.price * item.quantity for item in obj.items.all()
+class CartItemListSerializer(serializers.ListSerializer):
+    """
+    Проверяет товары всех позиций корзины одним запросом:
+    несуществующие и недоступные товары отклоняются.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        products = Product.objects.in_bulk(
+            {item['product_id'] for item in items}
         )
+        errors = []
+        for item in items:
+            product = products.get(item['product_id'])
+            if product is None:
+                errors.append({'product_id': [
+                    PrimaryKeyRelatedField.default_error_messages[
+                        'does_not_exist'
+                    ].format(pk_value=item['product_id'])
+                ]})
+            elif not product.is_available:
+                errors.append(
+                    {'product_id': [f'Товар "{product}" недоступен.']}
+                )
+            else:
+                errors.append({})
+                item['product'] = product
+        if any(errors):
+            raise ValidationError(errors)
+        return items
 
 
 class CartItemWriteSerializer(serializers.Serializer):
     """Сериализатор для записи позиции в корзину."""
 
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(),
-        source='product'
-    )
+    product_id = serializers.IntegerField(min_value=1)
     quantity = serializers.IntegerField(min_value=1)
 
+    class Meta:
+        list_serializer_class = CartItemListSerializer
+
 
 class ShoppingCartWriteSerializer(serializers.Serializer):
     """Сериализатор для обновления содержимого корзины."""
 
     items = CartItemWriteSerializer(many=True)
 
-    @transaction.atomic
     def update(self, instance, validated_data):
-        items_data = validated_data.get('items', [])
-        instance.items.all().delete()
-        CartItem.objects.bulk_create([
-            CartItem(
-                cart=instance,
-                product=item['product'],
-                quantity=item['quantity']
+        """instance — хранилище корзины (orders.cart_storage)."""
+        instance.replace_items({
+            item['product'].pk: item['quantity']
+            for item in validated_data.get('items', [])
+        })
+        return instance
+
+
+class CartItemUpsertSerializer(serializers.Serializer):
+    """
+    Сериализатор изменения одной позиции корзины.
+    quantity=0 удаляет товар из корзины.
+    """
+
+    product_id = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.all(),
+        source='product'
+    )
+    quantity = serializers.IntegerField(min_value=0)
+
+    def validate(self, attrs):
+        product = attrs['product']
+        if attrs['quantity'] and not product.is_available:
+            raise ValidationError(
+                {'product_id': f'Товар "{product}" недоступен.'}
             )
-            for item in items_data
-        ])
+        return attrs
+
+    def update(self, instance, validated_data):
+        instance.set_quantity(
+            validated_data['product'].pk, validated_data['quantity']
+        )
         return instance
 
 
@@ -381,6 +409,9 @@ class DeliverySlotSerializer(serializers.Serializer):
     time_from = serializers.TimeField()
     time_to = serializers.TimeField()
     display = serializers.CharField()
+    remaining = serializers.IntegerField(
+        allow_null=True, help_text='Свободных мест, null — без лимита.'
+    )
 
 
 class CheckoutReadSerializer(serializers.Serializer):
@@ -460,16 +491,18 @@ class CheckoutWriteSerializer(serializers.Serializer):
             )
 
             # Проверка, что выбранный слот доступен
-            available_slots = (
-                get_available_delivery_slots(checkout_started_at)
-            )
-            slot_valid = any(
-                s['date'] == data['delivery_date']
-                and s['time_from'] == data['delivery_time_from']
-                and s['time_to'] == data['delivery_time_to']
-                for s in available_slots
+            slot_valid = is_delivery_slot_available(
+                checkout_started_at, data['delivery_date'],
+                data['delivery_time_from'], data['delivery_time_to']
             )
             if not slot_valid:
                 raise ValidationError('Выбранный слот доставки недоступен.')
+            if not has_delivery_slot_capacity(
+                data['delivery_date'], data['delivery_time_from'],
+                data['delivery_time_to']
+            ):
+                raise ValidationError(
+                    'В выбранном слоте доставки закончились места.'
+                )
 
         return data
@@ -1,39 +1,102 @@
 import logging
+import sys
+from functools import lru_cache
 
 from django.conf import settings
-from telebot import TeleBot
-from telebot.apihelper import ApiTelegramException
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
-TELEGRAM_TOKEN = settings.TELEGRAM_BOT_TOKEN
-TELEGRAM_CHAT_ID = settings.TELEGRAM_CHAT_ID
 
-bot = TeleBot(token=TELEGRAM_TOKEN)
+class TelegramBackend:
+    """Отправка в Telegram-чат через TeleBot."""
 
+    def __init__(self):
+        # Проверяем переменные окружения при первом сообщении, а не при
+        # импорте: процессы, которые ничего не шлют, стартуют без токенов
+        missing_tokens = []
+        if not settings.TELEGRAM_BOT_TOKEN:
+            missing_tokens.append('BOT_TOKEN')
+        if not settings.TELEGRAM_CHAT_ID:
+            missing_tokens.append('TELEGRAM_CHAT_ID')
 
-# Проверяем переменные окружения при импорте
-missing_tokens = []
-if not TELEGRAM_TOKEN:
-    missing_tokens.append('BOT_TOKEN')
-if not TELEGRAM_CHAT_ID:
-    missing_tokens.append('TELEGRAM_CHAT_ID')
+        if missing_tokens:
+            error_msg = (
+                'Отсутствуют переменные окружения: '
+                f'{", ".join(missing_tokens)}'
+            )
+            raise ImproperlyConfigured(error_msg)
 
-if missing_tokens:
-    error_msg = (
-        f'Отсутствуют переменные окружения: {", ".join(missing_tokens)}'
-    )
-    logger.critical(error_msg)
-    raise RuntimeError(error_msg)
+        # telebot тяжёлый (~0.1 с импорта), загружаем только когда нужен
+        from telebot import TeleBot
+
+        self.bot = TeleBot(token=settings.TELEGRAM_BOT_TOKEN)
+        self.chat_id = settings.TELEGRAM_CHAT_ID
+
+    def send(self, text):
+        from telebot.apihelper import ApiTelegramException
+
+        try:
+            self.bot.send_message(self.chat_id, text)
+        except ApiTelegramException as e:
+            logger.error('Ошибка при отправке сообщения: %s', e)
+            return False
+        except Exception as e:
+            # Сетевые ошибки не роняют задачу: её падение снова ушло бы
+            # в Telegram через лог Celery
+            logger.error('Telegram недоступен: %s', e)
+            return False
+        logger.debug('Сообщение успешно отправлено')
+        return True
+
+
+class ConsoleBackend:
+    """Печатает сообщения в stdout (локальная разработка)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, text):
+        self.stream.write(f'{text}\n{"-" * 40}\n')
+        self.stream.flush()
+        return True
+
+
+class MemoryBackend:
+    """Копит сообщения в MemoryBackend.outbox (тесты)."""
+
+    outbox = []
+
+    def send(self, text):
+        self.outbox.append(text)
+        return True
+
+
+class NullBackend:
+    """Отбрасывает сообщения; подставляется, если бэкенд не настроен."""
+
+    def send(self, text):
+        return False
+
+
+@lru_cache
+def _build_notifier(backend_path):
+    # lru_cache не запоминает исключения: без подмены каждое сообщение
+    # заново падало бы и писало ошибку в лог
+    try:
+        return import_string(backend_path)()
+    except ImproperlyConfigured as e:
+        logger.error('Уведомления отключены: %s', e)
+        return NullBackend()
+
+
+def get_notifier():
+    """Клиент уведомлений из NOTIFIER_BACKEND, создаётся при первом вызове."""
+    return _build_notifier(settings.NOTIFIER_BACKEND)
 
 
 def send_telegram_message(message):
     """Отправляет сообщение в Telegram-чат."""
     logger.info('Отправка сообщения в чат-Telegram')
-    try:
-        bot.send_message(TELEGRAM_CHAT_ID, f'Pitalak:\n{message}')
-    except ApiTelegramException as e:
-        logger.error(f'Ошибка при отправке сообщения: {e}')
-    else:
-        logger.debug('Сообщение успешно отправлено')
-        return True
+    return get_notifier().send(f'Pitalak:\n{message}')
@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sessions = {}  # {имя: (pid, сессия)}
+
+
+def _build_session():
+    # Провайдеры принимают только POST, и он не идемпотентен: после
+    # таймаута чтения или 5xx от шлюза SMS могло уже уйти (и быть
+    # оплачено). Повторяем только ошибки соединения — запрос не ушёл
+    retry = Retry(
+        total=settings.HTTP_RETRY_TOTAL,
+        connect=settings.HTTP_RETRY_TOTAL,
+        read=0,
+        status=0,
+        other=0,
+        allowed_methods=None,
+        backoff_factor=settings.HTTP_RETRY_BACKOFF_FACTOR,
+        raise_on_status=False,  # Отдаём последний ответ в raise_for_status
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(name='default') -> requests.Session:
+    """
+    HTTP-сессия с keep-alive пулом соединений, одна на процесс.
+
+    После fork (воркеры Celery) дочерний процесс создаёт свою сессию,
+    чтобы не делить сокеты с родителем.
+    """
+    pid = os.getpid()
+    entry = _sessions.get(name)
+    if entry is None or entry[0] != pid:
+        with _lock:
+            entry = _sessions.get(name)
+            if entry is None or entry[0] != pid:
+                logger.debug('Создана HTTP-сессия %s (pid=%s)', name, pid)
+                entry = (pid, _build_session())
+                _sessions[name] = entry
+    return entry[1]
+
+
+def get_timeout():
+    """Раздельные таймауты: (соединение, чтение)."""
+    return settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT
+
+
+def build_async_client() -> httpx.AsyncClient:
+    """
+    Асинхронный клиент с keep-alive пулом. Живёт вместе с event loop
+    воркера доставки, повторяет только ошибки соединения.
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+        ),
+        transport=httpx.AsyncHTTPTransport(
+            retries=settings.HTTP_RETRY_TOTAL,
+            limits=httpx.Limits(
+                max_connections=settings.OTP_DELIVERY_CONCURRENCY,
+                max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+            ),
+        ),
+    )
@@ -0,0 +1,82 @@
+import asyncio
+import itertools
+import logging
+import time
+
+import httpx
+from django.conf import settings
+
+from .sms_provider import TargetSMSClient
+
+logger = logging.getLogger(__name__)
+
+
+class SMSBatcher:
+    """
+    Копит SMS в течение SMS_BATCH_WINDOW_SECONDS и отправляет их одним
+    запросом с несколькими абонентами.
+
+    Каждый вызывающий ждёт свой id_sms: ответ провайдера сопоставляется
+    по client_id_sms. Работает внутри одного event loop.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, window=None,
+                 max_size=None):
+        self.client = client
+        self.sms_client = TargetSMSClient()
+        self.window = (
+            settings.SMS_BATCH_WINDOW_SECONDS if window is None else window
+        )
+        self.max_size = max_size or settings.SMS_BATCH_MAX_SIZE
+        self._pending = []  # [(client_id_sms, телефон, текст, future)]
+        self._timer = None
+        self._submits = set()
+        self._counter = itertools.count()
+
+    async def send(self, phone: str, text: str) -> str | None:
+        """Ставит SMS в текущий пакет и ждёт id_sms (None — не принято)."""
+        loop = asyncio.get_running_loop()
+        phone = phone.lstrip('+')
+        client_id_sms = (
+            f'sms_{phone}_{int(time.time())}_{next(self._counter)}'
+        )
+        future = loop.create_future()
+        self._pending.append((client_id_sms, phone, text, future))
+
+        if len(self._pending) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """Отправляет накопленный пакет, не дожидаясь окна."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._submit(batch))
+        self._submits.add(task)
+        task.add_done_callback(self._submits.discard)
+
+    async def _submit(self, batch):
+        try:
+            message_ids = await self.sms_client.asend_batch(
+                [(client_id, phone, text)
+                 for client_id, phone, text, _ in batch],
+                self.client,
+            )
+        except Exception as e:
+            logger.error('Ошибка отправки пакета SMS: %s', e)
+            message_ids = {}
+        for client_id, _, _, future in batch:
+            if not future.done():
+                future.set_result(message_ids.get(client_id))
+
+    async def aclose(self):
+        """Отправляет остаток и дожидается незавершённых запросов."""
+        self.flush()
+        if self._submits:
+            await asyncio.gather(*self._submits)
@@ -2,26 +2,30 @@ import requests
 import logging
 from datetime import datetime, timedelta
 
+import httpx
 from django.conf import settings
 from django.utils.timezone import now
 
+from .http_session import get_session, get_timeout
+
 logger = logging.getLogger(__name__)
 
 
 class TargetSMSClient:
     """API клиент TargetSMS."""
 
+    HEADERS = {"Content-Type": "application/json; charset=utf-8"}
+
     def __init__(self):
         self.login = settings.SMS_PROVIDER_LOGIN
         self.password = settings.SMS_PROVIDER_PASSWORD
         self.sender = settings.SMS_PROVIDER_SENDER
         self.base_url = settings.SMS_PROVIDER_API_URL
-        self.timeout = 25
+        self.session = get_session()
+        self.timeout = get_timeout()
 
-    def send_sms(self, phone: str, otp: str):
-        """Отправка SMS с обработкой ошибок."""
-        phone = phone.lstrip('+')
-        payload = {
+    def _otp_payload(self, phone: str, otp: str) -> dict:
+        return {
             "security": {
                 "login": self.login,
                 "password": self.password
@@ -49,36 +53,42 @@ class TargetSMSClient:
                 }
             ]
         }
+
+    def _parse_send_response(self, phone: str, data: dict):
+        """Извлекает id_sms из ответа провайдера."""
+        result = data.get('sms', [])
+        if not result:
+            # Провайдер не вернул массив 'sms'
+            logger.error(
+                'Ошибка SMS провайдера для %s: Невалидный формат ответа - '
+                'нет массива "sms". %s', phone, result
+            )
+            return None
+        message_info = result[0]
+        if message_info.get('action') == 'send':
+            message_id = message_info.get('id_sms')
+            logger.info('SMS отправлено на %s, message_id=%s',
+                        phone, message_id)
+            return message_id
+        else:
+            action_status = message_info.get('action', 'N/A')
+            logger.error('Ошибка SMS провайдера для %s: Статус "%s".'
+                         ' Ответ: %s', phone, action_status, result)
+            return None
+
+    def send_sms(self, phone: str, otp: str):
+        """Отправка SMS с обработкой ошибок."""
+        phone = phone.lstrip('+')
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
-                json=payload,  # requests сериализует в JSON
+                json=self._otp_payload(phone, otp),
                 timeout=self.timeout,
-                headers={
-                    "Content-Type": "application/json; charset=utf-8"
-                }
+                headers=self.HEADERS
             )
             response.raise_for_status()   # Проверка HTTP-ошибок (4xx, 5xx)
             # Возвращаем десериализованный JSON-ответ
-            result = response.json().get('sms', [])
-            if not result:
-                # Провайдер не вернул массив 'sms'
-                logger.error(
-                    'Ошибка SMS провайдера для %s: Невалидный формат ответа - '
-                    'нет массива "sms". %s', phone, result
-                )
-                return None
-            message_info = result[0]
-            if message_info.get('action') == 'send':
-                message_id = message_info.get('id_sms')
-                logger.info('SMS отправлено на %s, message_id=%s',
-                            phone, message_id)
-                return message_id
-            else:
-                action_status = message_info.get('action', 'N/A')
-                logger.error('Ошибка SMS провайдера для %s: Статус "%s".'
-                             ' Ответ: %s', phone, action_status, result)
-                return None
+            return self._parse_send_response(phone, response.json())
 
         except requests.exceptions.RequestException as e:
             status_code = getattr(
@@ -92,6 +102,151 @@ class TargetSMSClient:
                          phone, e)
             return None
 
+    async def asend_sms(self, phone: str, otp: str,
+                        client: httpx.AsyncClient):
+        """Асинхронная отправка SMS через общий httpx.AsyncClient."""
+        phone = phone.lstrip('+')
+        try:
+            response = await client.post(
+                self.base_url,
+                json=self._otp_payload(phone, otp),
+                headers=self.HEADERS
+            )
+            response.raise_for_status()
+            return self._parse_send_response(phone, response.json())
+
+        except httpx.HTTPError as e:
+            status_code = getattr(
+                getattr(e, 'response', None), 'status_code', 'N/A'
+            )
+            logger.error('Ошибка сети/HTTP (%s) при отправке SMS на %s: %s',
+                         status_code, phone, e)
+            return None
+        except ValueError as e:
+            logger.error('Невалидный JSON ответ от SMS провайдера для %s: %s',
+                         phone, e)
+            return None
+
+    def _batch_payload(self, items: list[tuple[str, str, str]]) -> dict:
+        """
+        Один запрос на несколько абонентов.
+
+        items — список (client_id_sms, телефон, текст). Абоненты с
+        одинаковым текстом попадают в одно сообщение.
+        """
+        validity_period = (
+            now() + timedelta(seconds=settings.OTP_TTL_SECONDS)
+        ).strftime("%Y-%m-%d %H:%M")
+        messages = {}
+        for client_id_sms, phone, text in items:
+            messages.setdefault(text, []).append({
+                "phone": phone,
+                "number_sms": "1",
+                "client_id_sms": client_id_sms,
+                "validity_period": validity_period,
+            })
+        return {
+            "security": {
+                "login": self.login,
+                "password": self.password
+            },
+            "type": "sms",
+            "message": [
+                {
+                    "type": "sms",
+                    "sender": self.sender,
+                    "text": text,
+                    "name_delivery": "OTP Authorization",
+                    "abonent": abonents,
+                }
+                for text, abonents in messages.items()
+            ]
+        }
+
+    def _parse_batch_response(self, payload: dict,
+                              data: dict) -> dict[str, str | None]:
+        """
+        Сопоставляет id_sms с client_id_sms отправленных абонентов.
+
+        Если провайдер не вернул client_id_sms, используется порядок
+        абонентов в запросе.
+        """
+        client_ids = [
+            abonent['client_id_sms']
+            for message in payload['message']
+            for abonent in message['abonent']
+        ]
+        message_ids = dict.fromkeys(client_ids)
+        result = data.get('sms', [])
+        if not result:
+            logger.error(
+                'Ошибка SMS провайдера для пакета из %s: Невалидный формат '
+                'ответа - нет массива "sms". %s', len(client_ids), data
+            )
+            return message_ids
+
+        for position, message_info in enumerate(result):
+            client_id = message_info.get('client_id_sms')
+            if client_id is None and position < len(client_ids):
+                client_id = client_ids[position]
+            if client_id not in message_ids:
+                logger.warning('SMS провайдер вернул неизвестный '
+                               'client_id_sms: %s', message_info)
+                continue
+            if message_info.get('action') == 'send':
+                message_ids[client_id] = message_info.get('id_sms')
+            else:
+                logger.error('Ошибка SMS провайдера для %s: Статус "%s".',
+                             client_id, message_info.get('action', 'N/A'))
+
+        logger.info('Пакет SMS: отправлено %s из %s',
+                    sum(1 for i in message_ids.values() if i),
+                    len(message_ids))
+        return message_ids
+
+    def send_batch(
+        self, items: list[tuple[str, str, str]]
+    ) -> dict[str, str | None]:
+        """
+        Отправка пакета SMS одним запросом.
+
+        Возвращает {client_id_sms: id_sms}; None — сообщение не принято.
+        """
+        payload = self._batch_payload(items)
+        try:
+            response = self.session.post(
+                self.base_url,
+                json=payload,
+                timeout=self.timeout,
+                headers=self.HEADERS
+            )
+            response.raise_for_status()
+            return self._parse_batch_response(payload, response.json())
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error('Ошибка при отправке пакета из %s SMS: %s',
+                         len(items), e)
+            return {client_id: None for client_id, _, _ in items}
+
+    async def asend_batch(
+        self, items: list[tuple[str, str, str]], client: httpx.AsyncClient
+    ) -> dict[str, str | None]:
+        """Асинхронный вариант send_batch."""
+        payload = self._batch_payload(items)
+        try:
+            response = await client.post(
+                self.base_url,
+                json=payload,
+                headers=self.HEADERS
+            )
+            response.raise_for_status()
+            return self._parse_batch_response(payload, response.json())
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error('Ошибка при отправке пакета из %s SMS: %s',
+                         len(items), e)
+            return {client_id: None for client_id, _, _ in items}
+
     def get_balance(self):
         """
         Запрос баланса.
@@ -109,13 +264,11 @@ class TargetSMSClient:
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.base_url,
                 json=payload,
                 timeout=self.timeout,
-                headers={
-                    "Content-Type": "application/json; charset=utf-8"
-                }
+                headers=self.HEADERS
             )
             response.raise_for_status()
             return response.json()
@@ -132,7 +285,111 @@ class TelegramClient:
         self.tgm_url = settings.MSG_TELEGRAM_API_URL
         self.tgm_token = settings.MSG_TELEGRAM_API_TOKEN
         self.tgm_check_url = settings.MSG_CAN_SEND_ENDPOINT
-        self.timeout = 25
+        self.session = get_session()
+        self.timeout = get_timeout()
+
+    @property
+    def headers(self):
+        return {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Authorization': f'Bearer {self.tgm_token}',
+        }
+
+    def _parse_prepare_response(self, phone: str, data: dict) -> str | None:
+        # 1. Проверка флага ok
+        if not data.get('ok'):
+            logger.info(
+                'Telegram Gateway: отправка недоступна для %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        # 2. Проверка result
+        result = data.get('result')
+        if not isinstance(result, dict):
+            logger.error(
+                'Telegram Gateway invalid check response for %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        # 3. Извлекаем request_id
+        request_id = result.get('request_id')
+        if not request_id:
+            logger.error(
+                'Telegram Gateway отсутствует request_id в ответе %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        logger.debug(
+            'Telegram Gateway позволяет отправлять на %s, request_id=%s',
+            phone,
+            request_id,
+        )
+        return request_id
+
+    def _parse_send_response(self, phone: str, data: dict) -> str | None:
+        # 1. Базовая валидация
+        if not data.get('ok'):
+            logger.error(
+                'Telegram Gateway вернул ok=false для %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        result = data.get('result')
+        if not isinstance(result, dict):
+            logger.error(
+                'Telegram Gateway отсутствует result для %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        # 2. Проверка статуса доставки
+        delivery_status = result.get('delivery_status', {})
+        status = delivery_status.get('status')
+
+        if status != 'sent':
+            logger.error(
+                'Telegram Gateway SMS не отправлено %s.'
+                'Status=%s. Response=%s',
+                phone,
+                status,
+                data,
+            )
+            return None
+
+        # 3. request_id — идентификатор сообщения
+        request_id = result.get('request_id')
+        if not request_id:
+            logger.error(
+                'Telegram Gateway отсутствует request_id для %s: %s',
+                phone,
+                data,
+            )
+            return None
+
+        logger.info(
+            'Telegram Gateway SMS отправлено на %s, request_id=%s',
+            phone,
+            request_id,
+        )
+        return request_id
+
+    @staticmethod
+    def _send_payload(phone: str, otp: str, request_id: str) -> dict:
+        return {
+            'phone_number': phone,
+            'code': otp,
+            'ttl': 30,
+            'request_id': request_id,
+        }
 
     def prepare_send(self, phone: str) -> str | None:
         phone = phone.lstrip('+')
@@ -140,56 +397,48 @@ class TelegramClient:
             'phone_number': phone,
         }
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.tgm_check_url,
                 json=payload,
-                headers={
-                    'Content-Type': 'application/json; charset=utf-8',
-                    'Authorization': f'Bearer {self.tgm_token}',
-                },
+                headers=self.headers,
                 timeout=self.timeout,
             )
             response.raise_for_status()
+            return self._parse_prepare_response(phone, response.json())
 
-            data = response.json()
-
-            # 1. Проверка флага ok
-            if not data.get('ok'):
-                logger.info(
-                    'Telegram Gateway: отправка недоступна для %s: %s',
-                    phone,
-                    data,
-                )
-                return None
-
-            # 2. Проверка result
-            result = data.get('result')
-            if not isinstance(result, dict):
-                logger.error(
-                    'Telegram Gateway invalid check response for %s: %s',
-                    phone,
-                    data,
-                )
-                return None
-
-            # 3. Извлекаем request_id
-            request_id = result.get('request_id')
-            if not request_id:
-                logger.error(
-                    'Telegram Gateway отсутствует request_id в ответе %s: %s',
-                    phone,
-                    data,
-                )
-                return None
-
-            logger.debug(
-                'Telegram Gateway позволяет отправлять на %s, request_id=%s',
+        except requests.exceptions.RequestException as e:
+            status_code = getattr(
+                getattr(e, 'response', None), 'status_code', 'N/A'
+            )
+            logger.error(
+                'Telegram Gateway check HTTP error (%s) for %s: %s',
+                status_code,
                 phone,
-                request_id,
+                e,
             )
-            return request_id
+            return None
 
-        except requests.exceptions.RequestException as e:
+        except ValueError as e:
+            logger.error(
+                'Telegram Gateway returned invalid JSON during check %s: %s',
+                phone,
+                e,
+            )
+            return None
+
+    async def aprepare_send(self, phone: str,
+                            client: httpx.AsyncClient) -> str | None:
+        phone = phone.lstrip('+')
+        try:
+            response = await client.post(
+                self.tgm_check_url,
+                json={'phone_number': phone},
+                headers=self.headers,
+            )
+            response.raise_for_status()
+            return self._parse_prepare_response(phone, response.json())
+
+        except httpx.HTTPError as e:
             status_code = getattr(
                 getattr(e, 'response', None), 'status_code', 'N/A'
             )
@@ -212,77 +461,50 @@ class TelegramClient:
     def send_sms(self, phone: str, otp: str, request_id: str) -> str | None:
         phone = phone.lstrip('+')
 
-        payload = {
-            'phone_number': phone,
-            'code': otp,
-            'ttl': 30,
-            'request_id': request_id,
-        }
-
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.tgm_url,
-                json=payload,
-                headers={
-                    'Content-Type': 'application/json; charset=utf-8',
-                    'Authorization': f'Bearer {self.tgm_token}',
-                },
+                json=self._send_payload(phone, otp, request_id),
+                headers=self.headers,
                 timeout=self.timeout,
             )
             response.raise_for_status()
+            return self._parse_send_response(phone, response.json())
 
-            data = response.json()
-
-            # 1. Базовая валидация
-            if not data.get('ok'):
-                logger.error(
-                    'Telegram Gateway вернул ok=false для %s: %s',
-                    phone,
-                    data,
-                )
-                return None
-
-            result = data.get('result')
-            if not isinstance(result, dict):
-                logger.error(
-                    'Telegram Gateway отсутствует result для %s: %s',
-                    phone,
-                    data,
-                )
-                return None
-
-            # 2. Проверка статуса доставки
-            delivery_status = result.get('delivery_status', {})
-            status = delivery_status.get('status')
-
-            if status != 'sent':
-                logger.error(
-                    'Telegram Gateway SMS не отправлено %s.'
-                    'Status=%s. Response=%s',
-                    phone,
-                    status,
-                    data,
-                )
-                return None
-
-            # 3. request_id — идентификатор сообщения
-            request_id = result.get('request_id')
-            if not request_id:
-                logger.error(
-                    'Telegram Gateway отсутствует request_id для %s: %s',
-                    phone,
-                    data,
-                )
-                return None
+        except requests.exceptions.RequestException as e:
+            status_code = getattr(
+                getattr(e, 'response', None), 'status_code', 'N/A'
+            )
+            logger.error(
+                'Telegram Gateway HTTP error (%s) for %s: %s',
+                status_code,
+                phone,
+                e,
+            )
+            return None
 
-            logger.info(
-                'Telegram Gateway SMS отправлено на %s, request_id=%s',
+        except ValueError as e:
+            logger.error(
+                'Telegram Gateway вернул недействительный JSON для %s: %s',
                 phone,
-                request_id,
+                e,
             )
-            return request_id
+            return None
 
-        except requests.exceptions.RequestException as e:
+    async def asend_sms(self, phone: str, otp: str, request_id: str,
+                        client: httpx.AsyncClient) -> str | None:
+        phone = phone.lstrip('+')
+
+        try:
+            response = await client.post(
+                self.tgm_url,
+                json=self._send_payload(phone, otp, request_id),
+                headers=self.headers,
+            )
+            response.raise_for_status()
+            return self._parse_send_response(phone, response.json())
+
+        except httpx.HTTPError as e:
             status_code = getattr(
                 getattr(e, 'response', None), 'status_code', 'N/A'
             )
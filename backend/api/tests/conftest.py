@@ -84,6 +84,16 @@ def payment_method():
     return PaymentMethod.objects.create(name='OnlinePayment')
 
 
+@pytest.fixture
+def frozen_auth_client(user):
+    """Клиент с JWT авторизацией, время заморожено на 2026-03-04 03:00."""
+    with freeze_time('2026-03-04 03:00:00'):
+        client = APIClient()
+        token = str(AccessToken.for_user(user))
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        yield client
+
+
 # =================================
 # URL fixtures
 # =================================
@@ -0,0 +1,249 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from orders.cart_storage import DatabaseCartStorage, RedisCartStorage
+from orders.models import CartItem
+from orders.services import OrderService
+from orders.tasks import flush_dirty_carts_task
+from products.models import Product
+
+
+@pytest.fixture
+def cart_url():
+    return reverse('api:cart-me')
+
+
+@pytest.fixture
+def cart_item_url():
+    return reverse('api:cart-item')
+
+
+def test_cart_patch_applies_diff(
+    auth_client, cart_with_items, products, cart_url
+):
+    """PATCH корзины не пересоздаёт неизменённые позиции."""
+
+    first, second = products
+    kept_item = cart_with_items.items.get(product=first)
+
+    response = auth_client.patch(
+        cart_url,
+        {'items': [{'product_id': first.id, 'quantity': 3}]},
+        format='json'
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    items = list(cart_with_items.items.all())
+    assert len(items) == 1
+    # Та же строка, обновлено только количество
+    assert items[0].pk == kept_item.pk
+    assert items[0].quantity == 3
+    assert not CartItem.objects.filter(product=second).exists()
+
+
+def test_cart_item_upsert_and_remove(
+    auth_client, shopping_cart, products, cart_item_url
+):
+    """Одна позиция добавляется, меняется и удаляется без всей корзины."""
+
+    product = products[0]
+
+    response = auth_client.patch(
+        cart_item_url, {'product_id': product.id, 'quantity': 2},
+        format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['items'][0]['quantity'] == 2
+
+    auth_client.patch(
+        cart_item_url, {'product_id': product.id, 'quantity': 5},
+        format='json'
+    )
+    assert shopping_cart.items.get(product=product).quantity == 5
+
+    response = auth_client.patch(
+        cart_item_url, {'product_id': product.id, 'quantity': 0},
+        format='json'
+    )
+    assert response.data['items'] == []
+
+
+def test_cart_patch_resolves_products_in_one_query(
+    auth_client, shopping_cart, category, cart_url
+):
+    """Товары всех позиций корзины проверяются одним запросом."""
+
+    new_products = Product.objects.bulk_create(
+        Product(category=category, name=f'Товар{i}', price=10)
+        for i in range(10)
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = auth_client.patch(
+            cart_url,
+            {'items': [
+                {'product_id': product.id, 'quantity': 1}
+                for product in new_products
+            ]},
+            format='json'
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert shopping_cart.items.count() == 10
+    product_selects = [
+        query for query in ctx.captured_queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "products_product"' in query['sql']
+    ]
+    assert len(product_selects) == 1
+
+
+def test_cart_patch_rejects_unavailable_and_missing_products(
+    auth_client, shopping_cart, products, cart_url
+):
+    """Недоступный и несуществующий товары отклоняются по позициям."""
+
+    available, unavailable = products
+    unavailable.is_available = False
+    unavailable.save()
+
+    response = auth_client.patch(
+        cart_url,
+        {'items': [
+            {'product_id': available.id, 'quantity': 1},
+            {'product_id': unavailable.id, 'quantity': 1},
+            {'product_id': 999999, 'quantity': 1},
+        ]},
+        format='json'
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    errors = response.data['items']
+    assert errors[0] == {}
+    assert 'product_id' in errors[1]
+    assert 'product_id' in errors[2]
+    assert not shopping_cart.items.exists()
+
+
+@pytest.fixture
+def redis_cart_backend(settings):
+    settings.CART_STORAGE_BACKEND = 'orders.cart_storage.RedisCartStorage'
+
+
+def test_redis_cart_write_behind(
+    auth_client, user, products, cart_item_url, redis_cart_backend
+):
+    """Корзина в Redis попадает в БД только при сбросе."""
+
+    product = products[0]
+    response = auth_client.patch(
+        cart_item_url, {'product_id': product.id, 'quantity': 4},
+        format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['items'][0]['quantity'] == 4
+    assert not CartItem.objects.filter(cart__user=user).exists()
+
+    assert flush_dirty_carts_task() == 1
+    item = CartItem.objects.get(cart__user=user)
+    assert (item.product_id, item.quantity) == (product.id, 4)
+
+
+def test_redis_cart_loads_from_db(
+    auth_client, cart_with_items, cart_url, redis_cart_backend
+):
+    """Пустой ключ Redis заполняется корзиной из БД."""
+
+    response = auth_client.get(cart_url)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert {
+        item['product_id']: item['quantity']
+        for item in response.data['items']
+    } == {
+        item.product_id: item.quantity
+        for item in cart_with_items.items.all()
+    }
+
+
+def test_order_from_redis_cart(
+    user, products, mock_order_send, django_capture_on_commit_callbacks
+):
+    """Заказ собирается из Redis-корзины, после чего она очищается."""
+
+    storage = RedisCartStorage(user)
+    storage.replace_items({products[0].id: 2, products[1].id: 1})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order = OrderService.create_from_cart(storage)
+
+    assert {
+        item.product_id: item.quantity for item in order.items.all()
+    } == {products[0].id: 2, products[1].id: 1}
+    assert storage.contents().items == []
+
+
+def test_redis_cart_flush_drops_expired_key(user, redis_client):
+    """Истёкшая корзина не остаётся в множестве «грязных» навсегда."""
+
+    storage = RedisCartStorage(user)
+    redis_client.sadd(RedisCartStorage.DIRTY_KEY, user.pk)
+
+    storage.flush()
+
+    assert not redis_client.sismember(RedisCartStorage.DIRTY_KEY, user.pk)
+
+
+def test_redis_cart_change_during_flush_is_kept_dirty(
+    user, products, redis_client, mocker
+):
+    """Изменение во время записи в БД сохранится следующим сбросом."""
+
+    storage = RedisCartStorage(user)
+    storage.replace_items({products[0].id: 1})
+    replace_items = DatabaseCartStorage.replace_items
+
+    def concurrent_change(db_storage, quantities):
+        storage.set_quantity(products[1].id, 2)
+        replace_items(db_storage, quantities)
+
+    mocker.patch.object(
+        DatabaseCartStorage, 'replace_items', concurrent_change
+    )
+    storage.flush()
+    mocker.stopall()
+    assert flush_dirty_carts_task() == 1
+
+    assert {
+        item.product_id: item.quantity
+        for item in CartItem.objects.filter(cart__user=user)
+    } == {products[0].id: 1, products[1].id: 2}
+
+
+def test_redis_cart_falls_back_to_db_when_redis_down(
+    auth_client, user, products, cart_url, cart_item_url,
+    redis_cart_backend, mocker
+):
+    """Без Redis корзина читается и пишется через БД."""
+
+    mocker.patch(
+        'orders.cart_storage.RedisClient.connect',
+        side_effect=ConnectionError('Redis down')
+    )
+
+    response = auth_client.patch(
+        cart_item_url, {'product_id': products[0].id, 'quantity': 2},
+        format='json'
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = auth_client.get(cart_url)
+    assert response.status_code == status.HTTP_200_OK
+    assert [
+        (item['product_id'], item['quantity'])
+        for item in response.data['items']
+    ] == [(products[0].id, 2)]
+    assert CartItem.objects.get(cart__user=user).quantity == 2
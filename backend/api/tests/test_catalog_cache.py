@@ -0,0 +1,65 @@
+from django.urls import reverse
+from rest_framework import status
+
+
+def test_products_list_served_from_cache(
+    client, product_auto, django_assert_num_queries
+):
+    """Повторный запрос списка товаров не обращается к БД."""
+
+    url = reverse('api:products-list')
+    first = client.get(url)
+    assert first.status_code == status.HTTP_200_OK
+
+    with django_assert_num_queries(0):
+        second = client.get(url)
+
+    assert second.status_code == status.HTTP_200_OK
+    assert second.data == first.data
+
+
+def test_products_list_cache_key_depends_on_category(
+    client, product_auto, category
+):
+    """Фильтр по категории кешируется отдельно от общего списка."""
+
+    url = reverse('api:products-list')
+    assert client.get(url).data['count'] == 1
+
+    response = client.get(url, {'category': 'unknown'})
+
+    assert response.data['count'] == 0
+
+
+def test_products_list_cache_invalidated_on_product_save(
+    client, product_auto, django_capture_on_commit_callbacks
+):
+    """Сохранение продукта сбрасывает кеш каталога."""
+
+    url = reverse('api:products-list')
+    client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product_auto.name = 'Новое имя'
+        product_auto.save()
+
+    response = client.get(url)
+
+    assert response.data['results'][0]['name'] == 'Новое имя'
+
+
+def test_categories_list_cache_invalidated_on_category_save(
+    client, category, django_capture_on_commit_callbacks
+):
+    """Изменение категории сбрасывает кеш списка категорий."""
+
+    url = reverse('api:categories-list')
+    client.get(url)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        category.is_available = False
+        category.save()
+
+    response = client.get(url)
+
+    assert response.data['count'] == 0
@@ -75,3 +75,26 @@ def test_checkout_post_create_order(
     # Таск отправки Telegram вызван один раз с правильными параметрами
     mock_order_send.assert_called_once_with(order.order_number,
                                             user.name, user.phone)
+
+
+def test_checkout_marks_slot_reservation(
+    auth_client, delivery, payment_method, user_address, delivery_rule,
+    cart_with_items, checkout_url, mock_order_send
+):
+    """Заказ в слоте с лимитом помечается как занявший место."""
+
+    delivery_rule.capacity = 5
+    delivery_rule.save()
+    slot = auth_client.get(checkout_url).data['delivery_slots'][0]
+
+    response = auth_client.post(checkout_url, {
+        'delivery': delivery.id,
+        'payment_method': payment_method.id,
+        'address': user_address.id,
+        'delivery_date': slot['date'],
+        'delivery_time_from': slot['time_from'],
+        'delivery_time_to': slot['time_to'],
+    }, format='json')
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Order.objects.get(id=response.data['order_id']).slot_reserved
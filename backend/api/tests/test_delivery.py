@@ -1,8 +1,10 @@
-from datetime import time
+from datetime import date, time
 
 from rest_framework import status
 
 from deliveries.models import DeliveryRule
+from deliveries.services import SlotReservations
+from orders.models import Order
 
 
 def test_checkout_delivery_slots_structure(
@@ -54,7 +56,8 @@ def test_checkout_delivery_slots_filters_inactive(
             'date': '2026-03-05',
             'time_from': '10:00:00',
             'time_to': '12:00:00',
-            'display': '05.03 10:00-12:00'
+            'display': '05.03 10:00-12:00',
+            'remaining': None
         }
     ]
 
@@ -78,3 +81,32 @@ def test_checkout_delivery_slots_empty_when_no_matching_rules(
     assert response.data.get('delivery_slots') == [], (
         'Список слотов должен быть пустым, если время не совпало'
     )
+
+
+def test_checkout_delivery_slots_remaining_capacity(
+    checkout_url, frozen_auth_client, user, mock_order_send
+):
+    """Слот с лимитом показывает остаток мест и скрывается, когда заполнен."""
+
+    DeliveryRule.objects.create(
+        name='С лимитом',
+        time_from=time(0, 0), time_to=time(23, 59),
+        days_offset=1,
+        delivery_time_from=time(10, 0), delivery_time_to=time(12, 0),
+        capacity=2
+    )
+    order = Order.objects.create(
+        user=user, delivery_date=date(2026, 3, 5),
+        delivery_time_from=time(10, 0), delivery_time_to=time(12, 0),
+        slot_reserved=True
+    )
+
+    response = frozen_auth_client.get(checkout_url)
+    assert response.data['delivery_slots'][0]['remaining'] == 1
+
+    SlotReservations.reserve(
+        order.delivery_date, order.delivery_time_from,
+        order.delivery_time_to, capacity=2
+    )
+    response = frozen_auth_client.get(checkout_url)
+    assert response.data['delivery_slots'] == []
@@ -0,0 +1,52 @@
+from datetime import date, time
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from orders.models import Order
+from products.models import Product
+from users.models import Address
+
+
+@pytest.fixture
+def hot_dataset(user, category, cart_with_items, mock_order_send):
+    Product.objects.bulk_create(
+        Product(category=category, name=f'Товар{i}', price=10)
+        for i in range(50)
+    )
+    Address.objects.create(user=user, street='Ленина', house='1')
+    Order.objects.create(
+        user=user, delivery_date=date(2026, 1, 1),
+        delivery_time_from=time(18), delivery_time_to=time(21),
+    )
+
+
+def test_hot_queries_use_indexes(hot_dataset):
+    """Горячие запросы API не читают таблицы целиком."""
+
+    if connection.vendor != 'postgresql':
+        pytest.skip('EXPLAIN (ANALYZE, BUFFERS) есть только в PostgreSQL')
+    out = StringIO()
+
+    call_command('explain_hot_queries', '--disable-seqscan', stdout=out)
+
+    assert 'SEQ SCAN' not in out.getvalue()
+    assert 'OK        orders' in out.getvalue()
+
+
+def test_seq_scan_fails_command(hot_dataset, mocker):
+    """Полный проход по таблице завершает команду ошибкой."""
+
+    mocker.patch.object(connection, 'vendor', 'postgresql')
+    mocker.patch(
+        'api.management.commands.explain_hot_queries.Command.explain',
+        return_value=(
+            'Limit  (cost=0.00..0.31 rows=6 width=1)\n'
+            '  ->  Seq Scan on products_product  (cost=0.00..1.50 rows=29)'
+        ),
+    )
+
+    with pytest.raises(CommandError, match='products'):
+        call_command('explain_hot_queries', stdout=StringIO())
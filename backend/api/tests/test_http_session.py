@@ -0,0 +1,31 @@
+from api.services import http_session
+
+
+def test_session_reused_within_process():
+    """Клиенты одного процесса используют общую keep-alive сессию."""
+
+    assert http_session.get_session() is http_session.get_session()
+
+
+def test_session_recreated_after_fork(monkeypatch):
+    """После fork воркер получает собственную сессию."""
+
+    parent_session = http_session.get_session()
+    monkeypatch.setattr(http_session.os, 'getpid', lambda: -1)
+
+    assert http_session.get_session() is not parent_session
+
+
+def test_session_retries_connect_errors_only():
+    """
+    Повторяются только ошибки соединения: POST после таймаута чтения
+    или 5xx мог уже отправить SMS.
+    """
+
+    adapter = http_session.get_session().get_adapter('https://example.com')
+    retry = adapter.max_retries
+
+    assert retry.connect > 0
+    assert retry.read == 0
+    assert retry.status == 0
+    assert not retry.is_retry('POST', 502)
@@ -0,0 +1,56 @@
+import logging
+import subprocess
+import sys
+
+from api.services import bot_telegram
+from orders.tasks import send_order_created_message
+
+
+def test_order_message_goes_to_configured_backend(notifier_outbox):
+    """Уведомление уходит в бэкенд из NOTIFIER_BACKEND."""
+
+    send_order_created_message('A-1', 'Иван', '+79001234567')
+
+    assert notifier_outbox == [
+        'Pitalak:\nНовый заказ # A-1\n[Иван, +79001234567]'
+    ]
+
+
+def test_notifier_is_cached(settings):
+    """Клиент создаётся один раз на процесс."""
+
+    assert bot_telegram.get_notifier() is bot_telegram.get_notifier()
+
+
+def test_missing_tokens_disable_notifier_once(settings, caplog):
+    """Без токенов уведомления отключаются, ошибка пишется один раз."""
+
+    settings.NOTIFIER_BACKEND = 'api.services.bot_telegram.TelegramBackend'
+    settings.TELEGRAM_BOT_TOKEN = None
+    bot_telegram._build_notifier.cache_clear()
+
+    with caplog.at_level(logging.ERROR, logger=bot_telegram.__name__):
+        assert bot_telegram.send_telegram_message('первое') is False
+        assert bot_telegram.send_telegram_message('второе') is False
+
+    assert isinstance(bot_telegram.get_notifier(), bot_telegram.NullBackend)
+    errors = [r for r in caplog.records if r.levelno >= logging.ERROR]
+    assert len(errors) == 1
+    assert 'BOT_TOKEN' in errors[0].getMessage()
+    bot_telegram._build_notifier.cache_clear()
+
+
+def test_django_setup_does_not_import_telebot(settings):
+    """Запуск процесса не тянет telebot."""
+
+    code = (
+        'import sys, django; django.setup(); '
+        'import core.tasks, orders.tasks; '
+        'print(any(m.startswith("telebot") for m in sys.modules))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR,
+        capture_output=True, text=True, check=True,
+    )
+
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,61 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from orders.models import Order
+from products.models import Product
+
+
+def _collect_cursor_pages(client, url, params):
+    """Проходит все страницы по ссылкам next, возвращает id и SQL."""
+    ids, queries = [], []
+    response = client.get(url, params)
+    while True:
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        ids += [item['id'] for item in response.data['results']]
+        if not response.data['next']:
+            return ids, queries
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(response.data['next'])
+        queries += [query['sql'] for query in captured]
+
+
+def test_products_cursor_pagination(client, category):
+    """?pagination=cursor отдаёт товары по id без COUNT(*)."""
+
+    products = Product.objects.bulk_create(
+        Product(category=category, name=f'Товар{i}', price=10)
+        for i in range(8)
+    )
+
+    ids, queries = _collect_cursor_pages(
+        client, reverse('api:products-list'), {'pagination': 'cursor'}
+    )
+
+    assert ids == sorted(product.id for product in products)
+    assert not any('COUNT(' in sql for sql in queries)
+
+
+def test_products_page_number_pagination_by_default(client, category):
+    """Без параметра ответ прежний — с count и номерами страниц."""
+
+    Product.objects.create(category=category, name='Товар', price=10)
+
+    response = client.get(reverse('api:products-list'))
+
+    assert response.data['count'] == 1
+
+
+def test_orders_cursor_pagination(auth_client, user, mock_order_send):
+    """История заказов листается курсором от новых к старым."""
+
+    orders = [Order.objects.create(user=user) for _ in range(8)]
+
+    ids, queries = _collect_cursor_pages(
+        auth_client, reverse('api:orders-list'), {'pagination': 'cursor'}
+    )
+
+    assert ids == [order.id for order in reversed(orders)]
+    assert not any('COUNT(' in sql for sql in queries)
@@ -0,0 +1,172 @@
+"""
+Число SQL-запросов на эндпойнт не должно зависеть от размера ответа.
+
+Каждый сценарий замеряется дважды: на SMALL и на LARGE строках.
+Запросов должно быть одинаково (нет N+1) и не больше лимита сценария.
+"""
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from orders.models import CartItem, Order, OrderItem, ShoppingCart
+from products.models import (
+    Category, Ingredient, IngredientInProduct, Nutrient, NutrientInIngredient,
+    Product, ProductImage
+)
+from products.services import ProductService
+from users.models import Address
+
+SMALL = 1
+LARGE = 10
+
+
+@pytest.fixture
+def dataset(user, delivery, payment_method, user_address,
+            delivery_rule, mock_order_send):
+    """Общие объекты сценариев; сценарии добавляют к ним строки."""
+    order = Order.objects.create(
+        user=user, delivery=delivery, payment_method=payment_method,
+        address=user_address,
+    )
+    category = Category.objects.create(name='Категория', slug='category')
+    return {
+        'user': user,
+        'category': category,
+        'product': Product.objects.create(
+            category=category, name='Товар', price=100
+        ),
+        'cart': ShoppingCart.objects.create(user=user),
+        'order': order,
+    }
+
+
+def _create_products(dataset, count):
+    products = Product.objects.bulk_create(
+        Product(category=dataset['category'], name=f'Товар{i}', price=10)
+        for i in range(count)
+    )
+    ProductImage.objects.bulk_create(
+        ProductImage(product=product) for product in products
+    )
+    return products
+
+
+def _add_ingredients(dataset, count):
+    nutrient = Nutrient.objects.create(
+        name=f'Нутриент{Nutrient.objects.count()}', measurement_unit='мг',
+        rda=Decimal('100'),
+    )
+    for _ in range(count):
+        ingredient = Ingredient.objects.create(
+            name=f'Ингредиент{Ingredient.objects.count()}', proteins=1,
+            fats=1, carbs=1,
+        )
+        IngredientInProduct.objects.create(
+            product=dataset['product'], ingredient=ingredient,
+            amount_per_100g=1,
+        )
+        NutrientInIngredient.objects.create(
+            ingredient=ingredient, nutrient=nutrient, amount_per_100g=1
+        )
+    ProductService.recalc_nutrients([dataset['product'].id])
+
+
+def _add_categories(dataset, count):
+    start = Category.objects.count()
+    Category.objects.bulk_create(
+        Category(name=f'Категория{i}', slug=f'category-{i}')
+        for i in range(start, start + count)
+    )
+
+
+def _add_addresses(dataset, count):
+    Address.objects.bulk_create(
+        Address(user=dataset['user'], street='Ромашковая', house=str(i))
+        for i in range(count)
+    )
+
+
+def _add_cart_items(dataset, count):
+    CartItem.objects.bulk_create(
+        CartItem(cart=dataset['cart'], product=product)
+        for product in _create_products(dataset, count)
+    )
+
+
+def _add_orders(dataset, count):
+    for _ in range(count):
+        Order.objects.create(user=dataset['user'])
+
+
+def _add_order_items(dataset, count):
+    OrderItem.objects.bulk_create(
+        OrderItem(order=dataset['order'], product=product, price=10)
+        for product in _create_products(dataset, count)
+    )
+
+
+# эндпойнт: (добавление строк, URL, лимит запросов).
+# В лимит входит запрос пользователя из JWT.
+SCENARIOS = {
+    'products-list': (
+        _create_products, lambda d: reverse('api:products-list'), 4,
+    ),
+    'products-detail': (
+        _add_ingredients,
+        lambda d: reverse('api:products-detail', args=[d['product'].id]), 5,
+    ),
+    'categories-list': (
+        _add_categories, lambda d: reverse('api:categories-list'), 3,
+    ),
+    'categories-detail': (
+        _create_products,
+        lambda d: reverse('api:categories-detail', args=[d['category'].slug]),
+        2,
+    ),
+    'addresses-list': (
+        _add_addresses, lambda d: reverse('api:addresses-list'), 3,
+    ),
+    'users-me': (_add_addresses, lambda d: reverse('api:users-me'), 1),
+    'cart-me': (_add_cart_items, lambda d: reverse('api:cart-me'), 3),
+    'checkout-list': (
+        _add_cart_items, lambda d: reverse('api:checkout-list'), 6,
+    ),
+    'orders-list': (_add_orders, lambda d: reverse('api:orders-list'), 3),
+    'orders-detail': (
+        _add_order_items,
+        lambda d: reverse('api:orders-detail', args=[d['order'].id]), 3,
+    ),
+}
+
+
+def _count_queries(client, url):
+    cache.clear()  # Каталог кешируется — считаем запросы без кеша
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK, response.data
+    return len(captured)
+
+
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_query_count_does_not_grow_with_rows(name, auth_client, dataset):
+    """Число запросов не растёт с числом строк и не выше лимита."""
+
+    add_rows, url, max_queries = SCENARIOS[name]
+    url = url(dataset)
+
+    add_rows(dataset, SMALL)
+    small = _count_queries(auth_client, url)
+    add_rows(dataset, LARGE - SMALL)
+    large = _count_queries(auth_client, url)
+
+    assert large == small, (
+        f'{name}: {small} SQL на {SMALL} строк, {large} на {LARGE}'
+    )
+    assert large <= max_queries, (
+        f'{name}: {large} SQL, лимит {max_queries}'
+    )
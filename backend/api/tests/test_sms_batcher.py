@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import httpx
+
+from api.services.sms_batcher import SMSBatcher
+from api.services.sms_provider import TargetSMSClient
+
+
+def _provider_transport(requests_log, with_client_ids=True):
+    """Мок провайдера: принимает всех абонентов, ответ в обратном порядке."""
+
+    def handler(request):
+        payload = json.loads(request.content)
+        requests_log.append(payload)
+        abonents = [
+            abonent
+            for message in payload['message']
+            for abonent in message['abonent']
+        ]
+        sms = [
+            {
+                'action': 'send',
+                'id_sms': f"id-{abonent['phone']}",
+                **({'client_id_sms': abonent['client_id_sms']}
+                   if with_client_ids else {}),
+            }
+            for abonent in abonents
+        ]
+        if with_client_ids:
+            sms.reverse()
+        return httpx.Response(200, json={'sms': sms})
+
+    return httpx.MockTransport(handler)
+
+
+def test_batcher_sends_concurrent_sms_in_one_request(settings):
+    """SMS, пришедшие в одно окно, уходят одним запросом."""
+
+    settings.SMS_PROVIDER_API_URL = 'https://sms.example.com/api'
+    requests_log = []
+    phones = [f'+7900000000{i}' for i in range(5)]
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=_provider_transport(requests_log)
+        ) as client:
+            batcher = SMSBatcher(client, window=0.05)
+            return await asyncio.gather(*(
+                batcher.send(phone, f'Код для входа: {i}')
+                for i, phone in enumerate(phones)
+            ))
+
+    message_ids = asyncio.run(run())
+
+    assert len(requests_log) == 1
+    assert len(requests_log[0]['message']) == len(phones)
+    assert message_ids == [f"id-{phone.lstrip('+')}" for phone in phones]
+
+
+def test_batcher_flushes_full_batch_without_waiting(settings):
+    """Полный пакет отправляется сразу, не дожидаясь окна."""
+
+    settings.SMS_PROVIDER_API_URL = 'https://sms.example.com/api'
+    requests_log = []
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=_provider_transport(requests_log)
+        ) as client:
+            batcher = SMSBatcher(client, window=60, max_size=3)
+            return await asyncio.wait_for(asyncio.gather(*(
+                batcher.send(f'+7900000000{i}', 'Уведомление')
+                for i in range(6)
+            )), timeout=5)
+
+    message_ids = asyncio.run(run())
+
+    assert len(requests_log) == 2
+    # Одинаковый текст — одно сообщение с несколькими абонентами
+    assert len(requests_log[0]['message']) == 1
+    assert len(requests_log[0]['message'][0]['abonent']) == 3
+    assert all(message_ids)
+
+
+def test_send_batch_maps_ids_by_position(mocker, settings):
+    """Без client_id_sms в ответе id_sms сопоставляются по порядку."""
+
+    settings.SMS_PROVIDER_API_URL = 'https://sms.example.com/api'
+    sms_client = TargetSMSClient()
+    response = mocker.Mock()
+    response.json.return_value = {'sms': [
+        {'action': 'send', 'id_sms': 'id-1'},
+        {'action': 'error'},
+    ]}
+    mocker.patch.object(sms_client.session, 'post', return_value=response)
+
+    message_ids = sms_client.send_batch([
+        ('a', '79000000001', 'Код для входа: 1'),
+        ('b', '79000000002', 'Код для входа: 2'),
+    ])
+
+    assert message_ids == {'a': 'id-1', 'b': None}
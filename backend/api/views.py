@@ -3,6 +3,7 @@ import json
 import logging
 
 from django.conf import settings
+from django.db.models import Prefetch
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -17,22 +18,27 @@ from rest_framework_simplejwt.views import (
 from core.redis_client import RedisClient
 from deliveries.models import Delivery
 from deliveries.services import get_available_delivery_slots
-from orders.models import Order, PaymentMethod, ShoppingCart
+from orders.cart_storage import get_cart_storage
+from orders.models import Order, OrderItem, PaymentMethod, ShoppingCart
 from orders.services import OrderService
-from products.models import Category, Product
+from products.models import (
+    Category, IngredientInProduct, Product, ProductNutrient
+)
 from users.otp_manager import OTPManager
 from users.models import Address, User
+from .mixins import CatalogCacheListMixin
+from .pagination import OrderPagination, ProductPagination
 from .schemas import (
     address_schemas, cart_view_schema, category_view_schema,
     checkout_view_schema, order_view_schema, otp_view_set_schemas,
     product_view_schema, token_refresh_schema, user_me_schemas
 )
 from .serializers import (
-    AddressSerializer, CategorySerializer, CategoryDetailSerializer,
-    CheckoutReadSerializer, CheckoutWriteSerializer, OrderDetailSerializer,
-    OrderListSerializer, OTPRequestSerializer, OTPVerifySerializer,
-    ProductListSerializer, ProductDetailSerializer, ShoppingCartReadSerializer,
-    ShoppingCartWriteSerializer, UserSerializer
+    AddressSerializer, CartItemUpsertSerializer, CategorySerializer,
+    CategoryDetailSerializer, CheckoutReadSerializer, CheckoutWriteSerializer,
+    OrderDetailSerializer, OrderListSerializer, OTPRequestSerializer,
+    OTPVerifySerializer, ProductListSerializer, ProductDetailSerializer,
+    ShoppingCartReadSerializer, ShoppingCartWriteSerializer, UserSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -227,10 +233,11 @@ class AddressViewSet(viewsets.ModelViewSet):
 
 
 @product_view_schema
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheListMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only эндпойнт для Product API (list & retrieve)."""
 
     permission_classes = (AllowAny,)
+    pagination_class = ProductPagination
     queryset = (
         Product.objects
         .select_related('category')
@@ -245,7 +252,18 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             qs = qs.filter(category__slug=category_slug)
         if self.action == 'retrieve':
             return qs.prefetch_related(
-                'product_ingredients__ingredient__nutrient_links__nutrient'
+                Prefetch(
+                    'product_ingredients',
+                    queryset=IngredientInProduct.objects.select_related(
+                        'ingredient'
+                    )
+                ),
+                Prefetch(
+                    'nutrient_totals',
+                    queryset=ProductNutrient.objects.select_related(
+                        'nutrient'
+                    )
+                ),
             )
         return qs.filter(is_available=True).order_by('id')
 
@@ -256,23 +274,13 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 @category_view_schema
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogCacheListMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only эндпойнт для Category API (list & retrieve)."""
 
     permission_classes = (AllowAny,)
     queryset = Category.objects.filter(is_available=True).order_by('name')
     lookup_field = 'slug'
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        # Для retrieve добавляем prefetch
-        if self.action == 'retrieve':
-            return qs.prefetch_related(
-                'products__images',
-                'products__category'
-            )
-        return qs
-
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return CategoryDetailSerializer
@@ -294,44 +302,69 @@ class CartViewSet(viewsets.GenericViewSet):
         if self.action in ('me',):
             if self.request.method in ('PATCH',):
                 return ShoppingCartWriteSerializer
+        if self.action == 'item':
+            return CartItemUpsertSerializer
         return ShoppingCartReadSerializer
 
     @action(detail=False, methods=['get', 'patch', 'delete'], url_path='me')
     def me(self, request):
         """Эндпоинт /cart/me/ для текущего пользователя"""
-        cart, _ = ShoppingCart.objects.get_or_create(user=request.user)
+        storage = get_cart_storage(request.user)
 
         if request.method == 'GET':
-            serializer = self.get_serializer(cart)
+            serializer = self.get_serializer(storage.contents())
             return Response(serializer.data)
 
         elif request.method == 'PATCH':
             write_serializer = self.get_serializer(
-                cart,
+                storage,
                 data=request.data
             )
             write_serializer.is_valid(raise_exception=True)
             write_serializer.save()
-            read_serializer = ShoppingCartReadSerializer(cart)
+            read_serializer = ShoppingCartReadSerializer(storage.contents())
             return Response(read_serializer.data)
 
         elif request.method == 'DELETE':
-            cart.items.all().delete()
+            storage.clear()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['patch'], url_path='me/item')
+    def item(self, request):
+        """
+        Эндпоинт /cart/me/item/: изменяет одну позицию корзины,
+        не пересылая корзину целиком.
+        """
+        storage = get_cart_storage(request.user)
+        serializer = self.get_serializer(storage, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(ShoppingCartReadSerializer(storage.contents()).data)
+
 
 @order_view_schema
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     """Эндпойнт заказов текущего пользователя."""
 
     permission_classes = (IsAuthenticated,)
+    pagination_class = OrderPagination
 
     def get_queryset(self):
         """Возвращаем заказы только текущего пользователя."""
-        return (
+        qs = (
             Order.objects.filter(user=self.request.user)
             .order_by('-created_at')
         )
+        if self.action == 'retrieve':
+            return qs.select_related(
+                'delivery', 'address', 'payment_method'
+            ).prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=OrderItem.objects.select_related('product')
+                )
+            )
+        return qs
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -354,21 +387,14 @@ class CheckoutViewSet(viewsets.GenericViewSet):
         )
 
     def get_cart(self):
-        cart, _ = ShoppingCart.objects.prefetch_related(
-            'items__product'
-        ).get_or_create(user=self.request.user)
-
-        return cart
+        return get_cart_storage(self.request.user).contents()
 
     def list(self, request, *args, **kwargs):
         """Получение данных для checkout."""
         cart = self.get_cart()
         user = self.request.user
 
-        subtotal = sum(
-            item.product.price * item.quantity
-            for item in cart.items.all()
-        )
+        subtotal = cart.items_total
 
         checkout_started_at = timezone.now()
         with RedisClient.connect() as conn:
@@ -390,7 +416,7 @@ class CheckoutViewSet(viewsets.GenericViewSet):
 
         serializer = self.get_serializer({
             'checkout_started_at': checkout_started_at,
-            'items': cart.items.all(),
+            'items': cart.items,
             'deliveries': deliveries,
             'delivery_slots': slots,
             'payment_methods': payment_methods,
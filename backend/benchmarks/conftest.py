@@ -0,0 +1,146 @@
+"""
+Замеры API на наполненной базе.
+
+Запуск отдельно от обычных тестов (данные seed_dataset живут всю сессию):
+    pytest benchmarks --benchmark
+    pytest benchmarks --benchmark --benchmark-update-baseline
+"""
+import gc
+import json
+import statistics
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+RESULTS_KEY = pytest.StashKey[dict]()
+
+WARMUP = 3
+REPEAT = 100
+# На коротких эндпойнтах относительный допуск меньше шума таймера
+P95_SLACK_MS = 5
+
+# Масштаб набора данных для замеров
+DATASET = {
+    'categories': 12,
+    'products': 1000,
+    'ingredients': 300,
+    'nutrients': 25,
+    'users': 1000,
+    'orders_per_user': 4,
+    'carts': 0.3,
+    'seed': 42,
+}
+
+
+@pytest.fixture(scope='session')
+def benchmark_dataset(request, django_db_setup, django_db_blocker):
+    """Наполняет тестовую базу один раз на сессию."""
+    if not request.config.getoption('--benchmark'):
+        pytest.skip('Замеры запускаются с флагом --benchmark')
+    with django_db_blocker.unblock():
+        call_command('seed_dataset', verbosity=0, **DATASET)
+
+
+def _measure(send, setup=None):
+    """
+    Прогревает эндпойнт и замеряет REPEAT запросов; setup вызывается
+    перед каждым запросом и в замер не входит. Сборщик мусора
+    на время замера выключен, как в timeit: после наполнения базы полный
+    проход gc даёт выбросы в десятки миллисекунд.
+    """
+    for _ in range(WARMUP):
+        if setup:
+            setup()
+        send()
+    timings, queries = [], []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(REPEAT):
+            if setup:
+                setup()
+            with CaptureQueriesContext(connection) as captured:
+                started = perf_counter()
+                response = send()
+                timings.append((perf_counter() - started) * 1000)
+            assert response.status_code < 400, response.data
+            queries.append(len(captured))
+    finally:
+        gc.enable()
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(statistics.quantiles(timings, n=20)[18], 2),
+        'queries': max(queries),
+    }
+
+
+@pytest.fixture
+def benchmark(request, benchmark_dataset, db):
+    """
+    Замеряет эндпойнт и сравнивает с baseline.json: число SQL-запросов
+    не должно расти, p95 — не больше чем на --benchmark-tolerance
+    (но не меньше чем на P95_SLACK_MS).
+    """
+    config = request.config
+    results = config.stash.setdefault(RESULTS_KEY, {})
+
+    def run(name, send, setup=None):
+        result = _measure(send, setup)
+        results[name] = result
+        if config.getoption('--benchmark-update-baseline'):
+            return result
+
+        baseline = json.loads(BASELINE_PATH.read_text()).get(name)
+        assert baseline, (
+            f'{name}: нет в baseline.json, запустите с '
+            '--benchmark-update-baseline'
+        )
+        assert result['queries'] <= baseline['queries'], (
+            f'{name}: SQL-запросов {result["queries"]}, '
+            f'в baseline {baseline["queries"]}'
+        )
+        limit = max(
+            baseline['p95_ms'] * (
+                1 + config.getoption('--benchmark-tolerance')
+            ),
+            baseline['p95_ms'] + P95_SLACK_MS,
+        )
+        assert result['p95_ms'] <= limit, (
+            f'{name}: p95 {result["p95_ms"]} мс, допустимо {limit:.2f} мс'
+        )
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session):
+    results = session.config.stash.get(RESULTS_KEY, None)
+    if results and session.config.getoption('--benchmark-update-baseline'):
+        baseline = (
+            json.loads(BASELINE_PATH.read_text())
+            if BASELINE_PATH.exists() else {}
+        )
+        baseline.update(results)
+        BASELINE_PATH.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + '\n'
+        )
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(RESULTS_KEY, None)
+    if not results:
+        return
+    terminalreporter.section('API benchmarks')
+    terminalreporter.write_line(
+        f'{"endpoint":<32}{"p50, мс":>10}{"p95, мс":>10}{"SQL":>6}'
+    )
+    for name, result in sorted(results.items()):
+        terminalreporter.write_line(
+            f'{name:<32}{result["p50_ms"]:>10}{result["p95_ms"]:>10}'
+            f'{result["queries"]:>6}'
+        )
@@ -0,0 +1,114 @@
+import itertools
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from benchmarks.conftest import REPEAT, WARMUP
+from orders.models import ShoppingCart
+from products.cache import CatalogCache
+from products.models import Product
+
+
+def invalidate_catalog():
+    """Новая версия каталога: следующий запрос идёт мимо кеша."""
+    CatalogCache.bump_version(reason='benchmark')
+
+
+# Номера вне диапазона seed_dataset: лимиты OTP считаются по номеру
+otp_phones = (f'+7998{i:07d}' for i in itertools.count())
+
+
+@pytest.fixture
+def cart_client(benchmark_dataset, db):
+    """Клиент покупателя с непустой корзиной."""
+    cart = (
+        ShoppingCart.objects.filter(items__isnull=False)
+        .order_by('id').first()
+    )
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(cart.user)}'
+    )
+    return client
+
+
+def test_products_list(client, benchmark):
+    """Каталог после прогрева отдаётся из кеша."""
+    url = reverse('api:products-list')
+    benchmark('products_list', lambda: client.get(url))
+
+
+def test_products_list_cursor(client, benchmark):
+    url = reverse('api:products-list')
+    benchmark(
+        'products_list_cursor',
+        lambda: client.get(url, {'pagination': 'cursor'})
+    )
+
+
+def test_products_list_uncached(client, benchmark):
+    """Каталог без кеша: запросы к БД на наполненной базе."""
+    url = reverse('api:products-list')
+    benchmark(
+        'products_list_uncached', lambda: client.get(url),
+        setup=invalidate_catalog,
+    )
+
+
+def test_products_list_cursor_uncached(client, benchmark):
+    url = reverse('api:products-list')
+    benchmark(
+        'products_list_cursor_uncached',
+        lambda: client.get(url, {'pagination': 'cursor'}),
+        setup=invalidate_catalog,
+    )
+
+
+def test_product_detail(client, benchmark):
+    product = Product.objects.filter(is_available=True).order_by('id').first()
+    url = reverse('api:products-detail', args=[product.id])
+    benchmark('product_detail', lambda: client.get(url))
+
+
+def test_cart_me(cart_client, benchmark):
+    url = reverse('api:cart-me')
+    benchmark('cart_me', lambda: cart_client.get(url))
+
+
+def test_checkout(cart_client, benchmark):
+    url = reverse('api:checkout-list')
+    benchmark('checkout', lambda: cart_client.get(url))
+
+
+def test_orders_list(cart_client, benchmark):
+    url = reverse('api:orders-list')
+    benchmark('orders_list', lambda: cart_client.get(url))
+
+
+def test_otp_send(client, otp_send_url, mock_send_sms, benchmark):
+    benchmark('otp_send', lambda: client.post(
+        otp_send_url, {'phone': next(otp_phones)}, format='json'
+    ))
+
+
+def test_otp_verify(
+    client, otp_send_url, otp_verify_url, mock_send_sms, benchmark
+):
+    def request_code():
+        phone = next(otp_phones)
+        client.post(otp_send_url, {'phone': phone}, format='json')
+        _, otp = mock_send_sms.call_args.args
+        return phone, otp
+
+    # Коды одноразовые: запрашиваем заранее, в замер входит только проверка
+    codes = iter([request_code() for _ in range(WARMUP + REPEAT)])
+
+    def send():
+        phone, otp = next(codes)
+        return client.post(
+            otp_verify_url, {'phone': phone, 'otp': otp}, format='json'
+        )
+
+    benchmark('otp_verify', send)
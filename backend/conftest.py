@@ -3,21 +3,39 @@ from decimal import Decimal
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework.test import APIClient
 
 
+from api.services.bot_telegram import MemoryBackend
+from api.services.sms_provider import TargetSMSClient
 from core.redis_client import RedisClient
 from deliveries.models import DeliveryRule
 from products.models import Category, Product
-from users.otp_manager import OTPManager
 
 
 User = get_user_model()
 
 
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'Замеры API (каталог benchmarks)')
+    group.addoption(
+        '--benchmark', action='store_true',
+        help='Запустить замеры API на сгенерированном наборе данных.'
+    )
+    group.addoption(
+        '--benchmark-update-baseline', action='store_true',
+        help='Записать результаты замеров в benchmarks/baseline.json.'
+    )
+    group.addoption(
+        '--benchmark-tolerance', type=float, default=0.5,
+        help='Допустимый рост p95 относительно baseline (0.5 = +50%%).'
+    )
+
+
 def pytest_sessionstart(session):
     """
     Проверка доступности Redis перед стартом тестов.
@@ -38,6 +56,20 @@ def pytest_sessionstart(session):
         )
 
 
+@pytest.fixture(autouse=True)
+def notifier_outbox(settings):
+    """Уведомления в тестах копятся в памяти, а не уходят в Telegram."""
+    settings.NOTIFIER_BACKEND = 'api.services.bot_telegram.MemoryBackend'
+    MemoryBackend.outbox.clear()
+    return MemoryBackend.outbox
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Сбрасываем кеш (Redis) перед каждым тестом, т.к. БД откатывается."""
+    cache.clear()
+
+
 @pytest.fixture
 def mock_send_sms(mocker):
     """Мок для асинхронной отправки OTP через Celery."""
@@ -48,13 +80,10 @@ def mock_send_sms(mocker):
 def mock_sms_balance(mocker):
     """Подменяем метод получения баланса во всех тестах."""
 
-    mock_instance = mocker.patch(
-        'admin_extensions.context_processors.TargetSMSClient'
-    ).return_value
-    mock_instance.get_balance.return_value = (
-        {'money': {'value': '999.99', 'currency': 'RUR'}}
+    return mocker.patch.object(
+        TargetSMSClient, 'get_balance',
+        return_value={'money': {'value': '999.99', 'currency': 'RUR'}},
     )
-    return mock_instance
 
 
 @pytest.fixture
@@ -79,11 +108,8 @@ def auth_otp_flow(
         assert send_res.status_code == status.HTTP_200_OK, \
             f'Ошибка при отправке OTP: {send_res.data}'
 
-        # Достаем код из Redis через менеджер
-        keys = OTPManager._get_keys(phone)
-        otp_data = redis_client.hgetall(keys['otp'])
-
-        correct_code = otp_data.get(b'otp').decode()
+        # Достаем код из 'отправленной' SMS (в Redis лежит только хеш)
+        _, correct_code = mock_send_sms.call_args.args
 
         # Возвращаем результат верификации
         return client.post(
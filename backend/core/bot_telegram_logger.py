@@ -1,20 +1,67 @@
 import logging
 from textwrap import shorten
 
-from .constants import MAX_TG_LOG_MESSAGE_LENGTH
+from .constants import (
+    MAX_TG_DIGEST_LENGTH, MAX_TG_LOG_MESSAGE_LENGTH,
+    TG_LOG_FLUSH_INTERVAL_SECONDS, TG_LOG_QUEUE_SIZE
+)
+from .log_handlers import BufferedHandler
 from .tasks import send_log_to_telegram
 
 
-class TelegramHandler(logging.Handler):
-    """Логгер, шлёт уведомления об ошибках в Telegram."""
+class TelegramHandler(BufferedHandler):
+    """
+    Логгер, шлёт уведомления об ошибках в Telegram сводками.
 
-    def emit(self, record):
-        try:
-            msg = self.format(record)
-            msg = shorten(
-                msg, width=MAX_TG_LOG_MESSAGE_LENGTH,
-                placeholder='\n…(truncated)'
-            )
-            send_log_to_telegram.delay(msg)
-        except Exception:
-            pass
+    Раз в flush_interval секунд одинаковые сообщения схлопываются, и на
+    всю сводку ставится одна задача Celery. Записи самого отправителя
+    не пересылаются: его ошибки иначе возвращались бы в следующую сводку.
+    """
+
+    ignored_loggers = ('api.services.bot_telegram',)
+
+    def __init__(self, level=logging.NOTSET,
+                 flush_interval=TG_LOG_FLUSH_INTERVAL_SECONDS,
+                 capacity=TG_LOG_QUEUE_SIZE):
+        super().__init__(level, flush_interval, capacity)
+
+    def filter(self, record):
+        if record.name.startswith(self.ignored_loggers):
+            return False
+        return super().filter(record)
+
+    def prepare(self, record):
+        key = (record.levelno, record.name, record.getMessage())
+        msg = shorten(
+            self.format(record), width=MAX_TG_LOG_MESSAGE_LENGTH,
+            placeholder='\n…(truncated)'
+        )
+        return key, msg
+
+    @staticmethod
+    def build_digest(items, dropped):
+        groups = {}  # {ключ: [сообщение, повторы]}
+        for key, msg in items:
+            if key in groups:
+                groups[key][1] += 1
+            else:
+                groups[key] = [msg, 1]
+
+        parts = []
+        length = 0
+        skipped = 0
+        for msg, count in groups.values():
+            part = msg if count == 1 else f'{msg}\n(повторов: {count})'
+            if length + len(part) > MAX_TG_DIGEST_LENGTH:
+                skipped += 1
+                continue
+            parts.append(part)
+            length += len(part) + 2
+        if skipped:
+            parts.append(f'…и ещё сообщений: {skipped}')
+        if dropped:
+            parts.append(f'Отброшено при переполнении: {dropped}')
+        return '\n\n'.join(parts)
+
+    def send(self, items, dropped):
+        send_log_to_telegram.delay(self.build_digest(items, dropped))
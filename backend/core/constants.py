@@ -1,8 +1,14 @@
+DB_LOG_BATCH_SIZE = 500  # Записей StatusLog в одном INSERT
+DB_LOG_FLUSH_INTERVAL_SECONDS = 2  # Период записи логов в БД
+DB_LOG_QUEUE_SIZE = 10000  # Записей в буфере БД-логов, сверх — отбрасываются
 MAX_CHAR_LENGTH = 256
 MAX_INGREDIENT_LENGTH = 128
 MAX_PRICE_DIGITS = 10
 MAX_SLUG_LENGTH = 50
 MAX_STR_LENGTH = 40
+MAX_TG_DIGEST_LENGTH = 4000  # Лимит Telegram на сообщение — 4096 символов
 MAX_TG_LOG_MESSAGE_LENGTH = 300  # Ограничение длины текста ошибки для Telegram
 MAX_UNIT_LENGTH = 16
 PRICE_DECIMAL_PLACES = 2  # Количество цифр после запятой
+TG_LOG_FLUSH_INTERVAL_SECONDS = 30  # Период отправки сводки логов в Telegram
+TG_LOG_QUEUE_SIZE = 1000  # Записей в буфере, сверх — отбрасываются
@@ -0,0 +1,153 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import traceback
+
+from django.db import close_old_connections
+from django_db_logger.config import DJANGO_DB_LOGGER_ENABLE_FORMATTER
+from django_db_logger.db_log_handler import DatabaseLogHandler
+
+from .constants import (
+    DB_LOG_BATCH_SIZE, DB_LOG_FLUSH_INTERVAL_SECONDS, DB_LOG_QUEUE_SIZE
+)
+
+
+class BufferedHandler(logging.Handler):
+    """
+    Основа обработчиков с фоновой отправкой.
+
+    emit только кладёт подготовленную запись в ограниченную очередь и не
+    блокирует поток запроса: при переполнении запись отбрасывается и
+    учитывается в dropped. Фоновый поток раз в flush_interval секунд
+    забирает накопленное и передаёт в send.
+    """
+
+    def __init__(self, level=logging.NOTSET, flush_interval=1, capacity=1000):
+        super().__init__(level)
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=capacity)
+        self.dropped = 0
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def prepare(self, record):
+        """Элемент очереди для записи; вызывается в потоке запроса."""
+        raise NotImplementedError
+
+    def send(self, items, dropped):
+        """Отправка накопленного; вызывается в фоновом потоке."""
+        raise NotImplementedError
+
+    def emit(self, record):
+        # Ошибки самой отправки не должны попадать обратно в буфер
+        if threading.current_thread() is self._thread:
+            return
+        try:
+            self._ensure_thread()
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def _ensure_thread(self):
+        # После fork (gunicorn, Celery) поток родителя в дочернем не живёт
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self.lock:
+            if self._pid != pid:
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name=f'{type(self).__name__}-flusher',
+                    daemon=True,
+                )
+                self._thread.start()
+                self._pid = pid
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _drain(self):
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        dropped, self.dropped = self.dropped, 0
+        return items, dropped
+
+    def flush(self):
+        items, dropped = self._drain()
+        if not items and not dropped:
+            return
+        try:
+            self.send(items, dropped)
+        except Exception:
+            # Потерянная пачка войдёт в счётчик следующей отправки.
+            # Писать ошибку в logging нельзя: запись вернулась бы сюда же
+            self.dropped += len(items) + dropped
+            sys.stderr.write(
+                f'{type(self).__name__}: не удалось отправить '
+                f'записей: {len(items)}\n'
+            )
+            traceback.print_exc(file=sys.stderr)
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+        super().close()
+
+
+class BufferedDatabaseLogHandler(BufferedHandler, DatabaseLogHandler):
+    """
+    Замена DatabaseLogHandler: записи StatusLog пишутся пачками через
+    bulk_create из фонового потока, а не INSERT на каждую строку лога.
+
+    Время создания записи — момент сброса пачки (auto_now_add).
+    """
+
+    def __init__(self, level=logging.NOTSET,
+                 flush_interval=DB_LOG_FLUSH_INTERVAL_SECONDS,
+                 capacity=DB_LOG_QUEUE_SIZE, batch_size=DB_LOG_BATCH_SIZE):
+        super().__init__(level, flush_interval, capacity)
+        self.batch_size = batch_size
+        self.dropped_total = 0
+
+    def prepare(self, record):
+        trace = None
+        if record.exc_info:
+            trace = logging.Formatter().formatException(record.exc_info)
+        return {
+            'logger_name': record.name,
+            'level': record.levelno,
+            'msg': (
+                self.format(record) if DJANGO_DB_LOGGER_ENABLE_FORMATTER
+                else record.getMessage()
+            ),
+            'trace': trace,
+        }
+
+    def send(self, items, dropped):
+        from django_db_logger.models import StatusLog
+
+        logs = [StatusLog(**kwargs) for kwargs in items]
+        if dropped:
+            self.dropped_total += dropped
+            logs.append(StatusLog(
+                logger_name=__name__,
+                level=logging.WARNING,
+                msg=(
+                    f'Буфер логов переполнен, отброшено записей: {dropped} '
+                    f'(всего с запуска: {self.dropped_total})'
+                ),
+            ))
+        close_old_connections()
+        StatusLog.objects.bulk_create(logs, batch_size=self.batch_size)
@@ -1,13 +1,57 @@
 import logging
 from contextlib import contextmanager
+from time import perf_counter
 
 from django_redis import get_redis_connection
+from redis import Redis
+from redis.client import Pipeline
 from redis.exceptions import ConnectionError, RedisError
 from rest_framework.exceptions import Throttled
 
+from core.request_timing import current_timings
+
 logger = logging.getLogger(__name__)
 
 
+class InstrumentedPipeline(Pipeline):
+    """Пайплайн, который учитывается в замерах как одно обращение."""
+
+    def execute(self, raise_on_error=True):
+        timings = current_timings()
+        if timings is None:
+            return super().execute(raise_on_error)
+        started = perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            timings.add_redis(started)
+
+
+class InstrumentedRedis(Redis):
+    """
+    Клиент Redis с учётом команд в RequestTimingMiddleware.
+
+    Подключается через REDIS_CLIENT_CLASS в CACHES, поэтому общий
+    и для django-redis, и для RedisClient.connect.
+    """
+
+    def execute_command(self, *args, **options):
+        timings = current_timings()
+        if timings is None:
+            return super().execute_command(*args, **options)
+        started = perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            timings.add_redis(started)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(
+            self.connection_pool, self.response_callbacks, transaction,
+            shard_hint
+        )
+
+
 class RedisClient:
     """Унифицированный клиент для работы с Redis."""
 
@@ -0,0 +1,108 @@
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """
+    Число и суммарное время SQL-запросов и команд Redis за один запрос.
+
+    Экземпляр сам является execute_wrapper для connection.execute_wrapper;
+    команды Redis учитывает core.redis_client.InstrumentedRedis.
+    """
+
+    __slots__ = ('db_count', 'db_ms', 'redis_count', 'redis_ms')
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.redis_count = 0
+        self.redis_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_count += 1
+            self.db_ms += (perf_counter() - started) * 1000
+
+    def add_redis(self, started):
+        """Учитывает одно обращение к Redis, начатое в started."""
+        self.redis_count += 1
+        self.redis_ms += (perf_counter() - started) * 1000
+
+    def server_timing(self, total_ms):
+        """Значение заголовка Server-Timing."""
+        return (
+            f'db;dur={self.db_ms:.1f};desc="SQL x{self.db_count}", '
+            f'redis;dur={self.redis_ms:.1f};desc="Redis x{self.redis_count}", '
+            f'total;dur={total_ms:.1f}'
+        )
+
+
+def current_timings():
+    """Замеры текущего потока или None, если замер не идёт."""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect_timings():
+    """
+    Считает SQL и Redis, выполненные в текущем потоке внутри блока.
+
+    Вложенный блок считает свои обращения отдельно; SQL попадает и во
+    внешний замер через его execute_wrapper, Redis — только во внутренний.
+    После выхода замер внешнего блока продолжается.
+    """
+    previous = current_timings()
+    timings = RequestTimings()
+    _local.timings = timings
+    try:
+        with connection.execute_wrapper(timings):
+            yield timings
+    finally:
+        _local.timings = previous
+
+
+class RequestTimingMiddleware:
+    """
+    Замеряет SQL и Redis в доле запросов REQUEST_TIMING_SAMPLE_RATE.
+
+    Замеренный ответ получает заголовок Server-Timing, а в лог уходит
+    строка key=value с эндпойнтом и замерами. Остальные запросы
+    проходят без обёрток.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.REQUEST_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        started = perf_counter()
+        with collect_timings() as timings:
+            response = self.get_response(request)
+        total_ms = (perf_counter() - started) * 1000
+
+        response['Server-Timing'] = timings.server_timing(total_ms)
+        resolver_match = request.resolver_match
+        logger.info(
+            'request method=%s path=%s view=%s status=%s total_ms=%.1f '
+            'db_count=%s db_ms=%.1f redis_count=%s redis_ms=%.1f',
+            request.method, request.path,
+            resolver_match.view_name if resolver_match else None,
+            response.status_code, total_ms, timings.db_count,
+            timings.db_ms, timings.redis_count, timings.redis_ms,
+        )
+        return response
@@ -0,0 +1,91 @@
+import logging
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_db_logger.models import StatusLog
+
+from core.log_handlers import BufferedDatabaseLogHandler
+
+
+@pytest.fixture
+def db_logger(db):
+    """Логгер с BufferedDatabaseLogHandler без фонового сброса."""
+
+    handler = BufferedDatabaseLogHandler(flush_interval=3600, capacity=5)
+    logger = logging.getLogger('tests.db_log')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger, handler
+    logger.removeHandler(handler)
+    logger.propagate = True
+    handler.close()
+
+
+def test_emit_does_not_touch_database(db_logger):
+    """Запись лога в потоке запроса не выполняет SQL."""
+
+    logger, _ = db_logger
+
+    with CaptureQueriesContext(connection) as queries:
+        logger.info('OTP отправлен')
+
+    assert len(queries) == 0
+    assert not StatusLog.objects.exists()
+
+
+def test_flush_writes_batch_in_one_query(db_logger):
+    """Накопленные записи сохраняются одним INSERT."""
+
+    logger, handler = db_logger
+    for i in range(3):
+        logger.info('Пересчёт КБЖУ %s', i)
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        logger.exception('Ошибка')
+
+    with CaptureQueriesContext(connection) as queries:
+        handler.flush()
+
+    inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+    assert len(inserts) == 1
+    assert StatusLog.objects.count() == 4
+    assert 'ValueError' in StatusLog.objects.get(msg='Ошибка').trace
+
+
+def test_overflow_drops_records_and_logs_counter(db_logger):
+    """Переполнение буфера отбрасывает записи и фиксирует их число."""
+
+    logger, handler = db_logger
+    for i in range(8):
+        logger.info('Запись %s', i)
+
+    handler.flush()
+
+    assert StatusLog.objects.filter(msg__startswith='Запись').count() == 5
+    counter = StatusLog.objects.get(level=logging.WARNING)
+    assert 'отброшено записей: 3' in counter.msg
+    assert handler.dropped_total == 3
+
+
+def test_failed_batch_is_counted_and_reported(db_logger, mocker, capsys):
+    """Несохранённая пачка учитывается в отброшенных и видна в stderr."""
+
+    logger, handler = db_logger
+    for i in range(3):
+        logger.info('Запись %s', i)
+    mocker.patch.object(
+        StatusLog.objects, 'bulk_create', side_effect=RuntimeError('БД')
+    )
+
+    handler.flush()
+
+    assert handler.dropped == 3
+    assert 'не удалось отправить записей: 3' in capsys.readouterr().err
+    mocker.stopall()
+    logger.info('После сбоя')
+    handler.flush()
+    counter = StatusLog.objects.get(level=logging.WARNING)
+    assert 'отброшено записей: 3' in counter.msg
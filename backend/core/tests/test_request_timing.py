@@ -0,0 +1,80 @@
+import logging
+import re
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from core.redis_client import InstrumentedRedis, RedisClient
+from core.request_timing import collect_timings, current_timings
+
+
+def _server_timing(response):
+    """Разбирает Server-Timing в {метрика: (dur, число обращений)}."""
+    metrics = {}
+    for name, dur, count in re.findall(
+        r'(\w+);dur=([\d.]+)(?:;desc="\w+ x(\d+)")?',
+        response['Server-Timing']
+    ):
+        metrics[name] = (float(dur), int(count) if count else None)
+    return metrics
+
+
+def test_sampled_request_gets_server_timing(
+    client, settings, caplog, product_auto
+):
+    """Замеренный запрос отдаёт Server-Timing и пишет строку в лог."""
+
+    settings.REQUEST_TIMING_SAMPLE_RATE = 1
+
+    with caplog.at_level(logging.INFO, logger='core.request_timing'):
+        response = client.get(reverse('api:products-list'))
+
+    metrics = _server_timing(response)
+    assert metrics['db'][1] > 0
+    # Каталог кешируется в Redis: версия, чтение и запись ответа
+    assert metrics['redis'][1] > 0
+    assert metrics['total'][0] >= metrics['db'][0]
+    assert 'view=api:products-list status=200' in caplog.text
+
+
+def test_not_sampled_request_has_no_header(client, settings, product_auto):
+    """Вне выборки запрос проходит без замеров и заголовка."""
+
+    settings.REQUEST_TIMING_SAMPLE_RATE = 0
+
+    response = client.get(reverse('api:products-list'))
+
+    assert 'Server-Timing' not in response
+
+
+def test_redis_commands_and_pipeline_are_counted(redis_client):
+    """Команда и пайплайн — по одному обращению; вне блока не считаются."""
+
+    assert isinstance(redis_client, InstrumentedRedis)
+
+    with collect_timings() as timings:
+        cache.set('timing:key', 1)
+        with RedisClient.connect() as conn:
+            pipe = conn.pipeline()
+            pipe.set('timing:a', 1)
+            pipe.set('timing:b', 2)
+            pipe.execute()
+
+    assert timings.redis_count == 2
+    assert current_timings() is None
+    cache.get('timing:key')
+    assert timings.redis_count == 2
+
+
+def test_nested_collect_keeps_outer_timings(redis_client):
+    """После вложенного замера внешний продолжает считать обращения."""
+
+    with collect_timings() as outer:
+        with collect_timings() as inner:
+            cache.set('timing:inner', 1)
+        assert current_timings() is outer
+        cache.set('timing:outer', 1)
+
+    assert inner.redis_count == 1
+    assert outer.redis_count == 1
+    assert current_timings() is None
@@ -0,0 +1,85 @@
+import logging
+
+import pytest
+
+from core import bot_telegram_logger
+from core.bot_telegram_logger import TelegramHandler
+
+
+@pytest.fixture
+def mock_send_log(mocker):
+    return mocker.patch.object(
+        bot_telegram_logger.send_log_to_telegram, 'delay'
+    )
+
+
+@pytest.fixture
+def tg_logger():
+    """Логгер с TelegramHandler без фонового сброса (сброс вручную)."""
+
+    handler = TelegramHandler(flush_interval=3600, capacity=5)
+    logger = logging.getLogger('tests.telegram')
+    logger.addHandler(handler)
+    logger.propagate = False
+    yield logger, handler
+    logger.removeHandler(handler)
+    logger.propagate = True
+    handler.close()
+
+
+def test_emit_does_not_enqueue_celery_task(tg_logger, mock_send_log):
+    """Запись лога не ставит задачу Celery сразу."""
+
+    logger, _ = tg_logger
+
+    logger.error('Redis недоступен')
+
+    mock_send_log.assert_not_called()
+
+
+def test_flush_sends_deduplicated_digest(tg_logger, mock_send_log):
+    """Одинаковые сообщения схлопываются в одну строку с числом повторов."""
+
+    logger, handler = tg_logger
+    for _ in range(3):
+        logger.error('Redis недоступен')
+    logger.warning('Медленный ответ')
+
+    handler.flush()
+
+    mock_send_log.assert_called_once()
+    digest = mock_send_log.call_args.args[0]
+    assert digest.count('Redis недоступен') == 1
+    assert '(повторов: 3)' in digest
+    assert 'Медленный ответ' in digest
+
+
+def test_overflow_drops_records_and_reports_count(tg_logger, mock_send_log):
+    """Переполненный буфер отбрасывает записи и сообщает их число."""
+
+    logger, handler = tg_logger
+    for i in range(8):
+        logger.error('Ошибка %s', i)
+
+    handler.flush()
+
+    digest = mock_send_log.call_args.args[0]
+    assert 'Ошибка 4' in digest
+    assert 'Ошибка 5' not in digest
+    assert 'Отброшено при переполнении: 3' in digest
+
+
+def test_notifier_errors_are_not_forwarded(mock_send_log):
+    """Ошибки отправителя не попадают в сводку и не зацикливают отправку."""
+
+    handler = TelegramHandler(flush_interval=3600, capacity=5)
+    logger = logging.getLogger('api.services.bot_telegram')
+    logger.addHandler(handler)
+    try:
+        logger.error('Уведомления отключены')
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+    assert handler.queue.empty()
+    mock_send_log.assert_not_called()
@@ -40,6 +40,7 @@ class DeliveryRuleAdmin(admin.ModelAdmin):
         'days_offset',
         'delivery_time_from',
         'delivery_time_to',
+        'capacity',
         'is_active',
     )
     list_editable = ('is_active',)
@@ -54,7 +55,10 @@ class DeliveryRuleAdmin(admin.ModelAdmin):
             'fields': ('time_from', 'time_to')
         }),
         ('Параметры доставки', {
-            'fields': ('days_offset', 'delivery_time_from', 'delivery_time_to')
+            'fields': (
+                'days_offset', 'delivery_time_from', 'delivery_time_to',
+                'capacity'
+            )
         }),
     )
 
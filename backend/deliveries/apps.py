@@ -5,3 +5,6 @@ class DeliveriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'deliveries'
     verbose_name = 'Доставка'
+
+    def ready(self):
+        import deliveries.signals  # noqa
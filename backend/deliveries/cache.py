@@ -0,0 +1,74 @@
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_VERSION_KEY = 'delivery_schedule_version'
+
+
+class DeliveryScheduleCache:
+    """
+    Кеш скомпилированного расписания доставки: в памяти процесса и в Redis.
+
+    Версия — случайный токен, а не счётчик: после очистки Redis
+    процессы не примут старое расписание за актуальное.
+    """
+
+    _local = (None, None)  # (версия, расписание) текущего процесса
+
+    @staticmethod
+    def get_version():
+        try:
+            version = cache.get(SCHEDULE_VERSION_KEY)
+            if version is None:
+                cache.add(SCHEDULE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+                version = cache.get(SCHEDULE_VERSION_KEY)
+            return version
+        except Exception as e:
+            logger.error('Cache GET error (delivery schedule version): %s', e)
+            return None
+
+    @staticmethod
+    def bump_version(reason=None) -> None:
+        """Инвалидирует расписание во всех процессах."""
+        try:
+            cache.set(SCHEDULE_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            logger.info('Расписание доставки сброшено (reason=%s)', reason)
+        except Exception as e:
+            logger.error('Cache SET error (delivery schedule version): %s', e)
+
+    @staticmethod
+    def build_key(version) -> str:
+        return f'delivery_schedule:{version}'
+
+    @classmethod
+    def get(cls, version):
+        if version is None:
+            return None
+        local_version, schedule = cls._local
+        if local_version == version:
+            return schedule
+        try:
+            schedule = cache.get(cls.build_key(version))
+        except Exception as e:
+            logger.error('Cache GET error: %s', e)
+            return None
+        if schedule is not None:
+            cls._local = (version, schedule)
+        return schedule
+
+    @classmethod
+    def set(cls, version, schedule) -> None:
+        if version is None:
+            return
+        cls._local = (version, schedule)
+        try:
+            cache.set(
+                cls.build_key(version), schedule,
+                settings.DELIVERY_SCHEDULE_CACHE_TTL_SECONDS
+            )
+        except Exception as e:
+            logger.error('Cache SET error: %s', e)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryrule',
+            name='capacity',
+            field=models.PositiveIntegerField(default=0, help_text='Сколько заказов принимается в один слот, 0 — без лимита.', verbose_name='Лимит заказов на слот'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveries', '0002_deliveryrule_capacity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliveryrule',
+            index=models.Index(fields=['is_active', 'time_from', 'time_to'], name='deliveryrule_active_time_idx'),
+        ),
+    ]
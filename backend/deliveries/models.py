@@ -39,11 +39,21 @@ class DeliveryRule(models.Model):
     days_offset = models.PositiveIntegerField('Сдвиг по дням')
     delivery_time_from = models.TimeField('Время начала доставки')
     delivery_time_to = models.TimeField('Время окончания доставки')
+    capacity = models.PositiveIntegerField(
+        'Лимит заказов на слот', default=0,
+        help_text='Сколько заказов принимается в один слот, 0 — без лимита.'
+    )
     is_active = models.BooleanField('Активно', default=True)
 
     class Meta:
         verbose_name = 'Политика доставки'
         verbose_name_plural = 'Политика доставки'
+        indexes = (
+            models.Index(
+                fields=('is_active', 'time_from', 'time_to'),
+                name='deliveryrule_active_time_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
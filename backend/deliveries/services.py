@@ -1,29 +1,303 @@
-from datetime import timedelta
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
 
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.redis_client import RedisClient
+from deliveries.cache import DeliveryScheduleCache
 from deliveries.models import DeliveryRule
+from orders.models import Order
 
+logger = logging.getLogger(__name__)
 
-def get_available_delivery_slots(checkout_started_at):
+
+def _to_microseconds(value):
+    """Время суток в микросекундах от полуночи."""
+    return (
+        (value.hour * 60 + value.minute) * 60 + value.second
+    ) * 1_000_000 + value.microsecond
+
+
+class DeliverySchedule:
     """
-    Возвращает список доступных слотов доставки, сгенерированных на основе
-    активных правил и текущего времени.
+    Скомпилированное расписание слотов доставки.
+
+    Границы периодов заказа всех активных правил делят сутки на отрезки.
+    Для каждого отрезка заранее собран отсортированный список слотов
+    (days_offset, delivery_time_from, delivery_time_to), поэтому поиск
+    по времени оформления и проверка слота — это bisect без запросов к БД.
+    Лимиты заказов хранятся по окну доставки (time_from, time_to).
     """
-    rules = DeliveryRule.objects.filter(is_active=True)
-    slots = []
-    for rule in rules:
-        if rule.time_from <= checkout_started_at.time() <= rule.time_to:
+
+    def __init__(self, points, segments, capacities):
+        self.points = points  # Начала отрезков, мкс от полуночи
+        self.segments = segments  # Слоты каждого отрезка
+        self.capacities = capacities  # {(time_from, time_to): лимит}
+
+    @classmethod
+    def compile(cls, rules):
+        intervals = [
+            (
+                _to_microseconds(rule.time_from),
+                # time_to входит в период заказа
+                _to_microseconds(rule.time_to) + 1,
+                (
+                    rule.days_offset, rule.delivery_time_from,
+                    rule.delivery_time_to
+                ),
+            )
+            for rule in rules
+            if rule.time_from <= rule.time_to
+        ]
+        points = sorted(
+            {start for start, _, _ in intervals}
+            | {end for _, end, _ in intervals}
+        )
+        segments = [
+            tuple(sorted(
+                slot for start, end, slot in intervals
+                if start <= point < end
+            ))
+            for point in points
+        ]
+        capacities = {}
+        for rule in rules:
+            if rule.capacity:
+                window = (rule.delivery_time_from, rule.delivery_time_to)
+                # Из нескольких правил с одним окном действует меньший лимит
+                capacities[window] = min(
+                    capacities.get(window, rule.capacity), rule.capacity
+                )
+        return cls(points, segments, capacities)
+
+    def _segment(self, moment):
+        index = bisect_right(self.points, _to_microseconds(moment)) - 1
+        return self.segments[index] if index >= 0 else ()
+
+    def capacity(self, time_from, time_to):
+        """Лимит заказов окна доставки, 0 — без лимита."""
+        return self.capacities.get((time_from, time_to), 0)
+
+    def slots_at(self, checkout_started_at):
+        """Слоты доставки для заказа, начатого в checkout_started_at."""
+        slots = []
+        segment = self._segment(checkout_started_at.time())
+        for days_offset, time_from, time_to in segment:
             delivery_date = (
-                checkout_started_at.date()
-                + timedelta(days=rule.days_offset)
+                checkout_started_at.date() + timedelta(days=days_offset)
             )
             slots.append({
                 'date': delivery_date,
-                'time_from': rule.delivery_time_from,
-                'time_to': rule.delivery_time_to,
+                'time_from': time_from,
+                'time_to': time_to,
                 'display': (
                     f'{delivery_date.strftime("%d.%m")} '
-                    f'{rule.delivery_time_from.strftime("%H:%M")}-'
-                    f'{rule.delivery_time_to.strftime("%H:%M")}'
+                    f'{time_from.strftime("%H:%M")}-'
+                    f'{time_to.strftime("%H:%M")}'
                 ),
+                'capacity': self.capacity(time_from, time_to),
             })
-    return sorted(slots, key=lambda s: (s['date'], s['time_from']))
+        return slots
+
+    def has_slot(self, checkout_started_at, delivery_date, time_from,
+                 time_to):
+        slot = (
+            (delivery_date - checkout_started_at.date()).days,
+            time_from, time_to
+        )
+        segment = self._segment(checkout_started_at.time())
+        index = bisect_left(segment, slot)
+        return index < len(segment) and segment[index] == slot
+
+
+class SlotReservations:
+    """
+    Счётчики заказов в слотах доставки (дата + окно) в Redis.
+
+    Резерв — атомарный INCR с откатом при превышении лимита. Ключ,
+    которого нет в Redis, заполняется числом заказов из БД с
+    Order.slot_reserved. Если Redis
+    недоступен, занятость считается по БД.
+    """
+
+    KEY = 'delivery_slot:{date}:{time_from}-{time_to}'
+
+    @classmethod
+    def build_key(cls, date, time_from, time_to):
+        return cls.KEY.format(
+            date=date.isoformat(),
+            time_from=time_from.strftime('%H%M'),
+            time_to=time_to.strftime('%H%M'),
+        )
+
+    @staticmethod
+    def _key_ttl(date):
+        """Счётчик нужен до конца дня доставки."""
+        expires_at = timezone.make_aware(
+            datetime.combine(date + timedelta(days=1), datetime.min.time())
+        )
+        return max(int((expires_at - timezone.now()).total_seconds()), 60)
+
+    @staticmethod
+    def _db_counts(slots):
+        """Заказы в слотах по данным БД — один сгруппированный запрос."""
+        if not slots:
+            return {}
+        condition = Q()
+        for date, time_from, time_to in slots:
+            condition |= Q(
+                delivery_date=date, delivery_time_from=time_from,
+                delivery_time_to=time_to
+            )
+        rows = (
+            Order.objects.filter(condition, slot_reserved=True)
+            .exclude(status=Order.Status.CANCELED)
+            .values('delivery_date', 'delivery_time_from', 'delivery_time_to')
+            .annotate(count=Count('id'))
+        )
+        counts = dict.fromkeys(slots, 0)
+        for row in rows:
+            counts[(
+                row['delivery_date'], row['delivery_time_from'],
+                row['delivery_time_to']
+            )] = row['count']
+        return counts
+
+    @classmethod
+    def used(cls, slots):
+        """Число заказов в каждом слоте: {(date, time_from, time_to): n}."""
+        slots = list(dict.fromkeys(slots))
+        if not slots:
+            return {}
+        try:
+            with RedisClient.connect() as conn:
+                values = conn.mget([cls.build_key(*slot) for slot in slots])
+                missing = [
+                    slot for slot, value in zip(slots, values)
+                    if value is None
+                ]
+                counts = cls._db_counts(missing)
+                if counts:
+                    pipe = conn.pipeline()
+                    for slot, count in counts.items():
+                        pipe.set(
+                            cls.build_key(*slot), count, nx=True,
+                            ex=cls._key_ttl(slot[0])
+                        )
+                    pipe.execute()
+        except Exception as e:
+            logger.error(
+                'Счётчики слотов в Redis недоступны, считаем по БД: %s', e
+            )
+            return cls._db_counts(slots)
+        return {
+            slot: int(value) if value is not None else counts[slot]
+            for slot, value in zip(slots, values)
+        }
+
+    @classmethod
+    def reserve(cls, date, time_from, time_to, capacity):
+        """Занимает место в слоте. False — слот заполнен."""
+        if not capacity:
+            return True
+        slot = (date, time_from, time_to)
+        key = cls.build_key(*slot)
+        try:
+            with RedisClient.connect() as conn:
+                if not conn.exists(key):
+                    conn.set(
+                        key, cls._db_counts([slot])[slot], nx=True,
+                        ex=cls._key_ttl(date)
+                    )
+                if conn.incr(key) <= capacity:
+                    return True
+                conn.decr(key)
+                return False
+        except Exception as e:
+            logger.error(
+                'Счётчики слотов в Redis недоступны, считаем по БД: %s', e
+            )
+            return cls._db_counts([slot])[slot] < capacity
+
+    @classmethod
+    def occupy(cls, date, time_from, time_to):
+        """
+        Возвращает заказ в счётчик без проверки лимита (заказ сняли
+        с отмены — доставка уже обещана).
+        """
+        key = cls.build_key(date, time_from, time_to)
+        try:
+            with RedisClient.connect() as conn:
+                # Отсутствующий ключ заново посчитается по БД
+                if conn.exists(key):
+                    conn.incr(key)
+        except Exception as e:
+            logger.error('Не удалось занять слот %s: %s', key, e)
+
+    @classmethod
+    def release(cls, date, time_from, time_to):
+        """Освобождает место в слоте (отмена или откат заказа)."""
+        key = cls.build_key(date, time_from, time_to)
+        try:
+            with RedisClient.connect() as conn:
+                # Отсутствующий ключ заново посчитается по БД
+                if conn.exists(key) and conn.decr(key) < 0:
+                    conn.set(key, 0, keepttl=True)
+        except Exception as e:
+            logger.error('Не удалось освободить слот %s: %s', key, e)
+
+
+def get_delivery_schedule():
+    """Расписание из кеша процесса или Redis, при промахе — из БД."""
+    version = DeliveryScheduleCache.get_version()
+    schedule = DeliveryScheduleCache.get(version)
+    if schedule is None:
+        schedule = DeliverySchedule.compile(
+            DeliveryRule.objects.filter(is_active=True)
+        )
+        DeliveryScheduleCache.set(version, schedule)
+    return schedule
+
+
+def get_available_delivery_slots(checkout_started_at):
+    """
+    Возвращает список доступных слотов доставки, сгенерированных на основе
+    активных правил и текущего времени. Для слотов с лимитом в remaining
+    указано число свободных мест, заполненные слоты не возвращаются.
+    """
+    slots = get_delivery_schedule().slots_at(checkout_started_at)
+    used = SlotReservations.used(
+        (slot['date'], slot['time_from'], slot['time_to'])
+        for slot in slots if slot['capacity']
+    )
+    available = []
+    for slot in slots:
+        capacity = slot.pop('capacity')
+        slot['remaining'] = None
+        if capacity:
+            slot['remaining'] = capacity - used[
+                (slot['date'], slot['time_from'], slot['time_to'])
+            ]
+            if slot['remaining'] <= 0:
+                continue
+        available.append(slot)
+    return available
+
+
+def is_delivery_slot_available(checkout_started_at, delivery_date,
+                               time_from, time_to):
+    """Проверяет, что слот доступен для заказа из checkout_started_at."""
+    return get_delivery_schedule().has_slot(
+        checkout_started_at, delivery_date, time_from, time_to
+    )
+
+
+def has_delivery_slot_capacity(delivery_date, time_from, time_to):
+    """Проверяет, что в слоте остались свободные места."""
+    capacity = get_delivery_schedule().capacity(time_from, time_to)
+    if not capacity:
+        return True
+    slot = (delivery_date, time_from, time_to)
+    return SlotReservations.used([slot])[slot] < capacity
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import DeliveryScheduleCache
+from .models import DeliveryRule
+
+
+@receiver(post_save, sender=DeliveryRule)
+@receiver(post_delete, sender=DeliveryRule)
+def delivery_rules_changed(sender, **kwargs):
+    """Изменение правил доставки — перекомпилировать расписание."""
+    transaction.on_commit(
+        lambda: DeliveryScheduleCache.bump_version(reason='rules changed')
+    )
@@ -1,7 +1,12 @@
 import pytest
 from datetime import datetime, date, time
 from django.utils import timezone
-from deliveries.services import get_available_delivery_slots
+from deliveries.models import DeliveryRule
+from deliveries.services import (
+    SlotReservations, get_available_delivery_slots,
+    is_delivery_slot_available
+)
+from orders.models import Order
 
 
 @pytest.mark.django_db
@@ -19,3 +24,180 @@ def test_get_available_slots_respects_rule(delivery_rule):
     assert slot['time_from'] == time(18, 0)
     assert slot['time_to'] == time(21, 0)
     assert slot['display'] == '06.03 18:00-21:00'
+
+
+@pytest.fixture
+def evening_rule(db):
+    return DeliveryRule.objects.create(
+        name='Заказ с 18:00 до 23:59',
+        time_from=time(18, 0), time_to=time(23, 59),
+        days_offset=1,
+        delivery_time_from=time(10, 0), delivery_time_to=time(12, 0),
+    )
+
+
+def test_schedule_lookup_without_queries(
+    delivery_rule, evening_rule, django_assert_num_queries
+):
+    """После компиляции поиск слотов не обращается к БД."""
+
+    morning = timezone.make_aware(datetime(2026, 3, 4, 12, 0))
+    evening = timezone.make_aware(datetime(2026, 3, 4, 23, 59))
+    get_available_delivery_slots(morning)
+
+    with django_assert_num_queries(0):
+        assert len(get_available_delivery_slots(morning)) == 1
+        # Конец периода заказа входит в интервал
+        assert [
+            (slot['date'], slot['time_from'])
+            for slot in get_available_delivery_slots(evening)
+        ] == [(date(2026, 3, 5), time(10, 0)), (date(2026, 3, 6), time(18, 0))]
+        assert is_delivery_slot_available(
+            evening, date(2026, 3, 5), time(10, 0), time(12, 0)
+        )
+        assert not is_delivery_slot_available(
+            morning, date(2026, 3, 5), time(10, 0), time(12, 0)
+        )
+
+
+def test_schedule_recompiled_after_rule_change(
+    delivery_rule, django_capture_on_commit_callbacks
+):
+    """Изменение правила сбрасывает скомпилированное расписание."""
+
+    checkout_time = timezone.make_aware(datetime(2026, 3, 4, 12, 0))
+    assert len(get_available_delivery_slots(checkout_time)) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        delivery_rule.is_active = False
+        delivery_rule.save()
+
+    assert get_available_delivery_slots(checkout_time) == []
+
+
+@pytest.fixture
+def slot():
+    return date(2026, 3, 6), time(18, 0), time(21, 0)
+
+
+def test_slot_reservation_respects_capacity(db, slot):
+    """Резерв не превышает лимит, освобождённое место доступно снова."""
+
+    assert SlotReservations.reserve(*slot, capacity=2)
+    assert SlotReservations.reserve(*slot, capacity=2)
+    assert not SlotReservations.reserve(*slot, capacity=2)
+    assert SlotReservations.used([slot]) == {slot: 2}
+
+    SlotReservations.release(*slot)
+
+    assert SlotReservations.reserve(*slot, capacity=2)
+
+
+def test_slot_counter_seeded_and_released_from_orders(
+    user, slot, mocker, django_capture_on_commit_callbacks
+):
+    """Счётчик берёт занятость из БД, отмена заказа освобождает место."""
+
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    delivery_date, time_from, time_to = slot
+    order = Order.objects.create(
+        user=user, delivery_date=delivery_date,
+        delivery_time_from=time_from, delivery_time_to=time_to,
+        slot_reserved=True
+    )
+
+    assert not SlotReservations.reserve(*slot, capacity=1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = Order.Status.CANCELED
+        order.save()
+
+    assert SlotReservations.used([slot]) == {slot: 0}
+    assert SlotReservations.reserve(*slot, capacity=1)
+
+
+def test_slot_reservation_falls_back_to_db(user, slot, mocker):
+    """Без Redis занятость слота считается по заказам в БД."""
+
+    mocker.patch(
+        'deliveries.services.RedisClient.connect',
+        side_effect=ConnectionError('Redis down')
+    )
+
+    assert SlotReservations.reserve(*slot, capacity=1)
+    assert SlotReservations.used([slot]) == {slot: 0}
+
+
+def test_unreserved_order_does_not_release_slot(
+    user, slot, mocker, django_capture_on_commit_callbacks
+):
+    """Отмена и удаление заказа без резерва не уменьшают счётчик."""
+
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    assert SlotReservations.reserve(*slot, capacity=1)
+    order = Order.objects.create(
+        user=user, delivery_date=slot[0],
+        delivery_time_from=slot[1], delivery_time_to=slot[2]
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = Order.Status.CANCELED
+        order.save()
+        order.delete()
+
+    assert not SlotReservations.reserve(*slot, capacity=1)
+
+
+def test_uncanceled_order_occupies_slot_again(
+    user, slot, mocker, django_capture_on_commit_callbacks
+):
+    """Заказ, снятый с отмены, снова занимает место в слоте."""
+
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    assert SlotReservations.reserve(*slot, capacity=1)
+    order = Order.objects.create(
+        user=user, delivery_date=slot[0],
+        delivery_time_from=slot[1], delivery_time_to=slot[2],
+        slot_reserved=True
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = Order.Status.CANCELED
+        order.save()
+    assert SlotReservations.used([slot]) == {slot: 0}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        order.status = Order.Status.PROCESSING
+        order.save()
+
+    assert SlotReservations.used([slot]) == {slot: 1}
+    assert not SlotReservations.reserve(*slot, capacity=1)
+
+
+def test_order_saves_do_not_query_previous_status(
+    user, slot, mocker, django_assert_num_queries,
+    django_capture_on_commit_callbacks
+):
+    """
+    Статус загруженного заказа не перечитывается: пересчёт сумм и
+    отмена обходятся без лишнего SELECT.
+    """
+
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    assert SlotReservations.reserve(*slot, capacity=1)
+    order = Order.objects.create(
+        user=user, delivery_date=slot[0],
+        delivery_time_from=slot[1], delivery_time_to=slot[2],
+        slot_reserved=True
+    )
+    order = Order.objects.get(pk=order.pk)
+
+    # Агрегат позиций и UPDATE сумм
+    with django_assert_num_queries(2):
+        order.recalculate_totals()
+    with django_capture_on_commit_callbacks(execute=True):
+        with django_assert_num_queries(1):
+            order.status = Order.Status.CANCELED
+            order.save()
+
+    assert SlotReservations.used([slot]) == {slot: 0}
@@ -14,6 +14,7 @@ from .models import (
     CartItem, Order, OrderItem, PaymentMethod,
     Product, ShoppingCart
 )
+from .cart_storage import get_cart_storage
 from .services import OrderService
 
 
@@ -51,8 +52,63 @@ class OrderCartDynamicAdminMixin:
         js = ('admin_extensions/js/update-total-price.js',)
 
 
+class PreloadedProductChoiceField(forms.ModelChoiceField):
+    """
+    Выбор товара, который берётся из заранее загруженного формсетом
+    словаря, а не отдельным запросом на каждую строку.
+    """
+
+    products = None
+
+    def to_python(self, value):
+        if self.products is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.products[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice'
+            )
+
+
+class CartItemInlineFormSet(BaseInlineFormSet):
+    """
+    Загружает товары всех позиций корзины одним запросом и
+    не даёт добавить в корзину недоступный товар.
+    """
+
+    def full_clean(self):
+        if self.is_bound:
+            product_ids = set()
+            for form in self.forms:
+                value = form.data.get(form.add_prefix('product'))
+                if value and str(value).isdigit():
+                    product_ids.add(int(value))
+            products = Product.objects.in_bulk(product_ids)
+            for form in self.forms:
+                form.fields['product'].products = products
+        super().full_clean()
+
+    def clean(self):
+        super().clean()
+        for form in self.forms:
+            if not form.is_valid() or form.cleaned_data.get('DELETE'):
+                continue
+            product = form.cleaned_data.get('product')
+            # Уже лежащие в корзине товары не мешают сохранению
+            if (
+                product and not product.is_available
+                and 'product' in form.changed_data
+            ):
+                raise ValidationError(
+                    f'Товар "{product}" недоступен.',
+                    code='product_not_available'
+                )
+
+
 class CartItemInline(admin.TabularInline):
     model = CartItem
+    formset = CartItemInlineFormSet
     extra = 1
     fields = ('product', 'quantity', 'price', 'line_total',)
     readonly_fields = ('price', 'line_total',)
@@ -61,6 +117,11 @@ class CartItemInline(admin.TabularInline):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('product')
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'product':
+            kwargs['form_class'] = PreloadedProductChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
     def price(self, obj):
         """Отображаем цену товара в input для JS."""
         price = obj.product.price if obj.product else ''
@@ -96,6 +157,28 @@ class ShoppingCartAdmin(OrderCartDynamicAdminMixin, admin.ModelAdmin):
     actions = ('create_order_from_cart',)
     inlines = (CartItemInline,)
 
+    def get_object(self, request, object_id, from_field=None):
+        cart = super().get_object(request, object_id, from_field)
+        if cart is not None and request.method == 'GET':
+            # Форма показывает CartItem: переносим в БД несохранённые
+            # изменения Redis-корзины
+            try:
+                get_cart_storage(cart.user).flush()
+            except Exception:
+                self.message_user(
+                    request,
+                    'Не удалось загрузить актуальную корзину, '
+                    'показана сохранённая копия.',
+                    level=messages.WARNING
+                )
+        return cart
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Правки инлайна идут в БД мимо хранилища: сбрасываем копию
+        # в Redis, иначе отложенная запись их перезапишет
+        get_cart_storage(form.instance.user).invalidate()
+
     def total_sum_display(self, obj):
         """Отображает общую сумму корзины."""
         if obj is None or not obj.pk:
@@ -128,8 +211,11 @@ class ShoppingCartAdmin(OrderCartDynamicAdminMixin, admin.ModelAdmin):
             return
         cart = queryset.first()
         try:
-            # Передаём cart
-            order = OrderService.create_from_cart(cart)
+            # Как и API, берём живую корзину из активного хранилища:
+            # с Redis-корзиной в БД может лежать устаревшая копия
+            order = OrderService.create_from_cart(
+                get_cart_storage(cart.user)
+            )
             self.message_user(
                 request,
                 f'Заказ #{order.order_number} успешно создан!',
@@ -303,6 +389,11 @@ class OrderAdmin(OrderCartDynamicAdminMixin, admin.ModelAdmin):
         ]
         return JsonResponse(data, safe=False)
 
+    def save_related(self, request, form, formsets, change):
+        """Пересчитывает суммы заказа один раз на сохранение всех инлайнов."""
+        with Order.deferred_totals():
+            super().save_related(request, form, formsets, change)
+
     @admin.display(description='Статус оплаты')
     def payment_status(self, obj):
         if payment := getattr(obj, 'payment', None):
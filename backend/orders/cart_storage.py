@@ -0,0 +1,289 @@
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from core.redis_client import RedisClient
+from products.models import Product
+from .models import CartItem, ShoppingCart
+
+logger = logging.getLogger(__name__)
+
+
+class CartContents:
+    """Содержимое корзины независимо от хранилища."""
+
+    def __init__(self, user, items):
+        self.user = user
+        self.items = items  # Список CartItem с подгруженным product
+
+    @property
+    def items_total(self) -> Decimal:
+        return sum(
+            (item.product.price * item.quantity for item in self.items),
+            start=Decimal('0.00')
+        )
+
+
+class BaseCartStorage:
+    """Интерфейс хранилища корзины пользователя."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def contents(self) -> CartContents:
+        raise NotImplementedError
+
+    def replace_items(self, quantities):
+        """Заменяет состав корзины: {product_id: quantity}."""
+        raise NotImplementedError
+
+    def set_quantity(self, product_id, quantity):
+        """Меняет одну позицию, quantity=0 удаляет товар."""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def flush(self):
+        """Сохраняет корзину в БД (для отложенной записи)."""
+
+    def invalidate(self):
+        """Сбрасывает копию корзины вне БД после правки в обход хранилища."""
+
+
+class DatabaseCartStorage(BaseCartStorage):
+    """Корзина в таблицах ShoppingCart/CartItem."""
+
+    def __init__(self, user, cart=None):
+        super().__init__(user)
+        self._cart = cart
+
+    @property
+    def cart(self):
+        if self._cart is None:
+            self._cart, _ = ShoppingCart.objects.get_or_create(user=self.user)
+        return self._cart
+
+    def contents(self):
+        return CartContents(
+            self.user, list(self.cart.items.select_related('product'))
+        )
+
+    @transaction.atomic
+    def replace_items(self, quantities):
+        """
+        Применяет к корзине разницу с текущим составом: новые позиции
+        добавляются, изменённые обновляются, отсутствующие удаляются.
+        """
+        existing = {item.product_id: item for item in self.cart.items.all()}
+
+        to_create = [
+            CartItem(cart=self.cart, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if product_id not in existing
+        ]
+        to_update = []
+        for product_id, cart_item in existing.items():
+            quantity = quantities.get(product_id)
+            if quantity and cart_item.quantity != quantity:
+                cart_item.quantity = quantity
+                to_update.append(cart_item)
+        to_delete = existing.keys() - quantities.keys()
+
+        if to_delete:
+            self.cart.items.filter(product_id__in=to_delete).delete()
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity'])
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+
+    def set_quantity(self, product_id, quantity):
+        if quantity == 0:
+            self.cart.items.filter(product_id=product_id).delete()
+        else:
+            CartItem.objects.update_or_create(
+                cart=self.cart, product_id=product_id,
+                defaults={'quantity': quantity}
+            )
+
+    def clear(self):
+        self.cart.items.all().delete()
+
+
+class RedisCartStorage(BaseCartStorage):
+    """
+    Корзина в Redis-хеше {product_id: quantity} с TTL.
+
+    Изменения попадают в БД отложенно: пользователь помечается «грязным»,
+    а flush_dirty_carts_task (или оформление заказа) переносит корзину
+    в CartItem. При пустом ключе корзина подгружается из БД.
+
+    Если Redis недоступен, чтение и запись идут через DatabaseCartStorage.
+    """
+
+    KEY = 'cart:{user_id}'
+    DIRTY_KEY = 'cart:dirty'
+    LOADED_FIELD = 'loaded'  # Маркер: пустая корзина уже загружена
+
+    @property
+    def key(self):
+        return self.KEY.format(user_id=self.user.pk)
+
+    def _quantities(self, conn):
+        data = conn.hgetall(self.key)
+        if not data:
+            # Промах — поднимаем корзину из БД
+            data = {
+                str(item.product_id).encode(): str(item.quantity).encode()
+                for item in CartItem.objects.filter(cart__user=self.user)
+            }
+            pipe = conn.pipeline()
+            pipe.hset(self.key, mapping={self.LOADED_FIELD: 1, **data})
+            pipe.expire(self.key, settings.CART_REDIS_TTL_SECONDS)
+            pipe.execute()
+        return self._parse(data)
+
+    @classmethod
+    def _parse(cls, data):
+        return {
+            int(product_id): int(quantity)
+            for product_id, quantity in data.items()
+            if product_id.decode() != cls.LOADED_FIELD
+        }
+
+    def _fallback(self, error):
+        logger.error(
+            'Корзина в Redis недоступна, работа через БД для '
+            'пользователя id=%s: %s', self.user.pk, error
+        )
+        return DatabaseCartStorage(self.user)
+
+    def _write(self, conn, pipe):
+        pipe.expire(self.key, settings.CART_REDIS_TTL_SECONDS)
+        pipe.sadd(self.DIRTY_KEY, self.user.pk)
+        pipe.execute()
+
+    def contents(self):
+        try:
+            with RedisClient.connect() as conn:
+                quantities = self._quantities(conn)
+        except Exception as e:
+            return self._fallback(e).contents()
+        products = Product.objects.in_bulk(quantities.keys())
+        items = [
+            CartItem(product=products[product_id], quantity=quantity)
+            for product_id, quantity in quantities.items()
+            if product_id in products  # Товар мог быть удалён
+        ]
+        return CartContents(self.user, items)
+
+    def replace_items(self, quantities):
+        try:
+            with RedisClient.connect() as conn:
+                pipe = conn.pipeline()
+                pipe.delete(self.key)
+                pipe.hset(
+                    self.key, mapping={self.LOADED_FIELD: 1, **quantities}
+                )
+                self._write(conn, pipe)
+        except Exception as e:
+            self._fallback(e).replace_items(quantities)
+
+    def set_quantity(self, product_id, quantity):
+        try:
+            with RedisClient.connect() as conn:
+                self._quantities(conn)  # Гарантируем, что корзина загружена
+                pipe = conn.pipeline()
+                if quantity == 0:
+                    pipe.hdel(self.key, product_id)
+                else:
+                    pipe.hset(self.key, product_id, quantity)
+                self._write(conn, pipe)
+        except Exception as e:
+            self._fallback(e).set_quantity(product_id, quantity)
+
+    def clear(self):
+        DatabaseCartStorage(self.user).clear()
+
+        def clear_redis():
+            try:
+                with RedisClient.connect() as conn:
+                    pipe = conn.pipeline()
+                    pipe.delete(self.key)
+                    pipe.hset(self.key, self.LOADED_FIELD, 1)
+                    pipe.srem(self.DIRTY_KEY, self.user.pk)
+                    pipe.expire(self.key, settings.CART_REDIS_TTL_SECONDS)
+                    pipe.execute()
+            except Exception as e:
+                logger.error(
+                    'Не удалось очистить корзину в Redis пользователя '
+                    'id=%s: %s', self.user.pk, e
+                )
+        # Redis не откатывается вместе с транзакцией заказа
+        transaction.on_commit(clear_redis)
+
+    def invalidate(self):
+        """
+        Удаляет корзину из Redis после правки CartItem в обход хранилища
+        (админка), чтобы flush не перезаписал её. Следующее чтение
+        подгрузит корзину из БД.
+        """
+        def drop_redis():
+            try:
+                with RedisClient.connect() as conn:
+                    pipe = conn.pipeline()
+                    pipe.srem(self.DIRTY_KEY, self.user.pk)
+                    pipe.delete(self.key)
+                    pipe.execute()
+            except Exception as e:
+                logger.error(
+                    'Не удалось сбросить корзину в Redis пользователя '
+                    'id=%s: %s', self.user.pk, e
+                )
+        transaction.on_commit(drop_redis)
+
+    def flush(self):
+        """
+        Снимает отметку «грязная» и читает корзину одной транзакцией
+        Redis: изменение после чтения снова отметит корзину. Истёкший
+        ключ просто убирается из множества.
+        """
+        with RedisClient.connect() as conn:
+            pipe = conn.pipeline()
+            pipe.srem(self.DIRTY_KEY, self.user.pk)
+            pipe.hgetall(self.key)
+            _, data = pipe.execute()
+        if not data:
+            return
+        try:
+            DatabaseCartStorage(self.user).replace_items(self._parse(data))
+        except Exception:
+            # Вернём отметку, чтобы корзина сохранилась при следующем сбросе
+            with RedisClient.connect() as conn:
+                conn.sadd(self.DIRTY_KEY, self.user.pk)
+            raise
+        logger.info('Корзина пользователя id=%s сохранена в БД', self.user.pk)
+
+    @classmethod
+    def flush_dirty(cls):
+        """Сохраняет в БД все изменённые корзины. Возвращает их число."""
+        from users.models import User
+
+        with RedisClient.connect() as conn:
+            user_ids = [int(pk) for pk in conn.smembers(cls.DIRTY_KEY)]
+        for user in User.objects.filter(pk__in=user_ids):
+            try:
+                cls(user).flush()
+            except Exception:
+                logger.exception(
+                    'Ошибка сохранения корзины пользователя id=%s', user.pk
+                )
+        return len(user_ids)
+
+
+def get_cart_storage(user) -> BaseCartStorage:
+    """Хранилище корзины, выбранное в settings.CART_STORAGE_BACKEND."""
+    return import_string(settings.CART_STORAGE_BACKEND)(user)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:58
+
+from django.db import migrations, models
+
+
+def mark_reserved_orders(apps, schema_editor):
+    """
+    Заказы со слотом, которые уже учтены счётчиками (не отменены
+    и доставка требует слота), считаются зарезервированными.
+    """
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.exclude(status='canceled').filter(
+        delivery_date__isnull=False,
+        delivery_time_from__isnull=False,
+        delivery_time_to__isnull=False,
+        delivery__requires_delivery_slot=True,
+    ).update(slot_reserved=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_order_user_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='slot_reserved',
+            field=models.BooleanField(default=False, editable=False, help_text='Заказ учтён в счётчике слота доставки (SlotReservations)', verbose_name='Место в слоте зарезервировано'),
+        ),
+        migrations.RunPython(
+            mark_reserved_orders, migrations.RunPython.noop
+        ),
+    ]
@@ -1,15 +1,25 @@
+import logging
+import threading
+from contextlib import contextmanager
 from decimal import Decimal
 
 from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Cast, Coalesce, Substr
 from django.utils import timezone
 
 from core.constants import MAX_PRICE_DIGITS, PRICE_DECIMAL_PLACES
+from core.redis_client import RedisClient
 from deliveries.models import Delivery
 from products.models import Product
 from users.models import User
 
+logger = logging.getLogger(__name__)
+
+# Заказы, пересчёт сумм которых отложен (Order.deferred_totals)
+_deferred_totals = threading.local()
+
 
 class ShoppingCart(models.Model):
     """Корзина пользователя."""
@@ -105,11 +115,133 @@ class Payment(models.Model):
 
 
 class OrderCounters(models.Model):
-    """Хранит счётчики заказов по годам с датой последнего сброса."""
+    """
+    Хранит счётчики заказов по годам с датой последнего сброса.
+
+    Номера выдаются атомарным INCR в Redis (ключ на год), таблица служит
+    долговременной копией: синхронизируется каждые
+    ORDER_COUNTER_SYNC_INTERVAL номеров и используется, если Redis недоступен.
+    Номера, выданные через БД, сразу пишутся в таблицу, и Redis никогда
+    не опускается ниже её значения.
+    """
+
+    REDIS_KEY = 'order_counter:{year:02d}'
+    REDIS_KEY_TTL = 60 * 60 * 24 * 400  # Чуть больше года
+    # KEYS: счётчик года; ARGV: нижняя граница, TTL ключа (сек), шаг
+    # Поднимает счётчик до границы, если он ниже, и возвращает INCRBY
+    INCR_ABOVE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+end
+return redis.call('INCRBY', KEYS[1], ARGV[3])
+"""
+    _incr_script = None
 
     last_reset_year = models.PositiveSmallIntegerField()
     orders_in_year = models.PositiveIntegerField()
 
+    @classmethod
+    def next_number(cls, year):
+        """Возвращает следующий порядковый номер заказа в году."""
+        return cls.reserve(year)
+
+    @classmethod
+    def reserve(cls, year, count=1):
+        """
+        Резервирует count номеров подряд одним обращением и возвращает
+        последний из них (для массового создания заказов).
+        """
+        key = cls.REDIS_KEY.format(year=year)
+        try:
+            with RedisClient.connect() as conn:
+                if conn.exists(key):
+                    # Пока Redis был недоступен, номера могла выдавать БД
+                    floor = cls._db_value(year)
+                else:
+                    # Первый номер года или Redis потерял данные
+                    floor = cls._durable_value(year)
+                if cls._incr_script is None:
+                    cls._incr_script = conn.register_script(
+                        cls.INCR_ABOVE_SCRIPT
+                    )
+                number = cls._incr_script(
+                    keys=[key], args=[floor, cls.REDIS_KEY_TTL, count],
+                    client=conn,
+                )
+        except Exception as e:
+            logger.error(
+                'Счётчик заказов в Redis недоступен, используем БД: %s', e
+            )
+            return cls._next_number_db(year, count)
+        interval = settings.ORDER_COUNTER_SYNC_INTERVAL
+        # Блок номеров мог перешагнуть точку синхронизации
+        if number // interval > (number - count) // interval:
+            transaction.on_commit(lambda: cls.sync(year, number))
+        return number
+
+    @classmethod
+    def sync(cls, year, number):
+        """Переносит значение счётчика из Redis в БД (только вперёд)."""
+        with transaction.atomic():
+            counter, _ = cls.objects.select_for_update().get_or_create(
+                id=1,
+                defaults={'last_reset_year': year, 'orders_in_year': 0}
+            )
+            if (year, number) > (
+                counter.last_reset_year, counter.orders_in_year
+            ):
+                counter.last_reset_year = year
+                counter.orders_in_year = number
+                counter.save()
+        logger.info('Счётчик заказов синхронизирован: %s/%s', year, number)
+
+    @classmethod
+    def _db_value(cls, year):
+        """Значение счётчика года в таблице (0, если там другой год)."""
+        return (
+            cls.objects.filter(id=1, last_reset_year=year)
+            .values_list('orders_in_year', flat=True).first()
+        ) or 0
+
+    @classmethod
+    def _durable_value(cls, year):
+        """
+        Последний выданный номер по данным БД: максимум из счётчика
+        и уже существующих номеров заказов этого года.
+        """
+        last_order = (
+            Order.objects.filter(order_number__startswith=f'{year:02d}')
+            .annotate(
+                counter=Cast(Substr('order_number', 3), models.IntegerField())
+            )
+            .aggregate(value=models.Max('counter'))['value']
+        )
+        return max(cls._db_value(year), last_order or 0)
+
+    @classmethod
+    def _next_number_db(cls, year, count=1):
+        """
+        Резервный вариант: счётчик в БД под блокировкой строки.
+
+        Таблица отстаёт от Redis на число номеров до синхронизации,
+        поэтому счёт продолжается с максимума по существующим заказам.
+        """
+        with transaction.atomic():
+            counter_obj, _ = (
+                cls.objects.select_for_update().get_or_create(
+                    id=1,
+                    defaults={'last_reset_year': year,
+                              'orders_in_year': 0}
+                )
+            )
+            number = cls._durable_value(year) + count
+            if year >= counter_obj.last_reset_year:
+                counter_obj.last_reset_year = year
+                counter_obj.orders_in_year = number
+                counter_obj.save()
+            return number
+
 
 class Order(models.Model):
     """Заказ, сформированный из корзины."""
@@ -192,6 +324,22 @@ class Order(models.Model):
     delivery_date = models.DateField('Дата доставки', blank=True, null=True)
     delivery_time_from = models.TimeField('со времени', blank=True, null=True)
     delivery_time_to = models.TimeField('до врмени', blank=True, null=True)
+    slot_reserved = models.BooleanField(
+        'Место в слоте зарезервировано', default=False, editable=False,
+        help_text='Заказ учтён в счётчике слота доставки (SlotReservations)'
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус из БД: сигналы замечают отмену без повторного запроса
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.status
 
     def save(self, *args, **kwargs):
         if not self.order_number:
@@ -203,49 +351,69 @@ class Order(models.Model):
         super().save(*args, **kwargs)
 
     def add_product(self, product, quantity, price):
-        item, created = OrderItem.objects.get_or_create(
-            order=self, product=product,
-            defaults={'quantity': quantity, 'price': price}
-        )
-        if not created:
-            item.quantity += quantity
-            item.save(update_fields=['quantity'])
-        self.recalculate_totals()
+        with Order.deferred_totals():
+            item, created = OrderItem.objects.get_or_create(
+                order=self, product=product,
+                defaults={'quantity': quantity, 'price': price}
+            )
+            if not created:
+                item.quantity += quantity
+                item.save(update_fields=['quantity'])
+            self.request_totals_recalc()
         return item
 
+    @staticmethod
+    @contextmanager
+    def deferred_totals():
+        """
+        Откладывает пересчёт сумм заказов до выхода из блока.
+
+        Внутри блока OrderItem.save()/delete() только отмечают заказ,
+        пересчёт выполняется один раз на заказ при выходе.
+        """
+        if getattr(_deferred_totals, 'orders', None) is not None:
+            # Вложенный блок — пересчитает внешний
+            yield
+            return
+        _deferred_totals.orders = {}
+        try:
+            yield
+            orders = _deferred_totals.orders
+        finally:
+            _deferred_totals.orders = None
+        for order in orders.values():
+            order.recalculate_totals()
+
+    def request_totals_recalc(self):
+        """Пересчитывает суммы сразу или откладывает до deferred_totals."""
+        pending = getattr(_deferred_totals, 'orders', None)
+        if pending is not None:
+            pending[self.pk] = self
+        else:
+            self.recalculate_totals()
+
     def recalculate_totals(self):
         """Пересчитывает суммы заказа: товары, доставка и итого."""
-        self.items_total = sum(
-            (item.price * item.quantity for item in self.items.all()),
-            start=Decimal('0.00')
-        )
-        self.delivery_price = (
-            self.delivery.price if self.delivery else Decimal('0.00')
-        )
-        self.total_price = self.items_total + self.delivery_price
+        # Сумма позиций одним агрегирующим запросом
+        self.items_total = self.items.aggregate(
+            total=Coalesce(
+                models.Sum(
+                    models.F('price') * models.F('quantity'),
+                    output_field=self._meta.get_field('items_total'),
+                ),
+                models.Value(Decimal('0.00')),
+                output_field=self._meta.get_field('items_total'),
+            )
+        )['total']
+        # delivery_price и total_price обновляются в save()
         self.save(update_fields=[
             'items_total', 'delivery_price', 'total_price'
         ])
 
     def generate_order_number(self):
         current_year = timezone.now().year % 100
-        with transaction.atomic():
-            counter_obj, _ = (
-                OrderCounters.objects.select_for_update().get_or_create(
-                    id=1,
-                    defaults={'last_reset_year': current_year,
-                              'orders_in_year': 0}
-                )
-            )
-            if current_year > counter_obj.last_reset_year:
-                counter_obj.orders_in_year = 0
-                counter_obj.last_reset_year = current_year
-                counter_obj.save()
-            OrderCounters.objects.filter(id=1).update(
-                orders_in_year=models.F('orders_in_year') + 1
-            )
-            counter_obj.refresh_from_db()
-            return f'{current_year:02d}{str(counter_obj.orders_in_year)}'
+        counter = OrderCounters.next_number(current_year)
+        return f'{current_year:02d}{counter}'
 
     @property
     def payment_status(self):
@@ -258,6 +426,20 @@ class Order(models.Model):
         verbose_name_plural = 'Заказы'
         default_related_name = 'orders'
         ordering = ('-created_at',)
+        indexes = (
+            # История заказов: WHERE user_id ORDER BY -created_at, id
+            models.Index(
+                fields=('user', '-created_at', 'id'),
+                name='order_user_created_idx'
+            ),
+            # Загрузка слотов доставки (SlotReservations)
+            models.Index(
+                fields=(
+                    'delivery_date', 'delivery_time_from', 'delivery_time_to'
+                ),
+                name='order_delivery_slot_idx'
+            ),
+        )
 
     def __str__(self):
         return f'Заказ # {self.order_number} ({self.user})'
@@ -291,12 +473,13 @@ class OrderItem(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        self.order.recalculate_totals()  # Пересчёт суммы при изменении
+        self.order.request_totals_recalc()  # Пересчёт суммы при изменении
 
     def delete(self, *args, **kwargs):
         order = self.order
-        super().delete(*args, **kwargs)
-        order.recalculate_totals()  # Пересчёт суммы при удалении
+        result = super().delete(*args, **kwargs)
+        order.request_totals_recalc()  # Пересчёт суммы при удалении
+        return result
 
     class Meta:
         verbose_name = 'Позиция в заказе'
@@ -2,7 +2,9 @@ from decimal import Decimal
 
 from django.db import transaction
 
-from .models import Order, OrderItem, Payment, ShoppingCart
+from deliveries.services import SlotReservations, get_delivery_schedule
+from .cart_storage import get_cart_storage
+from .models import Order, OrderItem, Payment
 
 
 class OrderService:
@@ -11,13 +13,14 @@ class OrderService:
     @classmethod
     @transaction.atomic
     def create_from_cart(cls, cart, *, order_data=None):
-        """Создаёт новый заказ на основе корзины пользователя."""
+        """
+        Создаёт новый заказ на основе корзины пользователя.
+        cart — хранилище корзины (orders.cart_storage).
+        """
 
         order_data = order_data or {}
 
-        items = list(
-            cart.items.select_related('product')
-        )
+        items = cart.contents().items
 
         if not items:
             raise ValueError('Невозможно создать заказ из пустой корзины.')
@@ -52,15 +55,41 @@ class OrderService:
         # Сохраняем все позиции одним запросом
         OrderItem.objects.bulk_create(order_items)
         # Очищаем корзину
-        cart.items.all().delete()
+        cart.clear()
         return order
 
     @classmethod
     def create_order_for_checkout(cls, user, validated_data):
-        """Создаёт заказ для оформления (checkout)."""
-        cart = ShoppingCart.objects.get(user=user)
+        """
+        Создаёт заказ для оформления (checkout).
+        Место в слоте доставки резервируется до создания заказа
+        и освобождается, если заказ создать не удалось.
+        """
+        slot = (
+            validated_data.get('delivery_date'),
+            validated_data.get('delivery_time_from'),
+            validated_data.get('delivery_time_to'),
+        )
+        capacity = (
+            get_delivery_schedule().capacity(*slot[1:]) if all(slot) else 0
+        )
+        if not SlotReservations.reserve(*slot, capacity):
+            raise ValueError('В выбранном слоте доставки закончились места.')
+        try:
+            with transaction.atomic():
+                order = cls._create_checkout_order(
+                    user, validated_data, slot_reserved=bool(capacity)
+                )
+        except Exception:
+            if capacity:
+                SlotReservations.release(*slot)
+            raise
+        return order
+
+    @classmethod
+    def _create_checkout_order(cls, user, validated_data, slot_reserved):
         order = cls.create_from_cart(
-            cart,
+            get_cart_storage(user),
             order_data={
                 'delivery': validated_data['delivery'],
                 'address': validated_data['address'],
@@ -69,6 +98,7 @@ class OrderService:
                 'delivery_date': validated_data['delivery_date'],
                 'delivery_time_from': validated_data['delivery_time_from'],
                 'delivery_time_to': validated_data['delivery_time_to'],
+                'slot_reserved': slot_reserved,
             }
         )
         # Создаём объект оплаты
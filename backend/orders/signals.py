@@ -1,8 +1,10 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
+from deliveries.services import SlotReservations
 from .models import Order
 from .tasks import send_order_created_message
 
@@ -22,3 +24,72 @@ def order_created(sender, instance, created, **kwargs):
             instance.user.name,
             str(instance.user.phone)
         )
+
+
+def _slot(order):
+    return (
+        order.delivery_date, order.delivery_time_from, order.delivery_time_to
+    )
+
+
+def release_delivery_slot(order):
+    """Возвращает место в слоте доставки заказа после фиксации транзакции."""
+    slot = _slot(order)
+    if order.slot_reserved and all(slot):
+        transaction.on_commit(lambda: SlotReservations.release(*slot))
+
+
+def occupy_delivery_slot(order):
+    """Снова учитывает заказ в слоте после фиксации транзакции."""
+    slot = _slot(order)
+    if order.slot_reserved and all(slot):
+        transaction.on_commit(lambda: SlotReservations.occupy(*slot))
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_status(sender, instance, update_fields, **kwargs):
+    """
+    Запоминает прежний статус заказа с резервом слота, чтобы заметить
+    отмену и снятие отмены.
+
+    Статус берётся из загруженного экземпляра (Order.from_db); запрос
+    к БД — только если экземпляр создан без него.
+    """
+    instance._previous_status = None
+    if not instance.pk or not instance.slot_reserved:
+        return
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous_status = getattr(instance, '_loaded_status', None)
+    if previous_status is None:
+        previous_status = (
+            Order.objects.filter(pk=instance.pk)
+            .values_list('status', flat=True).first()
+        )
+    instance._previous_status = previous_status
+
+
+@receiver(post_save, sender=Order)
+def order_status_changed(sender, instance, created, update_fields, **kwargs):
+    """
+    Отменённый заказ освобождает место в слоте доставки,
+    снятый с отмены — занимает снова.
+    """
+    if update_fields is None or 'status' in update_fields:
+        instance._loaded_status = instance.status
+    previous_status = getattr(instance, '_previous_status', None)
+    if not previous_status:
+        return
+    was_canceled = previous_status == Order.Status.CANCELED
+    is_canceled = instance.status == Order.Status.CANCELED
+    if is_canceled and not was_canceled:
+        release_delivery_slot(instance)
+    elif was_canceled and not is_canceled:
+        occupy_delivery_slot(instance)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """Удалённый (не отменённый) заказ освобождает место в слоте."""
+    if instance.status != Order.Status.CANCELED:
+        release_delivery_slot(instance)
@@ -1,8 +1,15 @@
 from celery import shared_task
 
 from api.services.bot_telegram import send_telegram_message
+from .cart_storage import RedisCartStorage
 
 
 @shared_task
 def send_order_created_message(order_number, name, phone):
     send_telegram_message(f'Новый заказ # {order_number}\n[{name}, {phone}]')
+
+
+@shared_task
+def flush_dirty_carts_task():
+    """Сохраняет в БД корзины, изменённые в Redis."""
+    return RedisCartStorage.flush_dirty()
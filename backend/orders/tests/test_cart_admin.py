@@ -0,0 +1,125 @@
+import pytest
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from orders.admin import CartItemInline, ShoppingCartAdmin
+from orders.cart_storage import RedisCartStorage
+from orders.models import CartItem, Order, ShoppingCart
+from orders.tasks import flush_dirty_carts_task
+from products.models import Product
+from users.models import User
+
+
+@pytest.fixture
+def admin_request(rf, db):
+    request = rf.post('/')
+    request.user = User.objects.create_superuser(
+        phone='+79000000001', email='admin@tester.com'
+    )
+    return request
+
+
+def build_formset(request, cart, products):
+    inline = CartItemInline(ShoppingCart, admin.site)
+    formset_class = inline.get_formset(request, obj=cart)
+    data = {
+        'items-TOTAL_FORMS': len(products),
+        'items-INITIAL_FORMS': 0,
+        'items-MIN_NUM_FORMS': 0,
+        'items-MAX_NUM_FORMS': 1000,
+    }
+    for i, product in enumerate(products):
+        data[f'items-{i}-product'] = product.id
+        data[f'items-{i}-quantity'] = 1
+    return formset_class(data, instance=cart, prefix='items')
+
+
+def test_cart_inline_preloads_products(admin_request, cart, category):
+    """Товары всех строк инлайна выбираются одним запросом."""
+
+    products = Product.objects.bulk_create(
+        Product(category=category, name=f'Товар{i}', price=10)
+        for i in range(5)
+    )
+    formset = build_formset(admin_request, cart, products)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert formset.is_valid()
+
+    product_selects = [
+        query for query in ctx.captured_queries
+        if 'FROM "products_product"' in query['sql']
+        and 'IN (' in query['sql']
+    ]
+    assert len(product_selects) == 1
+    assert [
+        form.cleaned_data['product'] for form in formset.forms
+    ] == products
+
+
+def test_cart_inline_rejects_unavailable_product(
+    admin_request, cart, product_auto
+):
+    """В корзину через админку нельзя добавить недоступный товар."""
+
+    product_auto.is_available = False
+    product_auto.save()
+    formset = build_formset(admin_request, cart, [product_auto])
+
+    assert not formset.is_valid()
+    assert 'недоступен' in str(formset.non_form_errors())
+
+
+def test_order_from_cart_uses_redis_cart(
+    admin_request, cart, user, product_auto, settings, mocker,
+    django_capture_on_commit_callbacks
+):
+    """
+    С Redis-корзиной админка собирает заказ из живой корзины, и после
+    сброса корзина не возвращается в БД.
+    """
+
+    settings.CART_STORAGE_BACKEND = 'orders.cart_storage.RedisCartStorage'
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    CartItem.objects.create(cart=cart, product=product_auto, quantity=1)
+    RedisCartStorage(user).set_quantity(product_auto.id, 3)
+    cart_admin = ShoppingCartAdmin(ShoppingCart, admin.site)
+    mocker.patch.object(cart_admin, 'message_user')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        cart_admin.create_order_from_cart(
+            admin_request, ShoppingCart.objects.filter(pk=cart.pk)
+        )
+    flush_dirty_carts_task()
+
+    order = Order.objects.get(user=user)
+    assert [
+        (item.product_id, item.quantity) for item in order.items.all()
+    ] == [(product_auto.id, 3)]
+    assert not CartItem.objects.filter(cart=cart).exists()
+
+
+def test_cart_admin_save_drops_redis_copy(
+    admin_request, cart, user, product_auto, settings, mocker,
+    django_capture_on_commit_callbacks
+):
+    """Правка корзины в админке не перезаписывается отложенной записью."""
+
+    settings.CART_STORAGE_BACKEND = 'orders.cart_storage.RedisCartStorage'
+    storage = RedisCartStorage(user)
+    storage.set_quantity(product_auto.id, 3)
+    cart_admin = ShoppingCartAdmin(ShoppingCart, admin.site)
+
+    # Инлайн сохраняет CartItem напрямую в БД
+    CartItem.objects.create(cart=cart, product=product_auto, quantity=5)
+    with django_capture_on_commit_callbacks(execute=True):
+        cart_admin.save_related(
+            admin_request, mocker.Mock(instance=cart), [], change=True
+        )
+    flush_dirty_carts_task()
+
+    assert CartItem.objects.get(cart=cart).quantity == 5
+    assert [
+        (item.product_id, item.quantity) for item in storage.contents().items
+    ] == [(product_auto.id, 5)]
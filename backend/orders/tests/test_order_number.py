@@ -0,0 +1,104 @@
+from django.utils import timezone
+
+from core.redis_client import RedisClient
+from orders.models import Order, OrderCounters
+
+YEAR = 26
+
+
+def test_order_numbers_are_sequential(db):
+    """Номера в пределах года выдаются подряд."""
+
+    numbers = [OrderCounters.next_number(YEAR) for _ in range(3)]
+
+    assert numbers == [1, 2, 3]
+
+
+def test_order_counter_seeded_from_db(db):
+    """Пустой ключ в Redis продолжает счёт с сохранённого в БД значения."""
+
+    OrderCounters.objects.create(id=1, last_reset_year=YEAR,
+                                 orders_in_year=41)
+
+    assert OrderCounters.next_number(YEAR) == 42
+
+
+def test_order_counter_synced_to_db(
+    db, settings, django_capture_on_commit_callbacks
+):
+    """Каждые ORDER_COUNTER_SYNC_INTERVAL номеров счётчик пишется в БД."""
+
+    settings.ORDER_COUNTER_SYNC_INTERVAL = 2
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(3):
+            OrderCounters.next_number(YEAR)
+
+    counter = OrderCounters.objects.get(id=1)
+    assert (counter.last_reset_year, counter.orders_in_year) == (YEAR, 2)
+
+
+def test_order_numbers_reserved_in_block(
+    db, settings, django_capture_on_commit_callbacks
+):
+    """
+    Блок номеров резервируется одним вызовом, следующий номер идёт после
+    блока, а перешагнутая точка синхронизации пишется в БД.
+    """
+
+    settings.ORDER_COUNTER_SYNC_INTERVAL = 10
+    with django_capture_on_commit_callbacks(execute=True):
+        assert OrderCounters.reserve(YEAR, 25) == 25
+
+    assert OrderCounters.next_number(YEAR) == 26
+    assert OrderCounters.objects.get(id=1).orders_in_year == 25
+
+
+def test_order_counter_falls_back_to_db(db, mocker):
+    """Без Redis номер выдаётся через счётчик в БД."""
+
+    mocker.patch(
+        'orders.models.RedisClient.connect', side_effect=ConnectionError
+    )
+
+    assert OrderCounters.next_number(YEAR) == 1
+    assert OrderCounters.next_number(YEAR) == 2
+
+
+def test_order_number_format(user, mocker):
+    """Номер заказа: YY + порядковый номер."""
+
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    order = Order.objects.create(user=user)
+
+    assert order.order_number == f'{timezone.now().year % 100:02d}1'
+
+
+def _create_orders(user, count):
+    return [Order.objects.create(user=user) for _ in range(count)]
+
+
+def test_fallback_continues_after_unsynced_redis_numbers(
+    user, settings, mocker
+):
+    """
+    Redis упал раньше синхронизации: БД продолжает с последнего заказа,
+    а вернувшийся Redis — с последнего номера, выданного БД.
+    """
+
+    settings.ORDER_COUNTER_SYNC_INTERVAL = 10
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    year = timezone.now().year % 100
+    _create_orders(user, 3)  # Через Redis, в БД счётчик ещё не записан
+
+    redis_down = mocker.patch(
+        'orders.models.RedisClient.connect', side_effect=ConnectionError
+    )
+    during_outage = _create_orders(user, 2)
+    mocker.stop(redis_down)
+    after_outage = _create_orders(user, 2)
+
+    assert [
+        order.order_number for order in during_outage + after_outage
+    ] == [f'{year:02d}{number}' for number in (4, 5, 6, 7)]
+    with RedisClient.connect() as conn:
+        assert int(conn.get(OrderCounters.REDIS_KEY.format(year=year))) == 7
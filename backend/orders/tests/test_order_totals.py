@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+@pytest.fixture
+def order(user, mocker):
+    mocker.patch('orders.signals.send_order_created_message.delay')
+    return Order.objects.create(user=user)
+
+
+@pytest.fixture
+def products(category):
+    return [
+        Product.objects.create(
+            name=f'Товар {i}', category=category, price=Decimal('10.00')
+        )
+        for i in range(1, 4)
+    ]
+
+
+def test_order_totals_recalculated_on_item_changes(order, products):
+    """Сумма заказа пересчитывается при добавлении и удалении позиций."""
+
+    item = OrderItem.objects.create(
+        order=order, product=products[0], quantity=2, price=Decimal('10.00')
+    )
+    OrderItem.objects.create(
+        order=order, product=products[1], quantity=1, price=Decimal('5.50')
+    )
+    assert order.items_total == Decimal('25.50')
+
+    item.delete()
+    order.refresh_from_db()
+
+    assert order.items_total == Decimal('5.50')
+    assert order.total_price == Decimal('5.50')
+
+
+def test_deferred_totals_recalculate_once(order, products):
+    """В блоке deferred_totals суммы считаются один раз на заказ."""
+
+    with CaptureQueriesContext(connection) as ctx:
+        with Order.deferred_totals():
+            for product in products:
+                OrderItem.objects.create(
+                    order=order, product=product, quantity=1,
+                    price=product.price
+                )
+
+    sum_queries = [
+        q for q in ctx.captured_queries if 'SUM(' in q['sql'].upper()
+    ]
+    assert len(sum_queries) == 1
+    order.refresh_from_db()
+    assert order.items_total == Decimal('30.00')
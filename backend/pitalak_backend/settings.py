@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.request_timing.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,17 +78,62 @@ MSG_TELEGRAM_API_URL = os.getenv('MSG_TELEGRAM_API_URL')
 MSG_TELEGRAM_API_TOKEN = os.getenv('MSG_TELEGRAM_API_TOKEN')
 MSG_CAN_SEND_ENDPOINT = os.getenv('MSG_CAN_SEND_ENDPOINT')
 
+# HTTP-клиенты провайдеров (SMS, Telegram Gateway)
+HTTP_CONNECT_TIMEOUT = 3.05
+HTTP_READ_TIMEOUT = 25
+HTTP_RETRY_TOTAL = 2  # Повторы только при ошибке соединения
+HTTP_RETRY_BACKOFF_FACTOR = 0.5
+HTTP_POOL_CONNECTIONS = 4  # Хостов в пуле
+HTTP_POOL_MAXSIZE = 10  # Keep-alive соединений на хост
+
 OTP_LENGTH = 4
 OTP_TTL_SECONDS = 300  # 5 минут
 MAX_OTP_ATTEMPTS = 3
 MAX_OTP_REQUESTS_PER_HOUR = int(os.getenv('MAX_OTP_REQUESTS_PER_HOUR', 3))
 OTP_COOLDOWN_SECONDS = 60  # 1 минута между запросами
+# Защита от перебора: неверных кодов на номер за окно, затем блокировка.
+# За час возможно не больше MAX_OTP_REQUESTS_PER_HOUR * MAX_OTP_ATTEMPTS
+# неудач, поэтому окно — сутки: неудачи копятся между часовыми лимитами
+OTP_MAX_FAILED_ATTEMPTS = 10
+OTP_FAILED_ATTEMPTS_WINDOW_SECONDS = 60 * 60 * 24
 OTP_TEXT = 'Код для входа: {otp}'
+# Доставка OTP: celery — задача на каждый код, async — воркер run_otp_delivery
+OTP_DELIVERY_MODE = os.getenv('OTP_DELIVERY_MODE', 'celery')
+OTP_DELIVERY_CONCURRENCY = 200  # Одновременных доставок в async-воркере
+OTP_TELEGRAM_PREPARE_DEADLINE = 2  # Сек на ответ Telegram до перехода на SMS
+# Пакетная отправка SMS в async-воркере: окно накопления и размер пакета
+SMS_BATCH_WINDOW_SECONDS = 0.2
+SMS_BATCH_MAX_SIZE = 100
 SMS_BALANCE_CACHE_TIMEOUT = 60 * 60 * 24 * 3  # Время кеширования баланса в секундах
+SMS_BALANCE_REFRESH_INTERVAL_SECONDS = 60 * 10  # Фоновое обновление баланса
 
 CHECKOUT_TTL_SECONDS = 1500  # Checkout TTL
 
+# Как часто (в номерах) счётчик заказов из Redis сохраняется в БД
+ORDER_COUNTER_SYNC_INTERVAL = 10
+
+# Время жизни закешированных ответов каталога (инвалидация — по версии)
+CATALOG_CACHE_TTL_SECONDS = 60 * 60
+
+# Окно схлопывания фонового пересчёта PFC, сек
+PFC_RECALC_DEBOUNCE_SECONDS = 5
+
+# Время жизни скомпилированного расписания доставки в Redis
+DELIVERY_SCHEDULE_CACHE_TTL_SECONDS = 60 * 60 * 24
+
+# Хранилище корзины: DatabaseCartStorage или RedisCartStorage
+CART_STORAGE_BACKEND = os.getenv(
+    'CART_STORAGE_BACKEND', 'orders.cart_storage.DatabaseCartStorage'
+)
+CART_REDIS_TTL_SECONDS = 60 * 60 * 24 * 7  # Корзина в Redis живёт неделю
+CART_FLUSH_INTERVAL_SECONDS = 60  # Как часто корзины из Redis пишутся в БД
+
 # Cache settings
+# Доля запросов с замером SQL/Redis и заголовком Server-Timing
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0.05')
+)
+
 REDIS_HOST = os.getenv('REDIS_HOST', '127.0.0.1')
 CACHES = {
     'default': {
@@ -95,6 +141,8 @@ CACHES = {
         'LOCATION': f'redis://{REDIS_HOST}:6379/0',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            # Команды учитываются в RequestTimingMiddleware
+            'REDIS_CLIENT_CLASS': 'core.redis_client.InstrumentedRedis',
         }
     }
 }
@@ -109,10 +157,24 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Yekaterinburg'
 CELERY_TASK_ALWAYS_EAGER = True if DEBUG else False  # Для Prod - False
+CELERY_BEAT_SCHEDULE = {
+    'flush-dirty-carts': {
+        'task': 'orders.tasks.flush_dirty_carts_task',
+        'schedule': CART_FLUSH_INTERVAL_SECONDS,
+    },
+    'refresh-sms-balance': {
+        'task': 'users.tasks.refresh_sms_balance_task',
+        'schedule': SMS_BALANCE_REFRESH_INTERVAL_SECONDS,
+    },
+}
 
 # Secrets bot_telegram
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Куда уходят уведомления: TelegramBackend, ConsoleBackend, MemoryBackend
+NOTIFIER_BACKEND = os.getenv(
+    'NOTIFIER_BACKEND', 'api.services.bot_telegram.TelegramBackend'
+)
 
 # Database
 USE_SQLITE = os.getenv('USE_SQLITE', 'False') == 'True'
@@ -253,7 +315,7 @@ else:
         'handlers': {
             'db': {
                 'level': 'INFO',
-                'class': 'django_db_logger.db_log_handler.DatabaseLogHandler',
+                'class': 'core.log_handlers.BufferedDatabaseLogHandler',
             },
             'telegram': {
                 'level': 'WARNING',
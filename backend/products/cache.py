@@ -0,0 +1,68 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+class CatalogCache:
+    """
+    Версионированный кеш ответов публичного каталога.
+
+    Ключ ответа включает текущую версию каталога, поэтому для инвалидации
+    достаточно увеличить счётчик версии — старые ключи просто истекут по TTL.
+    """
+
+    @staticmethod
+    def get_version() -> int:
+        try:
+            version = cache.get(CATALOG_VERSION_KEY)
+            if version is None:
+                # Ключ версии живёт без TTL
+                cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+                version = cache.get(CATALOG_VERSION_KEY, 1)
+            return int(version)
+        except Exception as e:
+            logger.error('Cache GET error (catalog version): %s', e)
+            return 0
+
+    @staticmethod
+    def bump_version(reason=None) -> None:
+        """Инвалидирует все закешированные ответы каталога."""
+        try:
+            try:
+                version = cache.incr(CATALOG_VERSION_KEY)
+            except ValueError:
+                # Ключа ещё нет — инициализируем
+                cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+                version = cache.incr(CATALOG_VERSION_KEY)
+            logger.info(
+                'Версия каталога увеличена до %s (reason=%s)', version, reason
+            )
+        except Exception as e:
+            logger.error('Cache INCR error (catalog version): %s', e)
+
+    @classmethod
+    def build_key(cls, prefix, *, host, category, page, page_size) -> str:
+        return (
+            f'catalog:v{cls.get_version()}:{prefix}:{host}:'
+            f'{category or ""}:{page or 1}:{page_size or ""}'
+        )
+
+    @staticmethod
+    def get(key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            logger.error('Cache GET error: %s', e)
+            return None
+
+    @staticmethod
+    def set(key, data) -> None:
+        try:
+            cache.set(key, data, settings.CATALOG_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logger.error('Cache SET error: %s', e)
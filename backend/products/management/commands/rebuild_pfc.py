@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.services import ProductService
+
+
+class Command(BaseCommand):
+    help = (
+        'Принудительный полный пересчёт PFC и нутриентов всех продуктов '
+        '(в обход очереди).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество продуктов в одной пачке пересчёта.'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        product_ids = list(
+            Product.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        for start in range(0, len(product_ids), batch_size):
+            batch = product_ids[start:start + batch_size]
+            ProductService.recalc_pfc_for_products(
+                batch, reason='rebuild_pfc command'
+            )
+            ProductService.recalc_nutrients(
+                batch, reason='rebuild_pfc command'
+            )
+            self.stdout.write(
+                f'Пересчитано {min(start + batch_size, len(product_ids))}'
+                f' из {len(product_ids)}'
+            )
+        self.stdout.write(self.style.SUCCESS('Пересчёт PFC завершён.'))
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.11 on 2026-10-17 02:59
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_product_nutrients(apps, schema_editor):
+    """Первичное заполнение таблицы нутриентов продуктов."""
+    IngredientInProduct = apps.get_model('products', 'IngredientInProduct')
+    NutrientInIngredient = apps.get_model('products', 'NutrientInIngredient')
+    ProductNutrient = apps.get_model('products', 'ProductNutrient')
+
+    nutrient_links = defaultdict(list)
+    for ingredient_id, nutrient_id, amount in (
+        NutrientInIngredient.objects.values_list(
+            'ingredient_id', 'nutrient_id', 'amount_per_100g'
+        )
+    ):
+        nutrient_links[ingredient_id].append((nutrient_id, amount))
+
+    compositions = defaultdict(list)
+    for product_id, ingredient_id, amount in (
+        IngredientInProduct.objects.values_list(
+            'product_id', 'ingredient_id', 'amount_per_100g'
+        )
+    ):
+        compositions[product_id].append((ingredient_id, amount))
+
+    rows = []
+    for product_id, composition in compositions.items():
+        total_weight = sum(amount for _, amount in composition)
+        if total_weight == 0:
+            continue
+        totals = defaultdict(Decimal)
+        for ingredient_id, amount in composition:
+            ratio = Decimal(amount) / total_weight
+            for nutrient_id, n_amount in nutrient_links[ingredient_id]:
+                totals[nutrient_id] += n_amount * ratio
+        rows.extend(
+            ProductNutrient(
+                product_id=product_id,
+                nutrient_id=nutrient_id,
+                amount_per_100g=value.quantize(
+                    Decimal('0.001'), rounding=ROUND_HALF_UP
+                ),
+            )
+            for nutrient_id, value in totals.items()
+        )
+    ProductNutrient.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_alter_category_slug_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductNutrient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_per_100g', models.DecimalField(decimal_places=3, max_digits=9, verbose_name='Количество на 100 г. продукта')),
+                ('nutrient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_totals', to='products.nutrient', verbose_name='Нутриент')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrient_totals', to='products.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'нутриент в продукте',
+                'verbose_name_plural': 'нутриенты в продуктах',
+                'ordering': ('nutrient__name',),
+                'constraints': [models.UniqueConstraint(fields=('product', 'nutrient'), name='unique_nutrient_in_product')],
+            },
+        ),
+        migrations.RunPython(
+            fill_product_nutrients, migrations.RunPython.noop
+        ),
+    ]
@@ -245,6 +245,16 @@ class Product(models.Model):
     class Meta:
         verbose_name = 'продукт'
         verbose_name_plural = 'продукты'
+        indexes = (
+            # Каталог: WHERE is_available [AND category_id] ORDER BY id
+            models.Index(
+                fields=('is_available', 'category', 'id'),
+                name='product_available_category_idx'
+            ),
+            models.Index(
+                fields=('is_available', 'id'), name='product_available_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name[:MAX_STR_LENGTH]
@@ -324,6 +334,47 @@ class NutrientInIngredient(models.Model):
         return f'{self.ingredient} — {self.amount_per_100g} ({self.nutrient})'
 
 
+class ProductNutrient(models.Model):
+    """
+    Предрассчитанное количество нутриента на 100 г продукта.
+
+    Заполняется ProductService при изменении состава продукта
+    или нутриентов его ингредиентов.
+    """
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='nutrient_totals',
+        verbose_name='Продукт'
+    )
+    nutrient = models.ForeignKey(
+        Nutrient,
+        on_delete=models.CASCADE,
+        related_name='product_totals',
+        verbose_name='Нутриент'
+    )
+    amount_per_100g = models.DecimalField(
+        verbose_name='Количество на 100 г. продукта',
+        max_digits=9,
+        decimal_places=3,
+    )
+
+    class Meta:
+        verbose_name = 'нутриент в продукте'
+        verbose_name_plural = 'нутриенты в продуктах'
+        ordering = ('nutrient__name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('product', 'nutrient'),
+                name='unique_nutrient_in_product'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.nutrient} — {self.amount_per_100g} ({self.product})'
+
+
 class ProductImage(models.Model):
     """Изображения продукта."""
 
@@ -1,14 +1,25 @@
 import logging
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
 
+from django.conf import settings
 from django.db import transaction
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
 
-from .models import Product
+from core.redis_client import RedisClient
+from .models import (
+    IngredientInProduct, NutrientInIngredient, Product, ProductNutrient
+)
 
 logger = logging.getLogger(__name__)
 
+# Точность промежуточной суммы БЖУ до округления
+PFC_SUM_FIELD = DecimalField(max_digits=12, decimal_places=4)
+
 
 class ProductService:
-    """Сервис для пересчёта и обновления PFC продуктов."""
+    """Сервис для пересчёта и обновления PFC и нутриентов продуктов."""
 
     UPDATE_FIELDS = ['proteins', 'fats', 'carbs', 'energy_value']
 
@@ -31,7 +42,12 @@ class ProductService:
 
     @staticmethod
     def recalc_and_save_pfc_safe(product, reason=None):
-        """Безопасный пересчёт PFC продукта."""
+        """
+        Безопасный пересчёт PFC продукта.
+
+        Продукт ставится в очередь PFCRecalcQueue после фиксации транзакции,
+        сам пересчёт выполняется фоновой задачей.
+        """
         if ProductService._should_skip_recalc(product, reason):
             return
         logger.info(
@@ -39,41 +55,94 @@ class ProductService:
             product.name,
             reason,
         )
+        product_id = product.pk
         transaction.on_commit(
-            lambda: ProductService._recalc_and_save_pfc(product)
+            lambda: PFCRecalcQueue.enqueue(product_ids=[product_id])
         )
 
     @staticmethod
-    @transaction.atomic
-    def _recalc_and_save_pfc(product):
-        """Пересчёт и обновление полей."""
-        data = product.recalc_nutrition()
+    def _pfc_sum(field):
+        """SUM(ingredient.<field> * amount_per_100g / 100) по составу."""
+        return Coalesce(
+            Sum(
+                F(f'product_ingredients__ingredient__{field}')
+                * F('product_ingredients__amount_per_100g')
+                / Value(Decimal('100')),
+                output_field=PFC_SUM_FIELD,
+            ),
+            Value(Decimal('0')),
+            output_field=PFC_SUM_FIELD,
+        )
 
-        fields = ['energy_value']
-        if product.nutrition_mode == product.NutritionMode.AUTO:
-            fields += ['proteins', 'fats', 'carbs']
+    @staticmethod
+    def recalc_pfc_for_products(product_ids, reason=None):
+        """
+        Пакетный пересчёт PFC продуктов.
 
-        update_data = {field: data[field] for field in fields}
-        product.__class__.objects.filter(pk=product.pk).update(**update_data)
+        Для AUTO-продуктов БЖУ считаются одним агрегирующим запросом
+        с группировкой по продукту и записываются одним bulk_update,
+        поэтому количество запросов не зависит от числа продуктов.
+        Для MANUAL-продуктов пересчитывается только калорийность.
+        """
+        products = list(
+            Product.objects
+            .filter(pk__in=product_ids)
+            .exclude(nutrition_mode=Product.NutritionMode.NONE)
+            .annotate(
+                sum_proteins=ProductService._pfc_sum('proteins'),
+                sum_fats=ProductService._pfc_sum('fats'),
+                sum_carbs=ProductService._pfc_sum('carbs'),
+            )
+        )
+        if not products:
+            logger.info(
+                'Нет продуктов для пересчёта PFC (reason=%s)', reason
+            )
+            return []
 
-        # Синхронизируем объект в памяти
-        for field, value in update_data.items():
-            setattr(product, field, value)
+        invalid_products = []  # Для логирования проблемных
+        for product in products:
+            if product.nutrition_mode == Product.NutritionMode.AUTO:
+                # Округляем до 1 знака после запятой
+                product.proteins = product.sum_proteins.quantize(
+                    Decimal('0.1'), rounding=ROUND_HALF_UP
+                )
+                product.fats = product.sum_fats.quantize(
+                    Decimal('0.1'), rounding=ROUND_HALF_UP
+                )
+                product.carbs = product.sum_carbs.quantize(
+                    Decimal('0.1'), rounding=ROUND_HALF_UP
+                )
+            product.energy_value = int(
+                product.proteins * Decimal('4')
+                + product.fats * Decimal('9')
+                + product.carbs * Decimal('4')
+            )
+            total = product.proteins + product.fats + product.carbs
+            if total > 100:
+                invalid_products.append((product.name, float(total)))
 
-        logger.info('Пересчёт PFC для "%s" успешно завершён', product.name)
-        # Логируем превышение БЖУ
-        total = product.proteins + product.fats + product.carbs
-        if total > 100:
+        with transaction.atomic():
+            Product.objects.bulk_update(
+                products, ProductService.UPDATE_FIELDS
+            )
+        logger.info(
+            'Пересчитаны PFC для %d продуктов (reason=%s)',
+            len(products),
+            reason,
+        )
+        # Логируем проблемы
+        if invalid_products:
             logger.warning(
-                'Некорректные значения БЖУ для "%s":'
-                ' сумма = %.2f г. > 100 г.',
-                product.name, total
+                'Обнаружены продукты с некорректными БЖУ (>100г): %s',
+                ', '.join(f'"{n}" ({t:.2f}г)' for n, t in invalid_products),
             )
+        return products
 
     @staticmethod
     def recalc_all_products_using_ingredient(ingredient, reason=None):
         """
-        Пересчитывает PFC для всех продуктов, использующих данный ингредиент.
+        Ставит в очередь пересчёт PFC всех продуктов с данным ингредиентом.
         """
         logger.info(
             'Ингредиент "%s" обновлен, пересчёт PFC для всех продуктов'
@@ -81,58 +150,275 @@ class ProductService:
             ingredient.name,
             reason,
         )
-        # Находим все продукты, где используется этот ингредиент
-        products = (
-            Product.objects.filter(product_ingredients__ingredient=ingredient)
-            .distinct()
+        ingredient_id = ingredient.pk
+        transaction.on_commit(
+            lambda: PFCRecalcQueue.enqueue(ingredient_ids=[ingredient_id])
         )
-        if not products.exists():
-            logger.info(
-                'Нет продуктов, использующих ингредиент "%s" '
-                '— пересчёт не требуется.',
-                ingredient.name,
+
+    @staticmethod
+    def recalc_pfc_for_changes(product_ids=(), ingredient_ids=(), reason=None):
+        """
+        Пересчёт PFC изменённых продуктов и продуктов,
+        содержащих изменённые ингредиенты.
+        """
+        product_ids = set(product_ids)
+        if ingredient_ids:
+            product_ids.update(
+                IngredientInProduct.objects.filter(
+                    ingredient_id__in=ingredient_ids
+                ).values_list('product_id', flat=True)
             )
-            return
-        updated_products = []
-        invalid_products = []  # Добавим список для логирования проблемных
-        for product in products:
-            # Пропускаем несохранённые и ручные режимы
-            if ProductService._should_skip_recalc(
-                product, reason=f'ingredient "{ingredient.name}" changed'
-            ):
-                continue
-            # Пересчёт нутриентов
-            data = product.recalc_nutrition()
-            # Вычислим сумму БЖУ перед обновлением
-            total = (
-                data.get('proteins', 0)
-                + data.get('fats', 0)
-                + data.get('carbs', 0)
+        if not product_ids:
+            return 0
+        ProductService.recalc_pfc_for_products(product_ids, reason=reason)
+        return len(product_ids)
+
+    @staticmethod
+    def recalc_nutrients_for_changes(
+        product_ids=(), ingredient_ids=(), reason=None
+    ):
+        """
+        Пересчёт нутриентов изменённых продуктов и продуктов,
+        содержащих ингредиенты с изменёнными нутриентами.
+        """
+        product_ids = set(product_ids)
+        if ingredient_ids:
+            product_ids.update(
+                IngredientInProduct.objects.filter(
+                    ingredient_id__in=ingredient_ids
+                ).values_list('product_id', flat=True)
             )
-            if total > 100:
-                invalid_products.append((product.name, float(total)))
+        if not product_ids:
+            return 0
+        ProductService.recalc_nutrients(product_ids, reason=reason)
+        return len(product_ids)
 
-            for field in ProductService.UPDATE_FIELDS:
-                setattr(product, field, data[field])
-            updated_products.append(product)
-        # Массовое обновление
-        if updated_products:
-            with transaction.atomic():
-                Product.objects.bulk_update(
-                    updated_products,
-                    ProductService.UPDATE_FIELDS,
-                    batch_size=100,
-                )
-            logger.info(
-                'Обновлено %d продуктов, содержащих ингредиент "%s".',
-                len(updated_products),
-                ingredient.name,
-            )
-            # Логируем проблемы
-            if invalid_products:
-                logger.warning(
-                    'Обнаружены продукты с некорректными БЖУ (>100г): %s',
-                    ', '.join(
-                        f'"{n}" ({t:.2f}г)' for n, t in invalid_products
+    @staticmethod
+    def process_pfc_queue():
+        """
+        Забирает накопленные id из очереди и пересчитывает PFC
+        и нутриенты продуктов. Возвращает число пересчётов.
+        """
+        ids = PFCRecalcQueue.drain()
+        (
+            product_ids, ingredient_ids,
+            nutrient_product_ids, nutrient_ingredient_ids,
+        ) = ids
+        try:
+            count = ProductService.recalc_pfc_for_changes(
+                product_ids, ingredient_ids, reason='pfc recalc queue'
+            ) + ProductService.recalc_nutrients_for_changes(
+                nutrient_product_ids, nutrient_ingredient_ids,
+                reason='nutrients recalc queue'
+            )
+        except Exception:
+            # Id остаются в ключах обработки; возвращаем их в очередь,
+            # чтобы повторный пересчёт запланировался сразу
+            PFCRecalcQueue.enqueue(*ids)
+            raise
+        PFCRecalcQueue.ack()
+        return count
+
+    @staticmethod
+    def recalc_composition_safe(product_id, reason=None):
+        """
+        Ставит в очередь PFC и нутриенты продукта с изменённым составом.
+        """
+        logger.info(
+            'Состав продукта id=%s изменён, пересчёт в очереди (reason=%s)',
+            product_id,
+            reason,
+        )
+        transaction.on_commit(
+            lambda: PFCRecalcQueue.enqueue(
+                product_ids=[product_id], nutrient_product_ids=[product_id]
+            )
+        )
+
+    @staticmethod
+    def recalc_nutrients_for_ingredient_safe(ingredient_id, reason=None):
+        """Ставит в очередь нутриенты всех продуктов с ингредиентом."""
+        logger.info(
+            'Нутриенты ингредиента id=%s изменены, пересчёт в очереди'
+            ' (reason=%s)',
+            ingredient_id,
+            reason,
+        )
+        transaction.on_commit(
+            lambda: PFCRecalcQueue.enqueue(
+                nutrient_ingredient_ids=[ingredient_id]
+            )
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def recalc_nutrients(product_ids, reason=None):
+        """
+        Пересчитывает таблицу ProductNutrient для набора продуктов.
+
+        Количество нутриента берётся пропорционально доле ингредиента
+        в общем весе состава. Число запросов не зависит от количества
+        продуктов и ингредиентов.
+        """
+        product_ids = set(product_ids)
+        compositions = defaultdict(list)
+        for product_id, ingredient_id, amount in (
+            IngredientInProduct.objects.filter(product_id__in=product_ids)
+            .values_list('product_id', 'ingredient_id', 'amount_per_100g')
+        ):
+            compositions[product_id].append((ingredient_id, amount))
+
+        ingredient_ids = {
+            ingredient_id
+            for composition in compositions.values()
+            for ingredient_id, _ in composition
+        }
+        nutrient_links = defaultdict(list)
+        for ingredient_id, nutrient_id, amount in (
+            NutrientInIngredient.objects
+            .filter(ingredient_id__in=ingredient_ids)
+            .values_list('ingredient_id', 'nutrient_id', 'amount_per_100g')
+        ):
+            nutrient_links[ingredient_id].append((nutrient_id, amount))
+
+        rows = []
+        for product_id, composition in compositions.items():
+            total_weight = sum(amount for _, amount in composition)
+            if total_weight == 0:
+                continue
+            totals = defaultdict(Decimal)
+            for ingredient_id, amount in composition:
+                # Доля ингредиента в продукте
+                ratio = Decimal(amount) / total_weight
+                for nutrient_id, n_amount in nutrient_links[ingredient_id]:
+                    totals[nutrient_id] += n_amount * ratio
+            rows.extend(
+                ProductNutrient(
+                    product_id=product_id,
+                    nutrient_id=nutrient_id,
+                    amount_per_100g=value.quantize(
+                        Decimal('0.001'), rounding=ROUND_HALF_UP
                     ),
                 )
+                for nutrient_id, value in totals.items()
+            )
+
+        ProductNutrient.objects.filter(product_id__in=product_ids).delete()
+        ProductNutrient.objects.bulk_create(rows, batch_size=500)
+        logger.info(
+            'Пересчитаны нутриенты для %d продуктов (reason=%s)',
+            len(product_ids),
+            reason,
+        )
+
+
+class PFCRecalcQueue:
+    """
+    Очередь отложенного пересчёта PFC и нутриентов в Redis.
+
+    Изменённые продукты и ингредиенты складываются в множества, поэтому
+    повторные сохранения схлопываются. Задача-обработчик планируется
+    один раз на окно PFC_RECALC_DEBOUNCE_SECONDS.
+    """
+
+    DIRTY_PRODUCTS_KEY = 'pfc_recalc:products'
+    DIRTY_INGREDIENTS_KEY = 'pfc_recalc:ingredients'
+    NUTRIENT_PRODUCTS_KEY = 'pfc_recalc:nutrients:products'
+    NUTRIENT_INGREDIENTS_KEY = 'pfc_recalc:nutrients:ingredients'
+    SCHEDULED_KEY = 'pfc_recalc:scheduled'
+
+    @classmethod
+    def enqueue(
+        cls, product_ids=(), ingredient_ids=(), nutrient_product_ids=(),
+        nutrient_ingredient_ids=()
+    ):
+        """
+        Добавляет id в очередь и планирует обработку (если ещё нет).
+        nutrient_* — продукты и ингредиенты для пересчёта нутриентов.
+        """
+        sets = {
+            cls.DIRTY_PRODUCTS_KEY: product_ids,
+            cls.DIRTY_INGREDIENTS_KEY: ingredient_ids,
+            cls.NUTRIENT_PRODUCTS_KEY: nutrient_product_ids,
+            cls.NUTRIENT_INGREDIENTS_KEY: nutrient_ingredient_ids,
+        }
+        try:
+            with RedisClient.connect() as conn:
+                pipe = conn.pipeline()
+                for key, ids in sets.items():
+                    if ids:
+                        pipe.sadd(key, *ids)
+                # Флаг живёт дольше окна на случай задержки воркера
+                pipe.set(
+                    cls.SCHEDULED_KEY, 1, nx=True,
+                    ex=settings.PFC_RECALC_DEBOUNCE_SECONDS * 10,
+                )
+                scheduled = pipe.execute()[-1]
+        except Exception as e:
+            logger.error(
+                'Очередь PFC недоступна, синхронный пересчёт: %s', e
+            )
+            ProductService.recalc_pfc_for_changes(
+                product_ids, ingredient_ids, reason='pfc recalc fallback'
+            )
+            ProductService.recalc_nutrients_for_changes(
+                nutrient_product_ids, nutrient_ingredient_ids,
+                reason='nutrients recalc fallback'
+            )
+            return
+
+        if scheduled:
+            cls._schedule()
+
+    @classmethod
+    def _schedule(cls):
+        from .tasks import recalc_pfc_queue_task
+
+        try:
+            recalc_pfc_queue_task.apply_async(
+                countdown=settings.PFC_RECALC_DEBOUNCE_SECONDS
+            )
+        except Exception as e:
+            logger.error('Не удалось запланировать пересчёт PFC: %s', e)
+            with RedisClient.connect() as conn:
+                conn.delete(cls.SCHEDULED_KEY)
+
+    @classmethod
+    def _keys(cls):
+        return (
+            cls.DIRTY_PRODUCTS_KEY, cls.DIRTY_INGREDIENTS_KEY,
+            cls.NUTRIENT_PRODUCTS_KEY, cls.NUTRIENT_INGREDIENTS_KEY,
+        )
+
+    @staticmethod
+    def _processing_key(key):
+        return f'{key}:processing'
+
+    @classmethod
+    def drain(cls):
+        """
+        Атомарно переносит очередь в ключи обработки и возвращает их
+        содержимое: (product_ids, ingredient_ids, nutrient_product_ids,
+        nutrient_ingredient_ids).
+
+        Ключи обработки удаляет ack после успешного пересчёта. Если
+        обработчик упал или был убит, id остаются там и попадут в
+        следующий drain.
+        """
+        with RedisClient.connect() as conn:
+            # Снимаем флаг до чтения, чтобы новые id запланировали задачу
+            conn.delete(cls.SCHEDULED_KEY)
+            pipe = conn.pipeline(transaction=True)
+            for key in cls._keys():
+                processing_key = cls._processing_key(key)
+                pipe.sunionstore(processing_key, [processing_key, key])
+                pipe.delete(key)
+                pipe.smembers(processing_key)
+            members = pipe.execute()[2::3]
+        return tuple({int(pk) for pk in ids} for ids in members)
+
+    @classmethod
+    def ack(cls):
+        """Удаляет ключи обработки после успешного пересчёта."""
+        with RedisClient.connect() as conn:
+            conn.delete(*(cls._processing_key(key) for key in cls._keys()))
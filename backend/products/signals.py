@@ -1,18 +1,29 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Product, Ingredient
+from .cache import CatalogCache
+from .models import (
+    Category, Ingredient, IngredientInProduct, NutrientInIngredient, Product,
+    ProductImage
+)
 from .services import ProductService
 
 logger = logging.getLogger(__name__)
 
 
+def invalidate_catalog_cache(reason):
+    """Сбрасывает кеш каталога после фиксации транзакции."""
+    transaction.on_commit(lambda: CatalogCache.bump_version(reason=reason))
+
+
 @receiver(post_save, sender=Product)
 def update_product_after_saved(sender, instance, **kwargs):
     """После сохранения продукта — пересчитать PFC."""
     ProductService.recalc_and_save_pfc_safe(instance, reason='product saved')
+    invalidate_catalog_cache(reason='product saved')
 
 
 @receiver(post_save, sender=Ingredient)
@@ -21,3 +32,33 @@ def update_all_product_with_change_ingredient(sender, instance, **kwargs):
     ProductService.recalc_all_products_using_ingredient(
         instance, reason='ingredient saved'
     )
+
+
+@receiver(post_save, sender=IngredientInProduct)
+@receiver(post_delete, sender=IngredientInProduct)
+def update_product_nutrients(sender, instance, **kwargs):
+    """При изменении состава — пересчитать PFC и нутриенты продукта."""
+    ProductService.recalc_composition_safe(
+        instance.product_id, reason='product composition changed'
+    )
+
+
+@receiver(post_save, sender=NutrientInIngredient)
+@receiver(post_delete, sender=NutrientInIngredient)
+def update_nutrients_with_change_ingredient(sender, instance, **kwargs):
+    """При изменении нутриентов ингредиента — обновить его продукты."""
+    ProductService.recalc_nutrients_for_ingredient_safe(
+        instance.ingredient_id, reason='ingredient nutrients changed'
+    )
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=IngredientInProduct)
+@receiver(post_delete, sender=IngredientInProduct)
+def catalog_changed(sender, **kwargs):
+    """Любое изменение витрины — новая версия кеша каталога."""
+    invalidate_catalog_cache(reason=f'{sender.__name__} changed')
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .services import ProductService
+
+
+@shared_task
+def recalc_pfc_queue_task():
+    """Пересчитывает PFC продуктов, накопленных в очереди за окно."""
+    return ProductService.process_pfc_queue()
@@ -5,6 +5,17 @@ import pytest
 from products.models import Ingredient, Nutrient
 
 
+@pytest.fixture(autouse=True)
+def celery_eager(settings):
+    """
+    Задачи Celery выполняются сразу, независимо от DEBUG.
+
+    Пересчёт PFC и нутриентов идёт через задачу PFCRecalcQueue, а
+    CELERY_TASK_ALWAYS_EAGER включён только при DEBUG.
+    """
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+
+
 @pytest.fixture()
 def force_on_commit_execution(monkeypatch):
     """
@@ -0,0 +1,128 @@
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import DatabaseError
+
+from products.models import (
+    Ingredient, IngredientInProduct, NutrientInIngredient, Product,
+    ProductNutrient
+)
+from products.services import PFCRecalcQueue, ProductService
+
+
+def test_pfc_queue_coalesces_repeated_saves(
+    mocker, product_auto, ingredient_honey
+):
+    """Повторные сохранения схлопываются: одна задача, один пересчёт."""
+
+    apply_async = mocker.patch(
+        'products.tasks.recalc_pfc_queue_task.apply_async'
+    )
+    IngredientInProduct.objects.create(
+        product=product_auto, ingredient=ingredient_honey,
+        amount_per_100g=Decimal('50.00')
+    )
+
+    for _ in range(3):
+        PFCRecalcQueue.enqueue(product_ids=[product_auto.pk])
+    PFCRecalcQueue.enqueue(ingredient_ids=[ingredient_honey.pk])
+
+    apply_async.assert_called_once()
+    assert ProductService.process_pfc_queue() == 1
+    # Очередь пуста после обработки
+    assert PFCRecalcQueue.drain() == (set(), set(), set(), set())
+
+    product_auto.refresh_from_db()
+    assert product_auto.carbs == Decimal('40.0')
+
+
+def test_rebuild_pfc_command(product_auto, ingredient_honey):
+    """Команда rebuild_pfc пересчитывает все продукты."""
+
+    IngredientInProduct.objects.create(
+        product=product_auto, ingredient=ingredient_honey,
+        amount_per_100g=Decimal('100.00')
+    )
+    Product.objects.filter(pk=product_auto.pk).update(carbs=0)
+
+    call_command('rebuild_pfc')
+
+    product_auto.refresh_from_db()
+    assert product_auto.carbs == ingredient_honey.carbs
+
+
+def test_composition_signals_recalculate_nutrients_once(
+    mocker, product_auto, nutrient_vit_g, django_capture_on_commit_callbacks
+):
+    """
+    Сохранение 20 строк состава и нутриентов только ставит id в очередь,
+    нутриенты пересчитываются одним проходом при обработке.
+    """
+
+    apply_async = mocker.patch(
+        'products.tasks.recalc_pfc_queue_task.apply_async'
+    )
+    recalc_nutrients = mocker.spy(ProductService, 'recalc_nutrients')
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент{i}') for i in range(20)
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for ingredient in ingredients:
+            IngredientInProduct.objects.create(
+                product=product_auto, ingredient=ingredient,
+                amount_per_100g=Decimal('5.00')
+            )
+            NutrientInIngredient.objects.create(
+                ingredient=ingredient, nutrient=nutrient_vit_g,
+                amount_per_100g=Decimal('2.000')
+            )
+
+    apply_async.assert_called_once()
+    recalc_nutrients.assert_not_called()
+
+    ProductService.process_pfc_queue()
+
+    recalc_nutrients.assert_called_once()
+    assert ProductNutrient.objects.get(
+        product=product_auto
+    ).amount_per_100g == Decimal('2.000')
+
+
+def test_pfc_queue_keeps_ids_when_recalc_fails(
+    mocker, product_auto, ingredient_honey
+):
+    """Ошибка пересчёта не теряет id: повторная обработка их пересчитает."""
+
+    mocker.patch('products.tasks.recalc_pfc_queue_task.apply_async')
+    IngredientInProduct.objects.create(
+        product=product_auto, ingredient=ingredient_honey,
+        amount_per_100g=Decimal('50.00')
+    )
+    PFCRecalcQueue.enqueue(product_ids=[product_auto.pk])
+    failing = mocker.patch.object(
+        ProductService, 'recalc_pfc_for_changes',
+        side_effect=DatabaseError('БД недоступна')
+    )
+
+    with pytest.raises(DatabaseError):
+        ProductService.process_pfc_queue()
+
+    mocker.stop(failing)
+    assert ProductService.process_pfc_queue() == 1
+    product_auto.refresh_from_db()
+    assert product_auto.carbs == Decimal('40.0')
+
+
+def test_pfc_queue_returns_unacked_ids(mocker, product_auto):
+    """Id, забранные убитым обработчиком, возвращает следующий drain."""
+
+    mocker.patch('products.tasks.recalc_pfc_queue_task.apply_async')
+    PFCRecalcQueue.enqueue(product_ids=[product_auto.pk])
+
+    PFCRecalcQueue.drain()  # Обработчик умер до ack
+
+    assert PFCRecalcQueue.drain()[0] == {product_auto.pk}
+    PFCRecalcQueue.ack()
+    assert PFCRecalcQueue.drain() == (set(), set(), set(), set())
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import (
+    Ingredient, IngredientInProduct, NutrientInIngredient, ProductNutrient
+)
+
+
+def test_product_nutrients_recalculated_on_composition_change(
+    product_auto, ingredient_honey, nutrient_vit_g,
+    django_capture_on_commit_callbacks
+):
+    """Добавление ингредиента пересчитывает нутриенты продукта."""
+
+    nuts = Ingredient.objects.create(name='Орехи')
+    NutrientInIngredient.objects.create(
+        ingredient=ingredient_honey, nutrient=nutrient_vit_g,
+        amount_per_100g=Decimal('3.000')
+    )
+    NutrientInIngredient.objects.create(
+        ingredient=nuts, nutrient=nutrient_vit_g,
+        amount_per_100g=Decimal('1.000')
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        IngredientInProduct.objects.create(
+            product=product_auto, ingredient=ingredient_honey,
+            amount_per_100g=Decimal('30.00')
+        )
+        IngredientInProduct.objects.create(
+            product=product_auto, ingredient=nuts,
+            amount_per_100g=Decimal('10.00')
+        )
+
+    total = ProductNutrient.objects.get(
+        product=product_auto, nutrient=nutrient_vit_g
+    )
+    # 3 * 30/40 + 1 * 10/40
+    assert total.amount_per_100g == Decimal('2.500')
+
+
+def test_product_nutrients_recalculated_on_nutrient_link_change(
+    product_auto, ingredient_honey, nutrient_vit_g,
+    django_capture_on_commit_callbacks
+):
+    """Изменение нутриентов ингредиента обновляет продукты с ним."""
+
+    IngredientInProduct.objects.create(
+        product=product_auto, ingredient=ingredient_honey,
+        amount_per_100g=Decimal('50.00')
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        link = NutrientInIngredient.objects.create(
+            ingredient=ingredient_honey, nutrient=nutrient_vit_g,
+            amount_per_100g=Decimal('4.000')
+        )
+    assert product_auto.nutrient_totals.get().amount_per_100g == Decimal('4')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        link.delete()
+
+    assert not product_auto.nutrient_totals.exists()
+
+
+def test_product_detail_reads_precomputed_nutrients(
+    client, product_auto, ingredient_honey, nutrient_vit_g,
+    django_capture_on_commit_callbacks
+):
+    """Детальная карточка отдаёт нутриенты из ProductNutrient."""
+
+    with django_capture_on_commit_callbacks(execute=True):
+        NutrientInIngredient.objects.create(
+            ingredient=ingredient_honey, nutrient=nutrient_vit_g,
+            amount_per_100g=Decimal('2.000')
+        )
+        IngredientInProduct.objects.create(
+            product=product_auto, ingredient=ingredient_honey,
+            amount_per_100g=Decimal('100.00')
+        )
+
+    nutrient_vit_g.refresh_from_db()
+
+    response = client.get(
+        reverse('api:products-detail', args=(product_auto.id,))
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['nutrients'] == [{
+        'name': nutrient_vit_g.name,
+        'amount_per_100g': Decimal('2.000'),
+        'measurement_unit': nutrient_vit_g.measurement_unit,
+        'rda': nutrient_vit_g.rda,
+    }]
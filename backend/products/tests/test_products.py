@@ -2,7 +2,9 @@ from decimal import Decimal
 
 import pytest
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 
 
 from products.models import Ingredient, IngredientInProduct, Product
@@ -116,7 +118,9 @@ def test_product_post_save_signal_triggers_recalc(
     assert product_auto.carbs == ingredient_honey.carbs
 
 
-def test_recalc_all_products_via_service(product_auto, ingredient_honey):
+def test_recalc_all_products_via_service(
+    product_auto, ingredient_honey, force_on_commit_execution
+):
     """Проверка: изменение ингредиента обновляет ВСЕ связанные продукты."""
 
     # Создаем второй продукт
@@ -153,6 +157,40 @@ def test_recalc_all_products_via_service(product_auto, ingredient_honey):
     assert product_auto_2.energy_value == expected_energy
 
 
+def test_recalc_on_ingredient_save_constant_queries(
+    product_auto, ingredient_honey, force_on_commit_execution
+):
+    """Проверка: число запросов пересчёта не зависит от числа продуктов."""
+
+    def save_and_count_queries():
+        with CaptureQueriesContext(connection) as ctx:
+            ingredient_honey.save()
+        return len(ctx.captured_queries)
+
+    IngredientInProduct.objects.create(
+        product=product_auto, ingredient=ingredient_honey,
+        amount_per_100g=Decimal('50')
+    )
+    single_product_queries = save_and_count_queries()
+
+    for i in range(10):
+        product = Product.objects.create(
+            name=f'Конфета {i}',
+            nutrition_mode=Product.NutritionMode.AUTO,
+            category=product_auto.category,
+            price=Decimal('150.00')
+        )
+        IngredientInProduct.objects.create(
+            product=product, ingredient=ingredient_honey,
+            amount_per_100g=Decimal('50')
+        )
+
+    assert save_and_count_queries() == single_product_queries
+    product.refresh_from_db()
+    # 80 * 50 / 100
+    assert product.carbs == Decimal('40.0')
+
+
 def test_product_recalc_skipped_in_manual_mode(
     product_manual, ingredient_honey, force_on_commit_execution
 ):
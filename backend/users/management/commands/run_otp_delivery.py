@@ -0,0 +1,21 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from users.otp_delivery import OTPDeliveryWorker
+
+
+class Command(BaseCommand):
+    help = (
+        'Асинхронный воркер доставки OTP (OTP_DELIVERY_MODE=async): '
+        'Telegram Gateway с быстрым переходом на SMS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Сколько доставок выполнять одновременно.'
+        )
+
+    def handle(self, *args, **options):
+        asyncio.run(OTPDeliveryWorker(options['concurrency']).run())
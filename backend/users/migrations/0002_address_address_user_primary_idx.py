@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='address',
+            index=models.Index(fields=['user', 'is_primary'], name='address_user_primary_idx'),
+        ),
+    ]
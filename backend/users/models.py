@@ -129,6 +129,11 @@ class Address(models.Model):
         verbose_name = 'Адрес'
         verbose_name_plural = 'Адреса'
         ordering = ('added',)
+        indexes = [
+            models.Index(
+                fields=('user', 'is_primary'), name='address_user_primary_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user'],
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import secrets
+import signal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from redis import asyncio as aioredis
+
+from api.services.http_session import build_async_client
+from api.services.sms_batcher import SMSBatcher
+from api.services.sms_provider import TargetSMSClient, TelegramClient
+from core.redis_client import RedisClient
+from users.tasks import schedule_sms_balance_refresh
+
+logger = logging.getLogger(__name__)
+
+OTP_DELIVERY_QUEUE_KEY = 'otp_delivery:queue'
+OTP_DELIVERY_CODE_KEY = 'otp_delivery:code:{ref}'
+
+
+class OTPDeliveryQueue:
+    """
+    Очередь OTP для асинхронного воркера доставки (список в Redis).
+
+    В списке лежат только телефон и случайная ссылка. Сам код хранится
+    в отдельном ключе с TTL кода: воркер забирает его один раз, а
+    неотправленный код истекает вместе с OTP и не копится в снимках Redis.
+    """
+
+    @staticmethod
+    def push(phone: str, otp: str) -> None:
+        ref = secrets.token_urlsafe(16)
+        job = json.dumps({'phone': phone, 'ref': ref})
+        with RedisClient.connect() as conn:
+            pipe = conn.pipeline()
+            pipe.set(
+                OTP_DELIVERY_CODE_KEY.format(ref=ref), otp,
+                ex=settings.OTP_TTL_SECONDS,
+            )
+            pipe.rpush(OTP_DELIVERY_QUEUE_KEY, job)
+            pipe.execute()
+
+    @staticmethod
+    async def take_code(redis, ref: str) -> str | None:
+        """Забирает и удаляет код задания; None — код уже истёк."""
+        key = OTP_DELIVERY_CODE_KEY.format(ref=ref)
+        async with redis.pipeline(transaction=True) as pipe:
+            otp, _ = await pipe.get(key).delete(key).execute()
+        return otp.decode() if otp is not None else None
+
+
+async def deliver_otp(phone: str, otp: str, client,
+                      sms_batcher: SMSBatcher | None = None) -> str | None:
+    """
+    Доставляет OTP через Telegram Gateway, SMS — запасной канал.
+
+    Каналы пробуются последовательно (failover, не параллельный hedge):
+    на prepare_send Telegram отводится OTP_TELEGRAM_PREPARE_DEADLINE
+    секунд. Не успел — запрос отменяется и только тогда уходит SMS, не
+    дожидаясь полного таймаута Telegram. Параллельная отправка могла бы
+    доставить код дважды и оплатить лишнее SMS. С sms_batcher SMS
+    одновременных доставок уходят одним запросом к провайдеру.
+    """
+    tg_client = TelegramClient()
+    prepare = asyncio.ensure_future(tg_client.aprepare_send(phone, client))
+    done, _ = await asyncio.wait(
+        {prepare}, timeout=settings.OTP_TELEGRAM_PREPARE_DEADLINE
+    )
+
+    if not done:
+        prepare.cancel()
+        logger.warning(
+            'Telegram не ответил за %s сек для %s, fallback to SMS',
+            settings.OTP_TELEGRAM_PREPARE_DEADLINE, phone,
+        )
+    elif request_id := prepare.result():
+        message_id = await tg_client.asend_sms(phone, otp, request_id, client)
+        if message_id:
+            logger.info(
+                'OTP отправка через Telegram для %s, message_id=%s',
+                phone, message_id,
+            )
+            return message_id
+        logger.warning(
+            'Telegram неудачная отправка на %s, fallback to SMS', phone
+        )
+
+    if sms_batcher is not None:
+        sms_message_id = await sms_batcher.send(
+            phone, settings.OTP_TEXT.format(otp=otp)
+        )
+    else:
+        sms_message_id = await TargetSMSClient().asend_sms(phone, otp, client)
+    if sms_message_id:
+        logger.info(
+            'OTP отправлено через SMS для %s, message_id=%s',
+            phone, sms_message_id,
+        )
+        await sync_to_async(schedule_sms_balance_refresh)()
+        return sms_message_id
+
+    logger.error('OTP неудачная отправка на %s, ничего не получилось!', phone)
+    return None
+
+
+class OTPDeliveryWorker:
+    """
+    Воркер доставки OTP на asyncio: забирает задания из Redis и держит
+    до OTP_DELIVERY_CONCURRENCY доставок одновременно в одном процессе.
+    """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = concurrency or settings.OTP_DELIVERY_CONCURRENCY
+        self._stopping = False
+
+    def stop(self):
+        logger.info('Воркер доставки OTP: остановка')
+        self._stopping = True
+
+    async def _deliver(self, job, redis, client, sms_batcher):
+        # Код, пролежавший в очереди дольше своего TTL, уже удалён
+        otp = await OTPDeliveryQueue.take_code(redis, job['ref'])
+        if otp is None:
+            logger.warning('OTP для %s просрочен в очереди', job['phone'])
+            return
+        if settings.DEBUG:
+            logger.info(
+                'DEV MODE: Отправка SMS пропущена для %s', job['phone']
+            )
+            return
+        try:
+            await deliver_otp(
+                job['phone'], otp, client, sms_batcher=sms_batcher
+            )
+        except Exception:
+            logger.exception('Ошибка доставки OTP для %s', job['phone'])
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        redis = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+        semaphore = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+        logger.info(
+            'Воркер доставки OTP запущен, параллельно до %s',
+            self.concurrency,
+        )
+        async with build_async_client() as client:
+            sms_batcher = SMSBatcher(client)
+            while not self._stopping:
+                await semaphore.acquire()
+                item = await redis.blpop([OTP_DELIVERY_QUEUE_KEY], timeout=1)
+                if item is None:
+                    semaphore.release()
+                    continue
+                task = asyncio.create_task(
+                    self._deliver(
+                        json.loads(item[1]), redis, client, sms_batcher
+                    )
+                )
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+            # Дожидаемся уже начатых доставок
+            await asyncio.gather(*in_flight)
+            await sms_batcher.aclose()
+        await redis.aclose()
@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 import logging
 import secrets
 import string
@@ -8,6 +10,8 @@ from redis.exceptions import ConnectionError, RedisError
 from rest_framework.exceptions import Throttled
 
 from core.redis_client import RedisClient
+from users import otp_scripts
+from users.otp_delivery import OTPDeliveryQueue
 from users.tasks import send_otp_sms_task
 
 
@@ -17,6 +21,8 @@ logger = logging.getLogger(__name__)
 class OTPManager:
     """Унифицированный менеджер для работы с OTP и ограничениями."""
 
+    _scripts = {}  # Зарегистрированные Lua-скрипты
+
     @staticmethod
     def generate_otp() -> str:
         otp = ''.join(
@@ -32,115 +38,123 @@ class OTPManager:
             'otp': f'otp_{phone}',
             'rate': f'otp_rate_{phone}',
             'cooldown': f'otp_last_request_{phone}',
+            'failures': f'otp_failures_{phone}',
         }
 
     @classmethod
-    def can_send_otp(cls, phone):
-        """Проверка лимита и кулдауна."""
-        keys = cls._get_keys(phone)
-        with RedisClient.connect() as conn:
-            # Атомарно проверяем оба условия
-            pipe = conn.pipeline()
-            pipe.get(keys['rate'])
-            pipe.ttl(keys['rate'])
-            pipe.ttl(keys['cooldown'])
-            count, rate_ttl, cooldown_ttl = pipe.execute()
-            count = int(count or 0)
-            # Hourly rate
-            if count >= settings.MAX_OTP_REQUESTS_PER_HOUR:
-                minutes = (rate_ttl + 59) // 60
-                logger.warning('Превышен лимит OTP для %s, '
-                               'блокировка на %s мин.', phone, minutes)
-                raise Throttled(
-                    wait=rate_ttl,
-                    detail=f'Превышен лимит запросов. '
-                    f'Попробуйте через {minutes} минут.'
-                )
-            # Cooldown
-            if cooldown_ttl > 0:
-                logger.warning(
-                    'Кулдаун активен для %s, '
-                    'осталось %s сек.', phone, cooldown_ttl
-                )
-                raise Throttled(
-                    wait=cooldown_ttl,
-                    detail=f'Подождите {cooldown_ttl} секунд '
-                    f'перед следующим запросом.'
-                )
+    def _script(cls, conn, name):
+        """
+        Lua-скрипт из users.otp_scripts. Вызов идёт через EVALSHA,
+        SCRIPT LOAD выполняется один раз (или после сброса кеша скриптов).
+        """
+        script = cls._scripts.get(name)
+        if script is None:
+            script = conn.register_script(getattr(otp_scripts, name))
+            cls._scripts[name] = script
+        return script
 
     @classmethod
-    def register_otp_request(cls, phone: str) -> None:
-        """Регистрирует отправку OTP (увеличивает счетчики)."""
+    def register_otp_request(cls, phone, otp: str) -> None:
+        """
+        Одним атомарным вызовом проверяет лимит и кулдаун,
+        увеличивает счётчики и сохраняет OTP.
+        """
         keys = cls._get_keys(phone)
         with RedisClient.connect() as conn:
-            # Безопасно создаем ключ с TTL, если его нет,
-            # Иначе просто увеличиваем
-            if not conn.set(keys['rate'], 1, ex=3600, nx=True):
-                conn.incr(keys['rate'])
-            conn.set(keys['cooldown'], 1, ex=settings.OTP_COOLDOWN_SECONDS)
+            status, wait = cls._script(conn, 'REQUEST_OTP')(
+                keys=[keys['otp'], keys['rate'], keys['cooldown']],
+                args=[
+                    cls.hash_otp(phone, otp),
+                    settings.MAX_OTP_REQUESTS_PER_HOUR, 3600,
+                    settings.OTP_COOLDOWN_SECONDS, settings.OTP_TTL_SECONDS,
+                ],
+                client=conn,
+            )
+        # Hourly rate
+        if status == otp_scripts.REQUEST_RATE_LIMITED:
+            minutes = (wait + 59) // 60
+            logger.warning('Превышен лимит OTP для %s, '
+                           'блокировка на %s мин.', phone, minutes)
+            raise Throttled(
+                wait=wait,
+                detail=f'Превышен лимит запросов. '
+                f'Попробуйте через {minutes} минут.'
+            )
+        # Cooldown
+        if status == otp_scripts.REQUEST_COOLDOWN:
+            logger.warning(
+                'Кулдаун активен для %s, '
+                'осталось %s сек.', phone, wait
+            )
+            raise Throttled(
+                wait=wait,
+                detail=f'Подождите {wait} секунд '
+                f'перед следующим запросом.'
+            )
+        logger.info('OTP сохранен для телефона: %s, TTL: %s сек',
+                    phone, settings.OTP_TTL_SECONDS)
 
-    @classmethod
-    def save_otp(cls, phone: str, otp: str) -> None:
-        """Сохраняет OTP в Redis."""
-        keys = cls._get_keys(phone)
-        with RedisClient.connect() as conn:
-            try:
-                conn.hset(keys['otp'], mapping={'otp': otp, 'attempts': '0'})
-                conn.expire(keys['otp'], settings.OTP_TTL_SECONDS)
-                logger.info('OTP сохранен для телефона: %s, TTL: %s сек',
-                            phone, settings.OTP_TTL_SECONDS)
-            except (ConnectionError, RedisError) as e:
-                logger.error('Ошибка сохранения OTP для %s: %s', phone, e)
-                raise
+    @staticmethod
+    def hash_otp(phone, otp: str) -> str:
+        """В Redis хранится только HMAC кода, привязанный к номеру."""
+        return hmac.new(
+            settings.SECRET_KEY.encode(), f'{phone}:{otp}'.encode(),
+            hashlib.sha256
+        ).hexdigest()
 
     @classmethod
     def verify_otp(cls, phone: str, user_otp: str) -> Tuple[bool, str]:
-        """Верификация OTP с учетом количества попыток."""
+        """
+        Верификация OTP одним атомарным вызовом Redis: учёт попыток,
+        сравнение хеша, удаление кода и счётчик неудач на номер.
+        """
         keys = cls._get_keys(phone)
         with RedisClient.connect() as conn:
             try:
-                if not conn.exists(keys['otp']):
-                    logger.warning('OTP не найден или истек для телефона %s',
-                                   phone)
-                    return False, 'OTP не найден или истек'
-                # Атомарно увеличиваем attempts и получаем его новое значение
-                attempts = conn.hincrby(keys['otp'], 'attempts', 1)
-                stored_otp = conn.hget(keys['otp'], 'otp')
-                if not stored_otp:
-                    logger.error('Некорректные данные OTP для %s', phone)
-                    return False, 'Системная ошибка'
-                # Проверяем OTP
-                if secrets.compare_digest(stored_otp.decode(), user_otp):
-                    conn.delete(keys['otp'])
-                    logger.info('Успешная верификация OTP для телефона %s',
-                                phone)
-                    return True, 'Успешно'
-                # После неудачной попытки
-                remaining_attempts = settings.MAX_OTP_ATTEMPTS - attempts
-                if remaining_attempts == 0:
-                    # Это была последняя попытка - удаляем OTP
-                    conn.delete(keys['otp'])
-                    return False, 'Превышено количество попыток'
-                logger.warning('Неверный OTP для %s. Осталось попыток: %s',
-                               phone, remaining_attempts)
-                return (False, f'Неверный OTP. Осталось попыток: '
-                        f'{remaining_attempts}')
+                status, value = cls._script(conn, 'VERIFY_OTP')(
+                    keys=[keys['otp'], keys['failures']],
+                    args=[
+                        cls.hash_otp(phone, user_otp),
+                        settings.MAX_OTP_ATTEMPTS,
+                        settings.OTP_MAX_FAILED_ATTEMPTS,
+                        settings.OTP_FAILED_ATTEMPTS_WINDOW_SECONDS,
+                    ],
+                    client=conn,
+                )
             except (ConnectionError, RedisError) as e:
                 logger.error('Ошибка верификации OTP для %s: %s', phone, e)
                 return False, 'Системная ошибка'
 
+        if status == otp_scripts.VERIFY_OK:
+            logger.info('Успешная верификация OTP для телефона %s', phone)
+            return True, 'Успешно'
+        if status == otp_scripts.VERIFY_NOT_FOUND:
+            logger.warning('OTP не найден или истек для телефона %s', phone)
+            return False, 'OTP не найден или истек'
+        if status == otp_scripts.VERIFY_LOCKED:
+            minutes = (value + 59) // 60
+            logger.warning('Верификация OTP для %s заблокирована на %s мин.',
+                           phone, minutes)
+            return (False, f'Слишком много неверных кодов. '
+                    f'Попробуйте через {minutes} минут.')
+        if status == otp_scripts.VERIFY_ATTEMPTS_EXCEEDED:
+            return False, 'Превышено количество попыток'
+        logger.warning('Неверный OTP для %s. Осталось попыток: %s',
+                       phone, value)
+        return False, f'Неверный OTP. Осталось попыток: {value}'
+
     @classmethod
     def request_otp(cls, phone: str) -> str:
         """
         Полный процесс запроса OTP с проверкой лимитов
         и асинхронной отправкой.
         """
-        # 1. Проверка лимитов
-        cls.can_send_otp(phone)
-        # 2. Генерация и сохранение
+        # 1. Генерация, проверка лимитов и сохранение (один вызов Redis)
         otp = OTPManager.generate_otp()
-        cls.register_otp_request(phone)
-        cls.save_otp(phone, otp)
+        cls.register_otp_request(phone, otp)
         # 3. Отправка (асинхронная)
-        send_otp_sms_task.delay(phone.as_e164, otp)
+        if settings.OTP_DELIVERY_MODE == 'async':
+            OTPDeliveryQueue.push(phone.as_e164, otp)
+        else:
+            send_otp_sms_task.delay(phone.as_e164, otp)
         return otp  # Возвращаем OTP для логирования в DEV
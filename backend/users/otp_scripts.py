@@ -0,0 +1,62 @@
+"""Lua-скрипты Redis для OTP: каждый выполняется одним атомарным вызовом."""
+
+# Статусы, которые возвращает REQUEST_OTP
+REQUEST_OK = 0
+REQUEST_RATE_LIMITED = 1
+REQUEST_COOLDOWN = 2
+
+# Статусы, которые возвращает VERIFY_OTP
+VERIFY_OK = 0
+VERIFY_NOT_FOUND = 1
+VERIFY_WRONG_CODE = 2
+VERIFY_ATTEMPTS_EXCEEDED = 3
+VERIFY_LOCKED = 4
+
+# KEYS: otp, rate, cooldown
+# ARGV: хеш OTP, лимит в час, окно лимита (сек), кулдаун (сек), TTL кода (сек)
+# Возвращает {статус, ожидание в секундах}
+REQUEST_OTP = """
+local count = tonumber(redis.call('GET', KEYS[2]) or '0')
+if count >= tonumber(ARGV[2]) then
+    return {1, redis.call('TTL', KEYS[2])}
+end
+local cooldown_ttl = redis.call('TTL', KEYS[3])
+if cooldown_ttl > 0 then
+    return {2, cooldown_ttl}
+end
+if not redis.call('SET', KEYS[2], 1, 'EX', ARGV[3], 'NX') then
+    redis.call('INCR', KEYS[2])
+end
+redis.call('SET', KEYS[3], 1, 'EX', ARGV[4])
+redis.call('HSET', KEYS[1], 'otp_hash', ARGV[1], 'attempts', '0')
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {0, 0}
+"""
+
+# KEYS: otp, failures
+# ARGV: хеш введённого OTP, попыток на код, неудач на номер, окно неудач (сек)
+# Возвращает {статус, осталось попыток | блокировка в секундах}
+VERIFY_OTP = """
+local failures = tonumber(redis.call('GET', KEYS[2]) or '0')
+if failures >= tonumber(ARGV[3]) then
+    return {4, redis.call('TTL', KEYS[2])}
+end
+local stored_hash = redis.call('HGET', KEYS[1], 'otp_hash')
+if not stored_hash then
+    return {1, 0}
+end
+if stored_hash == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return {0, 0}
+end
+if redis.call('INCR', KEYS[2]) == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+local remaining = tonumber(ARGV[2]) - attempts
+if remaining <= 0 then
+    redis.call('DEL', KEYS[1])
+    return {3, 0}
+end
+return {2, remaining}
+"""
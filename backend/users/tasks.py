@@ -7,11 +7,12 @@ from django.core.cache import cache
 from api.services.sms_provider import TargetSMSClient, TelegramClient
 
 SMS_BALANCE_CACHE_KEY = 'sms_provider_balance'
+SMS_BALANCE_REFRESH_LOCK_KEY = 'sms_provider_balance:refresh_pending'
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=False)
+@shared_task
 def send_otp_sms_task(phone: str, otp: str) -> str | None:
     """Асинхронная отправка OTP через Telegram или SMS fallback."""
 
@@ -60,7 +61,7 @@ def send_otp_sms_task(phone: str, otp: str) -> str | None:
             phone,
             sms_message_id,
         )
-        cache.delete(SMS_BALANCE_CACHE_KEY)
+        schedule_sms_balance_refresh()
         return sms_message_id
 
     logger.error(
@@ -68,3 +69,55 @@ def send_otp_sms_task(phone: str, otp: str) -> str | None:
         phone,
     )
     return None
+
+
+def format_sms_balance(data: dict | None) -> str | None:
+    """Строка баланса для админки; None — ответ не получен."""
+    if data is None:
+        return None
+    if 'error' in data:
+        return f'Баланс OTP: Ошибка: {data["error"]}'
+    if 'money' in data and 'value' in data['money']:
+        value = data['money']['value']
+        currency = data['money'].get('currency', 'ед.')
+        return f'Баланс OTP: {value} {currency}'
+    return 'Баланс: Неизвестный формат ответа'
+
+
+def schedule_sms_balance_refresh() -> None:
+    """
+    Ставит обновление баланса в очередь, если оно ещё не запланировано.
+
+    При всплеске отправок SMS в очереди остаётся одна задача.
+    """
+    try:
+        if cache.add(
+            SMS_BALANCE_REFRESH_LOCK_KEY, 1,
+            settings.SMS_BALANCE_REFRESH_INTERVAL_SECONDS
+        ):
+            refresh_sms_balance_task.delay()
+    except Exception as e:
+        logger.error('Не удалось запланировать обновление баланса: %s', e)
+
+
+@shared_task
+def refresh_sms_balance_task() -> str | None:
+    """
+    Запрашивает баланс у провайдера и кладёт его в кеш.
+
+    Запускается Celery beat и после отправки SMS. Если провайдер не
+    ответил, в кеше остаётся прежнее значение.
+    """
+    cache.delete(SMS_BALANCE_REFRESH_LOCK_KEY)
+    balance_display = format_sms_balance(TargetSMSClient().get_balance())
+    if balance_display is None:
+        logger.warning('Баланс SMS не получен, оставляем прежнее значение')
+        return None
+
+    cache.set(
+        SMS_BALANCE_CACHE_KEY,
+        balance_display,
+        settings.SMS_BALANCE_CACHE_TIMEOUT
+    )
+    logger.info('Получен баланс от SMS-провайдера: %s', balance_display)
+    return balance_display
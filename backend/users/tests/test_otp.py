@@ -38,12 +38,16 @@ def test_send_otp_redis_storage(
     ttl = redis_client.ttl(keys['otp'])
     assert 0 < ttl <= response.data['TTL']
 
-    # Проверка otp-кода
+    # Проверка otp-кода: в Redis только его хеш
     otp_data = redis_client.hgetall(keys['otp'])
     assert otp_data, f"Хэш {keys['otp']} пуст"
-    otp_code = otp_data.get(b'otp').decode()
+    assert b'otp' not in otp_data
+    _, otp_code = mock_send_sms.call_args.args
     assert len(otp_code) == 4
     assert otp_code.isdigit()
+    assert otp_data[b'otp_hash'].decode() == OTPManager.hash_otp(
+        USER_PHONE, otp_code
+    )
 
 
 def test_send_otp_sms_delivery(
@@ -54,12 +58,12 @@ def test_send_otp_sms_delivery(
     client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
 
     keys = OTPManager._get_keys(USER_PHONE)
-    otp_code = redis_client.hget(keys['otp'], b'otp').decode()
+    otp_hash = redis_client.hget(keys['otp'], b'otp_hash').decode()
 
     mock_send_sms.assert_called_once()
-    # Проверка на соответствие кода в SMS и Redis
+    # Проверка на соответствие кода в SMS и хеша в Redis
     args, _ = mock_send_sms.call_args
-    assert args[1] == otp_code
+    assert OTPManager.hash_otp(USER_PHONE, args[1]) == otp_hash
 
 
 def test_otp_cooldown_limit(client, otp_send_url, mock_send_sms):
@@ -92,6 +96,36 @@ def test_otp_hourly_rate_limit(
     assert 'Превышен лимит запросов' in response.data['detail']
 
 
+def test_otp_throttled_request_keeps_counters(
+    client, redis_client, otp_send_url, mock_send_sms
+):
+    """Отклонённый запрос не увеличивает счётчик и не меняет код."""
+
+    client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+    keys = OTPManager._get_keys(USER_PHONE)
+    otp_hash = redis_client.hget(keys['otp'], 'otp_hash')
+
+    response = client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(redis_client.get(keys['rate'])) == 1
+    assert redis_client.hget(keys['otp'], 'otp_hash') == otp_hash
+    mock_send_sms.assert_called_once()
+
+
+def test_otp_request_survives_script_flush(
+    client, redis_client, otp_send_url, mock_send_sms
+):
+    """После SCRIPT FLUSH скрипт заново загружается в Redis."""
+
+    OTPManager.register_otp_request('+79000000000', '1234')
+    redis_client.script_flush()
+
+    response = client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+
+
 def test_otp_verification_attempts_limit(
     client, redis_client, otp_send_url, otp_verify_url, mock_send_sms
 ):
@@ -121,6 +155,84 @@ def test_otp_verification_attempts_limit(
     assert not redis_client.exists(keys['otp'])
 
 
+def test_otp_verification_locks_phone_after_failures(
+    client, redis_client, otp_send_url, otp_verify_url, mock_send_sms,
+    settings
+):
+    """
+    Счётчик неудач на номер переживает перевыпуск кода:
+    после лимита не проходит даже верный код.
+    """
+
+    settings.OTP_MAX_FAILED_ATTEMPTS = 2
+    client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+    _, correct_code = mock_send_sms.call_args.args
+    wrong_code = '0000' if correct_code != '0000' else '1111'
+
+    for _ in range(settings.OTP_MAX_FAILED_ATTEMPTS):
+        client.post(
+            otp_verify_url,
+            {"phone": USER_PHONE, "otp": wrong_code}, format='json'
+        )
+    response = client.post(
+        otp_verify_url,
+        {"phone": USER_PHONE, "otp": correct_code}, format='json'
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'Слишком много неверных кодов' in response.data['detail']
+    keys = OTPManager._get_keys(USER_PHONE)
+    assert redis_client.ttl(keys['failures']) > 0
+
+
+def test_otp_lockout_reached_with_default_limits(
+    client, redis_client, otp_send_url, otp_verify_url, mock_send_sms
+):
+    """
+    С настройками по умолчанию блокировка наступает: неудачи копятся
+    между часовыми окнами лимита запросов.
+    """
+
+    keys = OTPManager._get_keys(USER_PHONE)
+
+    def failures():
+        return int(redis_client.get(keys['failures']) or 0)
+
+    def hour_passes():
+        redis_client.delete(keys['rate'])
+        ttl = redis_client.ttl(keys['failures'])
+        if ttl <= 3600:
+            redis_client.delete(keys['failures'])
+        else:
+            redis_client.expire(keys['failures'], ttl - 3600)
+
+    hours = 0
+    while failures() < settings.OTP_MAX_FAILED_ATTEMPTS and hours < 24:
+        for _ in range(settings.MAX_OTP_REQUESTS_PER_HOUR):
+            redis_client.delete(keys['cooldown'])
+            client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+            _, correct_code = mock_send_sms.call_args.args
+            wrong_code = '0000' if correct_code != '0000' else '1111'
+            for _ in range(settings.MAX_OTP_ATTEMPTS):
+                client.post(
+                    otp_verify_url,
+                    {"phone": USER_PHONE, "otp": wrong_code}, format='json'
+                )
+        hour_passes()
+        hours += 1
+
+    redis_client.delete(keys['cooldown'])
+    client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+    _, correct_code = mock_send_sms.call_args.args
+    response = client.post(
+        otp_verify_url,
+        {"phone": USER_PHONE, "otp": correct_code}, format='json'
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'Слишком много неверных кодов' in response.data['detail']
+
+
 @pytest.mark.django_db
 def test_otp_verification_success(
     client, otp_send_url, otp_verify_url, redis_client, mock_send_sms
@@ -130,10 +242,9 @@ def test_otp_verification_success(
     # Создаем OTP
     client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
 
-    # Достаем реальный код из Redis
+    # Достаем реальный код из 'отправленной' SMS
     keys = OTPManager._get_keys(USER_PHONE)
-    otp_data = redis_client.hgetall(keys['otp'])
-    correct_code = otp_data.get(b'otp').decode()
+    _, correct_code = mock_send_sms.call_args.args
 
     # Вводим правильный код
     response = client.post(
@@ -205,8 +316,7 @@ def test_otp_expired_code(
     client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
 
     keys = OTPManager._get_keys(USER_PHONE)
-    otp_data = redis_client.hgetall(keys['otp'])
-    correct_code = otp_data.get(b'otp').decode()
+    _, correct_code = mock_send_sms.call_args.args
 
     redis_client.expire(keys['otp'], 0)  # Принудительно 'протухаем' ключ
 
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+from rest_framework import status
+
+from users import otp_delivery
+from users.otp_delivery import (
+    OTP_DELIVERY_CODE_KEY, OTP_DELIVERY_QUEUE_KEY, OTPDeliveryQueue,
+    OTPDeliveryWorker, deliver_otp
+)
+
+USER_PHONE = '+79001234567'
+
+
+def test_deliver_otp_falls_back_to_sms_when_telegram_is_slow(
+    mocker, settings
+):
+    """Telegram не уложился в дедлайн — OTP уходит по SMS без ожидания."""
+
+    settings.OTP_TELEGRAM_PREPARE_DEADLINE = 0.05
+
+    async def slow_prepare(self, phone, client):
+        await asyncio.sleep(10)
+
+    mocker.patch.object(
+        otp_delivery.TelegramClient, 'aprepare_send', slow_prepare
+    )
+    send_sms = mocker.patch.object(
+        otp_delivery.TargetSMSClient, 'asend_sms', return_value='sms-1'
+    )
+
+    started = time.monotonic()
+    result = asyncio.run(deliver_otp(USER_PHONE, '1234', client=None))
+
+    assert result == 'sms-1'
+    assert time.monotonic() - started < 1
+    send_sms.assert_awaited_once_with(USER_PHONE, '1234', None)
+
+
+def test_deliver_otp_via_telegram(mocker):
+    """Успешный Telegram не трогает SMS."""
+
+    mocker.patch.object(
+        otp_delivery.TelegramClient, 'aprepare_send', return_value='req-1'
+    )
+    mocker.patch.object(
+        otp_delivery.TelegramClient, 'asend_sms', return_value='tg-1'
+    )
+    send_sms = mocker.patch.object(otp_delivery.TargetSMSClient, 'asend_sms')
+
+    assert asyncio.run(deliver_otp(USER_PHONE, '1234', client=None)) == 'tg-1'
+    send_sms.assert_not_awaited()
+
+
+def test_worker_delivers_queued_otps_concurrently(
+    redis_client, mocker, settings
+):
+    """Один воркер выполняет доставки параллельно."""
+
+    settings.DEBUG = False
+    jobs = 20
+    for i in range(jobs):
+        OTPDeliveryQueue.push(f'+7900000{i:04d}', '1234')
+    delivered = []
+    worker = OTPDeliveryWorker(concurrency=jobs)
+
+    async def fake_deliver(phone, otp, client, sms_batcher=None):
+        assert otp == '1234'
+        await asyncio.sleep(0.2)
+        delivered.append(phone)
+        if len(delivered) == jobs:
+            worker.stop()
+
+    mocker.patch.object(otp_delivery, 'deliver_otp', fake_deliver)
+
+    started = time.monotonic()
+    asyncio.run(worker.run())
+
+    assert len(delivered) == jobs
+    # Последовательно заняло бы jobs * 0.2 сек
+    assert time.monotonic() - started < jobs * 0.2 / 2
+
+
+def test_send_otp_enqueued_in_async_mode(
+    client, redis_client, otp_send_url, mock_send_sms, settings
+):
+    """В режиме async OTP попадает в очередь воркера, а не в Celery."""
+
+    settings.OTP_DELIVERY_MODE = 'async'
+
+    response = client.post(otp_send_url, {"phone": USER_PHONE}, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    mock_send_sms.assert_not_called()
+    job = json.loads(redis_client.lpop(OTP_DELIVERY_QUEUE_KEY))
+    assert job['phone'] == USER_PHONE
+    # Код не лежит в очереди, а ключ с ним истекает вместе с OTP
+    assert 'otp' not in job
+    code_key = OTP_DELIVERY_CODE_KEY.format(ref=job['ref'])
+    assert 0 < redis_client.ttl(code_key) <= settings.OTP_TTL_SECONDS
+
+
+def test_worker_skips_expired_code(redis_client, mocker, settings):
+    """Истёкший код не доставляется, а забранный удаляется из Redis."""
+
+    settings.DEBUG = False
+    OTPDeliveryQueue.push(USER_PHONE, '1234')
+    OTPDeliveryQueue.push('+79007654321', '5678')
+    expired, fresh = (
+        json.loads(job)
+        for job in redis_client.lrange(OTP_DELIVERY_QUEUE_KEY, 0, -1)
+    )
+    redis_client.delete(OTP_DELIVERY_CODE_KEY.format(ref=expired['ref']))
+    delivered = []
+    worker = OTPDeliveryWorker()
+
+    async def fake_deliver(phone, otp, client, sms_batcher=None):
+        delivered.append((phone, otp))
+        worker.stop()
+
+    mocker.patch.object(otp_delivery, 'deliver_otp', fake_deliver)
+
+    asyncio.run(worker.run())
+
+    assert delivered == [('+79007654321', '5678')]
+    assert not redis_client.exists(
+        OTP_DELIVERY_CODE_KEY.format(ref=fresh['ref'])
+    )
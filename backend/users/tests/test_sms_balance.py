@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from admin_extensions.context_processors import get_sms_balance
+from users import tasks
+from users.models import User
+
+
+def test_refresh_task_caches_balance(mock_sms_balance):
+    """Фоновая задача кладёт баланс в кеш."""
+
+    assert tasks.refresh_sms_balance_task() == 'Баланс OTP: 999.99 RUR'
+    assert cache.get(tasks.SMS_BALANCE_CACHE_KEY) == 'Баланс OTP: 999.99 RUR'
+
+
+def test_refresh_task_keeps_stale_balance_on_failure(mock_sms_balance):
+    """Провайдер не ответил — в кеше остаётся прежний баланс."""
+
+    cache.set(tasks.SMS_BALANCE_CACHE_KEY, 'Баланс OTP: 10 RUR')
+    mock_sms_balance.return_value = None
+
+    tasks.refresh_sms_balance_task()
+
+    assert cache.get(tasks.SMS_BALANCE_CACHE_KEY) == 'Баланс OTP: 10 RUR'
+
+
+def test_context_processor_never_calls_provider(
+    rf, db, settings, mocker, mock_sms_balance
+):
+    """При промахе кеша рендер не ходит к провайдеру, а ставит задачу."""
+
+    settings.DEBUG = False
+    delay = mocker.patch.object(tasks.refresh_sms_balance_task, 'delay')
+    request = rf.get('/admin/')
+    request.user = User.objects.create_user(phone='+79000000001')
+
+    first = get_sms_balance(request)
+    get_sms_balance(request)
+
+    assert first['SMS_PROVIDER_BALANCE'] == 'Баланс OTP: обновляется…'
+    mock_sms_balance.assert_not_called()
+    # Повторный промах не плодит задачи, пока первая не выполнена
+    delay.assert_called_once_with()
+
+
+def test_refresh_view_enqueues_task(client, db, mocker):
+    """Кнопка обновления ставит задачу, а не сбрасывает кеш."""
+
+    cache.set(tasks.SMS_BALANCE_CACHE_KEY, 'Баланс OTP: 10 RUR')
+    delay = mocker.patch.object(tasks.refresh_sms_balance_task, 'delay')
+    client.force_login(User.objects.create_superuser(
+        phone='+79000000001', email='admin@tester.com'
+    ))
+
+    client.get(reverse('admin_extensions:refresh_sms_balance'))
+
+    delay.assert_called_once_with()
+    assert cache.get(tasks.SMS_BALANCE_CACHE_KEY) == 'Баланс OTP: 10 RUR'